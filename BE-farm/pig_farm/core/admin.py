@@ -1,7 +1,19 @@
-from wagtail_modeladmin.options import ModelAdmin, modeladmin_register
+from wagtail_modeladmin.helpers import PermissionHelper
+from wagtail_modeladmin.options import ModelAdmin, ModelAdminGroup, modeladmin_register
+from django import forms
+from django.contrib import messages
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from . import sql_models
+from wagtail import hooks
+from wagtail.admin.auth import require_admin_access
+from wagtail.admin.menu import MenuItem
+from wagtail.documents import get_document_model
+from . import catalog_import, sql_models
 
 class MedicineAdmin(ModelAdmin):
     model = sql_models.Medicine
@@ -219,7 +231,174 @@ class NewsCategoryAdmin(ModelAdmin):
         return format_html('<span style="color: orange; font-weight: bold;">❌ Chưa xuất bản</span>')
     status_badge.short_description = "Trạng thái"
 
+# ===== Lưu trữ: xem cả dòng đã chuyển sang bảng archive (view <table>_all) =====
+
+class ArchivePermissionHelper(PermissionHelper):
+    """Chỉ superuser xem, không ai tạo/sửa/xoá (view không ghi được)"""
+
+    def user_can_list(self, user):
+        return user.is_superuser
+
+    def user_can_create(self, user):
+        return False
+
+    def user_can_edit_obj(self, user, obj):
+        return False
+
+    def user_can_delete_obj(self, user, obj):
+        return False
+
+
+def archive_badge(self, obj):
+    if obj.is_archived:
+        return format_html('<span style="color: gray; font-weight: bold;">📦 Đã lưu trữ</span>')
+    if obj.is_deleted:
+        return format_html('<span style="color: red; font-weight: bold;">🗑️ Đã xóa</span>')
+    elif obj.is_published:
+        return format_html('<span style="color: green; font-weight: bold;">✅ Đã xuất bản</span>')
+    return format_html('<span style="color: orange; font-weight: bold;">❌ Chưa xuất bản</span>')
+archive_badge.short_description = "Trạng thái"
+
+
+class ArchiveAdmin(ModelAdmin):
+    permission_helper_class = ArchivePermissionHelper
+    list_filter = ("is_archived", "is_deleted", "is_published")
+    ordering = ("-deleted_at",)
+    status_badge = archive_badge
+
+
+class MedicineAllAdmin(ArchiveAdmin):
+    model = sql_models.MedicineAll
+    menu_label = "Thuốc"
+    menu_icon = "doc-full-inverse"
+    list_display = ("id", "name", "status_badge", "deleted_at")
+    search_fields = ("name",)
+
+
+class PigAllAdmin(ArchiveAdmin):
+    model = sql_models.PigAll
+    menu_label = "Lợn"
+    menu_icon = "snippet"
+    list_display = ("id", "name", "status_badge", "deleted_at")
+    search_fields = ("name",)
+
+
+class PigImageAllAdmin(ArchiveAdmin):
+    model = sql_models.PigImageAll
+    menu_label = "Hình ảnh lợn"
+    menu_icon = "image"
+    list_display = ("id", "title", "pig_id", "status_badge", "deleted_at")
+    search_fields = ("title",)
+
+
+class CmsContentEntryAllAdmin(ArchiveAdmin):
+    model = sql_models.CmsContentEntryAll
+    menu_label = "Nội dung"
+    menu_icon = "doc-full"
+    list_display = ("id", "title", "kind_id", "status_badge", "deleted_at")
+    search_fields = ("title", "slug")
+
+
+class ArchiveGroup(ModelAdminGroup):
+    menu_label = "Lưu trữ (SQL)"
+    menu_icon = "folder-inverse"
+    items = (MedicineAllAdmin, PigAllAdmin, PigImageAllAdmin, CmsContentEntryAllAdmin)
+
+
 modeladmin_register(MedicineAdmin)
 modeladmin_register(PigAdmin)
 modeladmin_register(PigImageAdmin)
 modeladmin_register(NewsCategoryAdmin)
+modeladmin_register(ArchiveGroup)
+
+
+# ===== Nhập bảng giá lợn / thuốc từ CSV / XLSX (core/catalog_import.py) =====
+
+KIND_LABELS = {"pig": "Lợn", "medicine": "Thuốc"}
+
+
+class CatalogImportForm(forms.Form):
+    kind = forms.ChoiceField(label="Loại", choices=list(KIND_LABELS.items()))
+    file = forms.FileField(label="File CSV / XLSX", required=False)
+    document = forms.ModelChoiceField(
+        label="Hoặc chọn tài liệu đã tải lên",
+        queryset=get_document_model().objects.filter(
+            Q(file__iendswith=".csv") | Q(file__iendswith=".xlsx")
+        ).order_by("-created_at"),
+        required=False,
+    )
+
+    def clean(self):
+        cleaned = super().clean()
+        upload = cleaned.get("file")
+        if upload and not upload.name.lower().endswith(catalog_import.EXTENSIONS):
+            self.add_error("file", "Chỉ nhận file .csv hoặc .xlsx")
+        elif not upload and not cleaned.get("document"):
+            raise forms.ValidationError("Chọn file hoặc tài liệu")
+        return cleaned
+
+
+@require_admin_access
+def catalog_import_view(request):
+    """Tải file lên (lưu thành Document) -> xem diff (dry-run) -> xác nhận nhập.
+
+    Cả hai bước chạy nền (catalog_import.start); trang ?job=<id> tự tải lại tới khi có kết quả.
+    """
+    job_id = request.GET.get("job")
+    if job_id:
+        return _catalog_import_job(request, job_id)
+    form = CatalogImportForm(request.POST or None, request.FILES or None,
+                             initial={"kind": request.GET.get("kind", "medicine")})
+    if request.method == "POST" and form.is_valid():
+        kind = form.cleaned_data["kind"]
+        parent = catalog_import.default_parent(catalog_import.KINDS[kind])
+        if not parent.permissions_for_user(request.user).can_publish_subpage():
+            raise PermissionDenied
+        document = form.cleaned_data["document"]
+        if form.cleaned_data["file"]:
+            upload = form.cleaned_data["file"]
+            document = get_document_model()(title=upload.name, file=upload, uploaded_by_user=request.user)
+            document._set_document_file_metadata()
+            document.save()
+
+        confirmed = request.POST.get("action") == "import"
+        job_id = catalog_import.start(kind, document, dry_run=not confirmed, user=request.user)
+        return redirect(f"{reverse('catalog_import')}?job={job_id}")
+    return TemplateResponse(request, "core/catalog_import.html", {"form": form})
+
+
+def _catalog_import_job(request, job_id):
+    job = catalog_import.job_status(job_id)
+    if job is None:
+        messages.error(request, "❌ Không tìm thấy lượt nhập (đã hết hạn?)")
+        return redirect("catalog_import")
+    kind = job["kind"]
+    if job["state"] == "failed":
+        messages.error(request, f"❌ {job['error']}")
+        return redirect(f"{reverse('catalog_import')}?kind={kind}")
+
+    context = {"form": CatalogImportForm(initial={"kind": kind}), "job": job, "kind": kind,
+               "kind_label": KIND_LABELS[kind],
+               "document": get_document_model().objects.filter(pk=job["document_id"]).first()}
+    if job["state"] == "done":
+        report = job["report"]
+        if not job["dry_run"] and not report.errors:
+            messages.success(
+                request,
+                f"✅ {KIND_LABELS[kind]}: {report.counts['create']} tạo mới, {report.counts['update']} cập nhật, "
+                f"tạo {report.pages_created} page, sửa {report.pages_updated} page",
+            )
+            model_name = catalog_import.KINDS[kind].model._meta.model_name
+            return redirect(reverse(f"core_{model_name}_modeladmin_index"))
+        context["report"] = report
+    return TemplateResponse(request, "core/catalog_import.html", context)
+
+
+@hooks.register("register_admin_urls")
+def register_catalog_import_url():
+    return [path("catalog-import/", catalog_import_view, name="catalog_import")]
+
+
+@hooks.register("register_admin_menu_item")
+def register_catalog_import_menu_item():
+    return MenuItem("Nhập bảng giá", reverse("catalog_import"), icon_name="upload", order=900)
@@ -0,0 +1,265 @@
+"""
+Cache response JSON cho các endpoint đọc trong core/views.py, kèm single-flight.
+
+Khoá cache gồm nhóm dữ liệu (pig, medicine, news) và URL đã chuẩn hoá; mỗi
+entry ghi version của nhóm lúc tính. Hook publish/unpublish/delete trong
+core/sync.py tăng version của nhóm (invalidate) nên mọi entry cũ thành stale
+cùng lúc.
+
+Stale-while-revalidate: entry hết hạn (API_CACHE_TIMEOUT) hoặc thuộc version
+cũ vẫn được trả thêm API_CACHE_STALE_SECONDS giây, kèm một lần làm mới ở
+background. Header X-Cache-Status cho biết fresh / stale / miss. Nếu view lỗi
+(DB chậm hoặc mất kết nối -> 500) thì trả bản cũ còn giữ trong cache
+(tối đa API_CACHE_STALE_IF_ERROR_SECONDS) thay vì 500.
+
+Khi miss, các request giống nhau chỉ tốn một lần tính:
+  - trong process: request đầu tiên chạy view, các thread khác chờ Future của nó;
+  - giữa các worker: người tính giữ khoá "<key>:lock" trong cache (cache.add,
+    hết hạn sau API_CACHE_LOCK_SECONDS); worker khác chờ kết quả xuất hiện
+    trong cache, quá hạn khoá thì tự tính.
+Khoá giữa các worker chỉ có tác dụng khi CACHES dùng backend chung (Redis,
+Memcached); với LocMemCache mỗi worker vẫn tính một lần.
+"""
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+GROUPS = ("pig", "medicine", "news")
+STATE_HEADER = "X-Cache-Status"  # fresh | stale | miss
+# Giá trị mặc định chung của các view danh sách trong core/views.py
+DEFAULT_PARAMS = {"page": "1", "page_size": "20", "published": "true"}
+
+_inflight = {}  # key -> Future của lần tính đang chạy trong process
+_inflight_lock = threading.Lock()
+_executor = None
+
+
+def _version_key(group):
+    return f"api-cache:{group}:version"
+
+
+def group_version(group) -> int:
+    version = cache.get(_version_key(group))
+    if version is None:
+        version = 1
+        cache.add(_version_key(group), version, None)
+    return version
+
+
+def invalidate(*groups):
+    """Bỏ toàn bộ response đã cache của các nhóm, sau khi transaction commit."""
+    def bump():
+        for group in groups:
+            try:
+                cache.incr(_version_key(group))
+            except ValueError:
+                cache.set(_version_key(group), 2, None)
+
+    transaction.on_commit(bump)
+
+
+def cache_key(group, path, params) -> str:
+    """Khoá theo path + query string đã sắp xếp (thứ tự tham số không tạo khoá mới).
+
+    Version không nằm trong khoá mà trong entry, để bản cũ vẫn dùng được khi stale.
+    """
+    query = "&".join(f"{name}={value}" for name, values in sorted(params) for value in values)
+    return f"api:{group}:{path}?{query}"
+
+
+def request_key(group, request) -> str:
+    # Tham số bằng giá trị mặc định của view không tạo khoá riêng (?published=true == không có)
+    params = [(name, values) for name, values in request.GET.lists() if [DEFAULT_PARAMS.get(name)] != values]
+    return cache_key(group, request.path, params)
+
+
+def single_flight(key, compute):
+    """Chạy compute() đúng một lần cho mọi lời gọi đồng thời cùng key trong process."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        return future.result()
+
+    try:
+        result = compute()
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def lookup(group, key):
+    """(entry, trạng thái): "fresh" còn hạn và đúng version, "stale" trong thời gian grace."""
+    entry = cache.get(key)
+    if entry is None:
+        return None, None
+    now = time.time()
+    if entry["version"] == group_version(group) and now < entry["fresh_until"]:
+        return entry, "fresh"
+    if now < entry["stale_until"]:
+        return entry, "stale"
+    return None, None
+
+
+def _compute(group, key, build):
+    """Chạy view và lưu response 200; publish trong lúc tính làm kết quả thành stale."""
+    version = group_version(group)
+    payload = build()
+    if payload["status"] == 200:
+        now = time.time()
+        timeout, grace = settings.API_CACHE_TIMEOUT, settings.API_CACHE_STALE_SECONDS
+        # Giữ lâu hơn grace để còn bản dự phòng khi DB lỗi
+        keep = timeout + max(grace, settings.API_CACHE_STALE_IF_ERROR_SECONDS)
+        cache.set(key, {**payload, "version": version, "fresh_until": now + timeout,
+                        "stale_until": now + timeout + grace}, keep)
+    return payload
+
+
+def _wait_for(group, key, lock_key):
+    """Chờ worker đang giữ khoá ghi kết quả; None nếu khoá hết hạn/được nhả mà chưa có."""
+    deadline = time.monotonic() + settings.API_CACHE_LOCK_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(settings.API_CACHE_POLL_SECONDS)
+        entry, state = lookup(group, key)
+        if state == "fresh":
+            return entry
+        if cache.get(lock_key) is None:
+            break
+    return None
+
+
+def fill(group, key, build):
+    """Lấy payload mới từ cache hoặc tính (một người tính cho mọi worker)."""
+    entry, state = lookup(group, key)
+    if state == "fresh":
+        return entry
+
+    lock_key = f"{key}:lock"
+    owner = cache.add(lock_key, 1, settings.API_CACHE_LOCK_SECONDS)
+    if not owner:
+        entry = _wait_for(group, key, lock_key)
+        if entry is not None:
+            return entry
+    try:
+        return _compute(group, key, build)
+    finally:
+        if owner:
+            cache.delete(lock_key)
+
+
+def _refresh_executor():
+    global _executor
+    with _inflight_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.API_CACHE_REFRESH_WORKERS,
+                                           thread_name_prefix="api-cache-refresh")
+    return _executor
+
+
+def refresh(group, key, build):
+    """Làm mới một khoá đang stale ở background; bỏ qua nếu đã có worker khác làm."""
+    lock_key = f"{key}:lock"
+    if not cache.add(lock_key, 1, settings.API_CACHE_LOCK_SECONDS):
+        return
+
+    def run():
+        try:
+            _compute(group, key, build)
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {key}: {e}")
+        finally:
+            cache.delete(lock_key)
+
+    if settings.API_CACHE_REFRESH_WORKERS <= 0:
+        run()
+        return
+
+    def run_in_thread():
+        try:
+            run()
+        finally:
+            connection.close()
+
+    _refresh_executor().submit(run_in_thread)
+
+
+def _payload(response):
+    return {
+        "status": response.status_code,
+        "content": response.content,
+        "content_type": response["Content-Type"],
+    }
+
+
+def _response(payload, state):
+    response = HttpResponse(payload["content"], status=payload["status"], content_type=payload["content_type"])
+    response[STATE_HEADER] = state
+    return response
+
+
+def cached_api(group):
+    """Decorator cho view GET trả JSON: cache response 200 theo nhóm, gom các miss đồng thời,
+    trả bản stale trong thời gian grace và khi view lỗi."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.API_CACHE_TIMEOUT <= 0:
+                return view(request, *args, **kwargs)
+            key = request_key(group, request)
+
+            def build():
+                return _payload(view(request, *args, **kwargs))
+
+            entry, state = lookup(group, key)
+            if state == "fresh":
+                return _response(entry, "fresh")
+            if state == "stale":
+                refresh(group, key, build)
+                return _response(entry, "stale")
+
+            try:
+                payload = single_flight(key, lambda: fill(group, key, build))
+            except Exception:
+                payload = None
+            if payload is None or payload["status"] >= 500:
+                # DB chậm/lỗi: dùng lại response tốt gần nhất (stale-if-error) thay vì 500
+                entry = cache.get(key)
+                if entry is not None:
+                    return _response(entry, "stale")
+                if payload is None:
+                    # Lỗi ở tầng cache (vd. Redis mất kết nối): chạy view trực tiếp
+                    return view(request, *args, **kwargs)
+            return _response(payload, "fresh" if "version" in payload else "miss")
+
+        # Cho warm-up (core/warmup.py) tính lại mà không đi qua lớp cache
+        wrapper.cache_group = group
+        wrapper.uncached_view = view
+        return wrapper
+    return decorator
+
+
+def prime(view, request, *args, force=False, **kwargs):
+    """Tính sẵn response của một view có @cached_api; trả về "fresh" nếu đã có, không thì status code."""
+    group = view.cache_group
+    key = request_key(group, request)
+    if not force and lookup(group, key)[1] == "fresh":
+        return "fresh"
+    payload = _compute(group, key, lambda: _payload(view.uncached_view(request, *args, **kwargs)))
+    return payload["status"]
@@ -0,0 +1,22 @@
+"""Các endpoint JSON của /api/; dùng chung cho core/urls.py và profile API (pig_farm/urls_api.py)."""
+from django.http import JsonResponse
+from django.urls import path
+
+from . import views
+
+def healthz(_): return JsonResponse({"ok": True})
+
+urlpatterns = [
+    path("healthz", healthz),
+    path("health/", views.api_health, name="api_health"),
+    path("medicines/", views.api_medicines, name="api_medicines"),
+    path("medicines/<int:medicine_id>/", views.api_medicine_detail, name="api_medicine_detail"),
+    path("pigs/", views.api_pigs, name="api_pigs"),
+    path("pigs/<int:pig_id>/", views.api_pig_detail, name="api_pig_detail"),
+    path("news/", views.api_news_articles, name="api_news_articles"),
+    path("news/<int:article_id>/", views.api_news_article_detail, name="api_news_article_detail"),
+    path("news/categories/", views.api_news_categories, name="api_news_categories"),
+    path("news/feed.xml", views.api_news_feed, name="api_news_feed"),
+    path("autocomplete/", views.api_autocomplete, name="api_autocomplete"),
+    path("changes/", views.api_changes, name="api_changes"),
+]
@@ -5,5 +5,7 @@ class CoreConfig(AppConfig):
     name = 'core'
     
     def ready(self):
-        """Import signals when app is ready"""
-        import core.signals  # This registers the signal handlers
\ No newline at end of file
+        """Import sync when app is ready"""
+        import core.sync  # This registers the publish dispatcher and page hooks
+        from core.search_index import register_signal_handlers
+        register_signal_handlers()  # Search index cập nhật theo lô (AUTO_UPDATE tắt)
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Chỉ mục tiền tố trong bộ nhớ cho /api/autocomplete/.
+
+Mảng khoá đã sắp xếp + bisect: mỗi tiêu đề (lợn, thuốc, tin tức đang publish)
+sinh một khoá cho mỗi từ, dạng đã bỏ dấu ("lợn duroc" -> "lon duroc",
+"duroc"), nên gõ "duro" hay "lon d" đều khớp. Tra cứu là một bisect rồi quét
+các khoá liền kề.
+
+Mỗi process giữ một bản riêng, dựng lười ở request đầu tiên. Hook publish trong
+core/sync.py vá trực tiếp bản của process đang xử lý và tăng version trong cache
+để các worker khác dựng lại ở request kế tiếp. Bộ nhớ bị chặn bởi
+AUTOCOMPLETE_MAX_ENTRIES (số khoá) và độ dài tiêu đề.
+"""
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import sql_models
+
+VERSION_KEY = "autocomplete:version"
+MAX_TITLE_LENGTH = 120
+MAX_WORDS_PER_TITLE = 8
+
+# kind -> (model, cột tiêu đề, queryset các dòng đang hiển thị)
+SOURCES = {
+    "pig": (sql_models.Pig, "name", lambda: sql_models.Pig.objects.filter(is_published=True, is_deleted=False)),
+    "medicine": (sql_models.Medicine, "name", lambda: sql_models.Medicine.objects.filter(is_published=True, is_deleted=False)),
+    "news": (sql_models.CmsNewsEntry, "title", lambda: sql_models.CmsNewsEntry.get_news_queryset().filter(is_published=True)),
+}
+
+
+def fold(text: str) -> str:
+    """Bỏ dấu tiếng Việt, chữ thường, gộp khoảng trắng."""
+    text = (text or "").replace("đ", "d").replace("Đ", "D")
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return " ".join(text.lower().split())
+
+
+def _keys_for(title: str) -> list:
+    """Các khoá bắt đầu ở từng từ của tiêu đề đã bỏ dấu."""
+    words = fold(title[:MAX_TITLE_LENGTH]).split()[:MAX_WORDS_PER_TITLE]
+    return list(dict.fromkeys(" ".join(words[i:]) for i in range(len(words))))
+
+
+class PrefixIndex:
+    """Mảng (khoá, ref) sắp xếp; ref = (kind, id)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = []  # [(key, kind, id)] đã sắp xếp
+        self.titles = {}  # (kind, id) -> tiêu đề gốc
+        self.lock = threading.Lock()
+
+    def build(self, items):
+        """items: iterable (kind, id, title). Thay toàn bộ nội dung."""
+        entries, titles = [], {}
+        for kind, pk, title in items:
+            if not title:
+                continue
+            keys = _keys_for(title)
+            if len(entries) + len(keys) > self.max_entries:
+                break
+            titles[(kind, pk)] = title[:MAX_TITLE_LENGTH]
+            entries.extend((key, kind, pk) for key in keys)
+        entries.sort()
+        with self.lock:
+            self.entries, self.titles = entries, titles
+
+    def remove(self, kind, pk):
+        with self.lock:
+            title = self.titles.pop((kind, pk), None)
+            if title is None:
+                return
+            for key in _keys_for(title):
+                i = bisect_left(self.entries, (key, kind, pk))
+                if i < len(self.entries) and self.entries[i] == (key, kind, pk):
+                    del self.entries[i]
+
+    def upsert(self, kind, pk, title):
+        self.remove(kind, pk)
+        if not title:
+            return
+        keys = _keys_for(title)
+        with self.lock:
+            if len(self.entries) + len(keys) > self.max_entries:
+                return
+            self.titles[(kind, pk)] = title[:MAX_TITLE_LENGTH]
+            for key in keys:
+                insort(self.entries, (key, kind, pk))
+
+    def search(self, query: str, limit: int) -> list:
+        prefix = fold(query)
+        if not prefix:
+            return []
+        results, seen = [], set()
+        with self.lock:
+            entries, titles = self.entries, self.titles
+            i = bisect_left(entries, (prefix,))
+            while i < len(entries) and len(results) < limit:
+                key, kind, pk = entries[i]
+                if not key.startswith(prefix):
+                    break
+                if (kind, pk) not in seen:
+                    seen.add((kind, pk))
+                    results.append({"type": kind, "id": pk, "title": titles[(kind, pk)]})
+                i += 1
+        return results
+
+
+_index = None
+_index_version = None
+_built_at = 0.0
+_build_lock = threading.Lock()
+
+
+def _load_items():
+    for kind, (_, field, queryset) in SOURCES.items():
+        for pk, title in queryset().values_list("id", field).iterator(chunk_size=2000):
+            yield kind, pk, title
+
+
+def _current_version():
+    return cache.get(VERSION_KEY, 0)
+
+
+def get_index() -> PrefixIndex:
+    """Index của process; dựng lại khi version trong cache đổi hoặc quá hạn."""
+    global _index, _index_version, _built_at
+    version = _current_version()
+    max_age = getattr(settings, "AUTOCOMPLETE_REBUILD_SECONDS", 600)
+    if _index is not None and version == _index_version and time.monotonic() - _built_at < max_age:
+        return _index
+    with _build_lock:
+        if _index is None or version != _index_version or time.monotonic() - _built_at >= max_age:
+            index = _index or PrefixIndex(getattr(settings, "AUTOCOMPLETE_MAX_ENTRIES", 200_000))
+            index.build(_load_items())
+            _index, _index_version, _built_at = index, version, time.monotonic()
+    return _index
+
+
+def _bump_version():
+    global _index_version
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+        version = 1
+    # Process này đã tự vá nên không cần dựng lại (nếu trước đó đang mới nhất)
+    if _index is not None and _index_version == version - 1:
+        _index_version = version
+
+
+def patch(kind: str, pk: int, title):
+    """Gọi từ hook publish: cập nhật tiêu đề (title=None để xoá khỏi index)."""
+    if kind not in SOURCES or not pk:
+        return
+    transaction.on_commit(lambda: _patch(kind, pk, title))
+
+
+def _patch(kind, pk, title):
+    if _index is not None:
+        if title:
+            _index.upsert(kind, pk, title)
+        else:
+            _index.remove(kind, pk)
+    _bump_version()
+
+
+def autocomplete(query: str, limit: int = 10) -> list:
+    return get_index().search(query, limit)
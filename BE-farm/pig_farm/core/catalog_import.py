@@ -0,0 +1,587 @@
+"""
+Nhập bảng giá lợn / thuốc từ CSV hoặc XLSX (lệnh import_catalog, menu admin
+"Nhập bảng giá").
+
+1. File được đọc theo dòng (csv.reader / openpyxl read_only), không nạp cả
+   file vào bộ nhớ; mỗi dòng được kiểm tra và chuẩn hoá.
+2. Theo lô: tìm dòng SQL khớp (cột id, hoặc đúng tên trong các dòng chưa xoá),
+   so với dữ liệu hiện có -> diff create / update / unchanged. Dry-run dừng ở
+   đây, không ghi gì.
+3. Dòng cần ghi được COPY vào bảng tạm, id của dòng mới lấy trước từ sequence,
+   rồi MỘT câu MERGE ghi vào product_pig / product_medicine.
+4. Page Wagtail tương ứng được tạo / sửa, đọc bảng tạm theo lô; mỗi page vẫn
+   một revision + publish (biên tập viên thấy đúng giá mới), nên bước này là
+   O(số dòng đổi). content_hash trên dòng SQL đã tính theo page nên hook
+   publish (core/sync.py) không ghi lại dòng nào.
+5. Cache /api/, snapshot, sitemap, autocomplete, search index được làm mới một
+   lần sau commit.
+
+Có lỗi ở bất kỳ dòng nào thì không ghi gì (một transaction). Dòng không có
+trong file được giữ nguyên. COPY và MERGE cần PostgreSQL 15+.
+
+Trang admin chạy run() ở luồng nền (start) và poll trạng thái (job_status) qua
+cache, nên request không bị giới hạn bởi timeout của gunicorn. Luồng nền nằm
+trong worker gunicorn: worker bị recycle / SIGKILL thì job dừng giữa chừng
+(transaction rollback, không ghi gì). Mỗi process đang giữ job ghi nhịp
+(heartbeat) vào cache; job "running" mất nhịp quá CATALOG_IMPORT_STALE_SECONDS
+được job_status báo failed để biên tập viên chạy lại.
+"""
+import csv
+import io
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from typing import Callable, NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from wagtail.models import Page, Site
+
+from .autocomplete import fold
+from .hashing import content_hash
+from .pages import MedicineProductPage, PigPage
+from .sql_models import Medicine, Pig
+from .sync import SYNC_HANDLERS, load_galleries, refresh_derived_bulk, state_digest
+
+logger = logging.getLogger(__name__)
+
+CREATE, UPDATE, UNCHANGED = "create", "update", "unchanged"
+EXTENSIONS = (".csv", ".xlsx")
+MAX_PRICE = Decimal("1e12")  # DecimalField(max_digits=14, decimal_places=2)
+
+# Tiêu đề cột (đã bỏ dấu, chữ thường) -> tên cột
+HEADER_ALIASES = {
+    "ma": "id",
+    "ten": "name",
+    "gia": "price",
+    "quy cach": "packaging",
+    "dong goi": "packaging",
+    "don gia": "price_unit",
+    "gia don vi": "price_unit",
+    "tong gia": "price_total",
+    "thanh tien": "price_total",
+}
+
+
+class CatalogImportError(Exception):
+    """File không đọc được hoặc thiếu cột bắt buộc."""
+
+
+class ImportKind(NamedTuple):
+    """Một loại dữ liệu nhập được: bảng SQL, page Wagtail và các cột nghiệp vụ.
+
+    columns: tên cột -> kiểu trong bảng tạm; cột đầu tiên là tên (bắt buộc).
+    """
+    model: type
+    page_cls: type
+    columns: dict
+
+
+KINDS = {
+    "pig": ImportKind(Pig, PigPage, {"name": "TEXT", "price": "NUMERIC(14, 2)"}),
+    "medicine": ImportKind(Medicine, MedicineProductPage, {
+        "name": "TEXT",
+        "packaging": "TEXT",
+        "price_unit": "NUMERIC(14, 2)",
+        "price_total": "NUMERIC(14, 2)",
+    }),
+}
+
+
+class RowPlan(NamedTuple):
+    """Kết quả so sánh một dòng trong file với dữ liệu hiện có."""
+    line: int
+    action: str  # create | update | unchanged | error
+    fields: dict  # giá trị trên page (name, price, ...)
+    target_id: int = None  # id dòng SQL khớp
+    page_id: int = None  # page Wagtail của dòng đó
+    digest: str = None
+    changes: dict = None  # cột -> (cũ, mới)
+    page_stale: bool = False  # page thiếu hoặc khác file dù dòng SQL không đổi
+    error: str = None
+
+
+class Report:
+    """Tổng hợp kết quả theo lô; giữ tối đa diff_limit dòng diff để hiển thị."""
+
+    def __init__(self, diff_limit=None):
+        self.counts = {CREATE: 0, UPDATE: 0, UNCHANGED: 0}
+        self.errors = []
+        self.diff = []
+        self.diff_limit = diff_limit
+        self.written = 0
+        self.pages_created = 0
+        self.pages_updated = 0
+
+    def add(self, plans):
+        for plan in plans:
+            if plan.error:
+                self.errors.append((plan.line, plan.error))
+                continue
+            self.counts[plan.action] += 1
+            if plan.action != UNCHANGED and (self.diff_limit is None or len(self.diff) < self.diff_limit):
+                self.diff.append(plan)
+
+
+# ---------- Đọc file ----------
+
+def _header_name(header) -> str:
+    key = fold(str(header or "")).replace("_", " ")
+    return HEADER_ALIASES.get(key, key.replace(" ", "_"))
+
+
+def _csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    first = text.readline()
+    # Excel bản tiếng Việt xuất CSV bằng dấu ;
+    delimiter = ";" if first.count(";") > first.count(",") else ","
+    yield from csv.reader(itertools.chain([first], text), delimiter=delimiter)
+
+
+def _xlsx_rows(fileobj, sheet=None):
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as e:
+        raise CatalogImportError(f"Không đọc được file XLSX: {e}")
+    try:
+        if sheet and sheet not in workbook.sheetnames:
+            raise CatalogImportError(f"Không có sheet '{sheet}'")
+        yield from (workbook[sheet] if sheet else workbook.active).iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_rows(fileobj, filename, sheet=None):
+    """(số dòng, {cột: giá trị}) theo thứ tự trong file, bỏ dòng trống."""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in EXTENSIONS:
+        raise CatalogImportError(f"Chỉ nhận {', '.join(EXTENSIONS)} (nhận được '{ext or filename}')")
+    rows = _csv_rows(fileobj) if ext == ".csv" else _xlsx_rows(fileobj, sheet)
+    header = next(rows, None)
+    if not header:
+        raise CatalogImportError("File trống")
+    names = [_header_name(cell) for cell in header]
+    for line, values in enumerate(rows, start=2):
+        if values is None or all(value is None or str(value).strip() == "" for value in values):
+            continue
+        yield line, dict(zip(names, values))
+
+
+# ---------- Kiểm tra từng dòng ----------
+
+def parse_price(value):
+    """'1.200.000', '1,200,000', '1200000.5', '150 000 đ' hoặc số từ Excel -> Decimal (None nếu trống)."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        number = Decimal(str(value))
+    else:
+        text = re.sub(r"(?i)\s|vn[dđ]|đ$|d$", "", str(value))
+        if re.fullmatch(r"\d{1,3}([.,])\d{3}(\1\d{3})*", text):
+            text = re.sub(r"[.,]", "", text)  # chỉ có dấu phân cách hàng nghìn
+        elif "," in text and "." in text:
+            text = text.replace("," if text.rfind(".") > text.rfind(",") else ".", "").replace(",", ".")
+        else:
+            text = text.replace(",", ".")
+        try:
+            number = Decimal(text)
+        except InvalidOperation:
+            raise ValueError(f"giá '{value}' không hợp lệ")
+    if not number.is_finite() or number < 0 or number >= MAX_PRICE:
+        raise ValueError(f"giá '{value}' ngoài khoảng cho phép")
+    return number.quantize(Decimal("0.01"))
+
+
+def _parse_id(value):
+    if value is None or str(value).strip() == "":
+        return None
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"id '{value}' không hợp lệ")
+    if not number.is_finite() or number != number.to_integral_value() or number <= 0:
+        raise ValueError(f"id '{value}' không hợp lệ")
+    return int(number)
+
+
+def validate(kind, rows):
+    """(số dòng, id hoặc None, {cột: giá trị đã chuẩn hoá}) hoặc (số dòng, None, thông báo lỗi)."""
+    seen = {}
+    for line, raw in rows:
+        if "name" not in raw:
+            raise CatalogImportError("Thiếu cột name (hoặc 'Tên')")
+        try:
+            row_id = _parse_id(raw.get("id"))
+            name = " ".join(str(raw.get("name") or "").split())
+            if not name:
+                raise ValueError("thiếu tên")
+            if len(name) > 255:
+                raise ValueError("tên dài quá 255 ký tự")
+            fields = {"name": name}
+            for column in kind.columns:
+                if column == "name":
+                    continue
+                if column.startswith("price"):
+                    fields[column] = parse_price(raw.get(column))
+                else:
+                    fields[column] = " ".join(str(raw.get(column) or "").split())[:200]
+        except ValueError as e:
+            yield line, None, str(e)
+            continue
+        key = row_id or fold(name)
+        if key in seen:
+            yield line, None, f"trùng với dòng {seen[key]}"
+            continue
+        seen[key] = line
+        yield line, row_id, fields
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+# ---------- So sánh với dữ liệu hiện có ----------
+
+def _sync_values(kind, fields) -> dict:
+    """Giá trị sẽ nằm trên dòng SQL, tính bằng chính handler đồng bộ page -> SQL."""
+    return SYNC_HANDLERS[kind.page_cls].values(kind.page_cls(**fields))
+
+
+def plan_batch(kind, batch, claimed=None) -> list:
+    """RowPlan cho một lô dòng đã kiểm tra (mỗi lô vài query, không phụ thuộc số dòng).
+
+    claimed: id dòng SQL -> số dòng trong file đã khớp, dùng chung giữa các lô; hai
+    dòng trong file (theo id và theo tên) khớp cùng một dòng SQL thì dòng sau lỗi.
+    """
+    claimed = {} if claimed is None else claimed
+    valid = [(line, row_id, fields) for line, row_id, fields in batch if isinstance(fields, dict)]
+    by_id = kind.model.objects.in_bulk([row_id for _, row_id, _ in valid if row_id])
+    by_name = {}
+    names = [fields["name"] for _, row_id, fields in valid if not row_id]
+    for row in kind.model.objects.filter(name__in=names, is_deleted=False).order_by("id"):
+        by_name.setdefault(row.name, []).append(row)
+
+    matches = {}
+    plans = {}
+    for line, row_id, fields in batch:
+        if not isinstance(fields, dict):
+            plans[line] = RowPlan(line, "error", {}, error=fields)
+            continue
+        rows = [by_id[row_id]] if row_id in by_id else ([] if row_id else by_name.get(fields["name"], []))
+        if row_id and not rows:
+            plans[line] = RowPlan(line, "error", fields, error=f"không có dòng id={row_id}")
+        elif rows and rows[0].is_deleted:
+            plans[line] = RowPlan(line, "error", fields, error=f"dòng id={row_id} đã bị xoá")
+        elif len(rows) > 1:
+            plans[line] = RowPlan(line, "error", fields,
+                                  error=f"tên trùng {len(rows)} dòng ({', '.join(str(r.id) for r in rows)}), thêm cột id")
+        elif rows and rows[0].id in claimed:
+            plans[line] = RowPlan(line, "error", fields,
+                                  error=f"cùng dòng id={rows[0].id} với dòng {claimed[rows[0].id]}")
+        else:
+            if rows:
+                claimed[rows[0].id] = line
+            matches[line] = rows[0] if rows else None
+
+    pages = {
+        page.external_id: page
+        for page in kind.page_cls.objects.filter(external_id__in=[row.id for row in matches.values() if row])
+    }
+    galleries = load_galleries(kind.page_cls, [page.pk for page in pages.values()])
+
+    for line, row_id, fields in batch:
+        if line not in matches:
+            continue
+        row = matches[line]
+        page = pages.get(row.id) if row else None
+        values = _sync_values(kind, fields)
+        # Gallery của page nằm trong hash (core/sync.py: sync_state)
+        digest = state_digest(values, galleries.get(page.pk, []) if page else [])
+        page_stale = page is None or not page.live or any(
+            content_hash({"v": getattr(page, name)}) != content_hash({"v": value}) for name, value in fields.items()
+        )
+        if row is None:
+            changes = {name: (None, value) for name, value in values.items() if value is not None}
+            plans[line] = RowPlan(line, CREATE, fields, digest=digest, changes=changes, page_stale=True)
+            continue
+        changes = {
+            name: (getattr(row, name), value) for name, value in values.items()
+            if content_hash({"v": getattr(row, name)}) != content_hash({"v": value})
+        }
+        if not row.is_published:
+            changes["is_published"] = (False, True)
+        action = UPDATE if changes or row.content_hash != digest else UNCHANGED
+        plans[line] = RowPlan(line, action, fields, row.id, page.pk if page else None, digest, changes, page_stale)
+    return [plans[line] for line, _, _ in batch]
+
+
+# ---------- Ghi: COPY -> MERGE ----------
+
+STAGING = "catalog_import_staging"
+
+
+def _create_staging(cursor, kind):
+    columns = ", ".join(f"{name} {sql_type}" for name, sql_type in kind.columns.items())
+    cursor.execute(f"""
+        CREATE TEMP TABLE {STAGING} (
+            line INTEGER PRIMARY KEY,
+            target_id BIGINT,
+            page_id INTEGER,
+            write_row BOOLEAN NOT NULL,
+            content_hash VARCHAR(64) NOT NULL,
+            {columns}
+        ) ON COMMIT DROP
+    """)
+
+
+def _copy(cursor, kind, plans):
+    """COPY một lô RowPlan vào bảng tạm (CSV trong bộ nhớ, một lô mỗi lần)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for plan in plans:
+        writer.writerow([
+            plan.line, plan.target_id, plan.page_id, plan.action != UNCHANGED, plan.digest,
+            *(plan.fields.get(name) for name in kind.columns),
+        ])
+    sql = (f"COPY {STAGING} (line, target_id, page_id, write_row, content_hash, {', '.join(kind.columns)}) "
+           f"FROM STDIN WITH (FORMAT csv)")
+    raw = cursor.cursor
+    if hasattr(raw, "copy_expert"):  # psycopg2
+        buffer.seek(0)
+        raw.copy_expert(sql, buffer)
+    else:  # psycopg 3
+        with raw.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+
+
+def _merge(cursor, kind) -> int:
+    """Lấy id cho dòng mới rồi ghi mọi dòng write_row bằng một câu MERGE; trả về số dòng ghi."""
+    table = kind.model._meta.db_table
+    cursor.execute(f"""
+        UPDATE {STAGING} SET target_id = nextval(pg_get_serial_sequence(%s, 'id'))
+        WHERE target_id IS NULL
+    """, [table])
+    columns = list(kind.columns)
+    cursor.execute(f"""
+        MERGE INTO {table} AS t
+        USING (SELECT * FROM {STAGING} WHERE write_row) AS s ON t.id = s.target_id
+        WHEN MATCHED THEN UPDATE SET
+            {", ".join(f"{name} = s.{name}" for name in columns)},
+            content_hash = s.content_hash,
+            is_published = TRUE,
+            published_at = COALESCE(t.published_at, CURRENT_TIMESTAMP),
+            is_deleted = FALSE,
+            deleted_at = NULL,
+            updated_at = CURRENT_TIMESTAMP
+        WHEN NOT MATCHED THEN INSERT
+            (id, {", ".join(columns)}, content_hash, is_published, published_at, is_deleted, updated_at)
+        VALUES
+            (s.target_id, {", ".join(f"s.{name}" for name in columns)}, s.content_hash, TRUE,
+             CURRENT_TIMESTAMP, FALSE, CURRENT_TIMESTAMP)
+    """)
+    return cursor.rowcount
+
+
+def _staged_pages(cursor, kind, batch_size):
+    """Lô (target_id, page_id, fields) của các page cần tạo / sửa, đọc theo khoá line."""
+    columns = list(kind.columns)
+    last = 0
+    while True:
+        cursor.execute(f"""
+            SELECT line, target_id, page_id, {", ".join(columns)} FROM {STAGING}
+            WHERE line > %s ORDER BY line LIMIT %s
+        """, [last, batch_size])
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        last = rows[-1][0]
+        # COPY CSV đọc chuỗi rỗng thành NULL; field chữ trên page không nhận None
+        yield [
+            (target_id, page_id, {name: "" if value is None and kind.columns[name] == "TEXT" else value
+                                  for name, value in zip(columns, values)})
+            for _, target_id, page_id, *values in rows
+        ]
+
+
+# ---------- Page Wagtail ----------
+
+def default_parent(kind):
+    """Cha của page cùng loại gần nhất, không có thì trang gốc của site mặc định."""
+    latest = kind.page_cls.objects.order_by("-pk").first()
+    if latest is not None:
+        return latest.get_parent()
+    site = Site.objects.filter(is_default_site=True).select_related("root_page").first()
+    return site.root_page if site else Page.get_first_root_node()
+
+
+def sync_pages(kind, rows, parent, user=None) -> tuple:
+    """Tạo / sửa page cho một lô (target_id, page_id, fields) và publish; trả về (số tạo, số sửa).
+
+    Dòng SQL đã có content_hash khớp nên on_publish (core/sync.py) không ghi gì.
+    Mỗi page một save_revision().publish(): publish của Wagtail (treebeard path,
+    live_revision, log, signal) không có bản bulk, nên bước này là O(số page).
+    """
+    existing = kind.page_cls.objects.in_bulk([page_id for _, page_id, _ in rows if page_id])
+    created = updated = 0
+    for target_id, page_id, fields in rows:
+        page = existing.get(page_id)
+        if page is None:
+            page = kind.page_cls(title=fields["name"], external_id=target_id, **fields)
+            parent.add_child(instance=page)
+            created += 1
+        else:
+            for name, value in fields.items():
+                setattr(page, name, value)
+            updated += 1
+        page.save_revision(user=user).publish(user=user)
+    return created, updated
+
+
+# ---------- Chạy ----------
+
+def run(kind_name, fileobj, filename, dry_run=False, batch_size=500, sheet=None, parent=None, user=None,
+        diff_limit=None, on_batch: Callable = None) -> Report:
+    """Nhập một file; dry_run chỉ tính diff. on_batch(plans) được gọi sau mỗi lô (in tiến độ / diff)."""
+    kind = KINDS[kind_name]
+    report = Report(diff_limit)
+    if not dry_run and connection.vendor != "postgresql":
+        raise CatalogImportError("Nhập dữ liệu cần PostgreSQL (COPY + MERGE); dùng --dry-run để xem diff")
+
+    claimed = {}
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not dry_run:
+            _create_staging(cursor, kind)
+        for batch in _batches(validate(kind, read_rows(fileobj, filename, sheet)), batch_size):
+            plans = plan_batch(kind, batch, claimed)
+            report.add(plans)
+            if on_batch:
+                on_batch(plans)
+            staged = [plan for plan in plans if not plan.error and (plan.action != UNCHANGED or plan.page_stale)]
+            if not dry_run and not report.errors and staged:
+                _copy(cursor, kind, staged)
+        if dry_run or report.errors:
+            return report
+
+        report.written = _merge(cursor, kind)
+        parent = parent or default_parent(kind)
+        written = []
+        for rows in _staged_pages(cursor, kind, batch_size):
+            created, updated = sync_pages(kind, rows, parent, user)
+            report.pages_created += created
+            report.pages_updated += updated
+            written.extend((target_id, fields["name"]) for target_id, _, fields in rows)
+        refresh_derived_bulk(kind.page_cls, [kind.page_cls(external_id=pk, name=name) for pk, name in written])
+    return report
+
+
+# ---------- Chạy nền (trang admin) ----------
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _import_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Một luồng: các lượt nhập chạy lần lượt, không tranh nhau sequence / page
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-import")
+    return _executor
+
+
+_active = set()  # job id đang chờ / chạy trong process này
+_heartbeat = None
+
+
+def _job_key(job_id):
+    return f"catalog-import:{job_id}"
+
+
+def _heartbeat_key(job_id):
+    return f"catalog-import:{job_id}:heartbeat"
+
+
+def _beat(job_ids):
+    cache.set_many({_heartbeat_key(job_id): time.time() for job_id in job_ids}, settings.CATALOG_IMPORT_JOB_TIMEOUT)
+
+
+def _run_heartbeat():
+    while True:
+        time.sleep(settings.CATALOG_IMPORT_HEARTBEAT_SECONDS)
+        with _executor_lock:
+            job_ids = list(_active)
+        if job_ids:
+            try:
+                _beat(job_ids)
+            except Exception as e:
+                logger.warning(f"Catalog import heartbeat failed: {e}")
+
+
+def _ensure_heartbeat():
+    global _heartbeat
+    with _executor_lock:
+        if _heartbeat is None or not _heartbeat.is_alive():
+            _heartbeat = threading.Thread(target=_run_heartbeat, name="catalog-import-heartbeat", daemon=True)
+            _heartbeat.start()
+
+
+def job_status(job_id):
+    """{"state": running | done | failed, "kind", "document_id", "dry_run", "report" | "error"} hoặc None."""
+    job = cache.get(_job_key(job_id))
+    if job is not None and job["state"] == "running":
+        # Nhịp ghi riêng một key: không ghi đè kết quả mà run_job vừa lưu
+        beat = cache.get(_heartbeat_key(job_id))
+        if beat is None or time.time() - beat > settings.CATALOG_IMPORT_STALE_SECONDS:
+            return {**job, "state": "failed",
+                    "error": "Tiến trình nhập đã dừng giữa chừng (worker bị khởi động lại?), chưa ghi gì. Hãy chạy lại."}
+    return job
+
+
+def start(kind_name, document, dry_run=False, user=None) -> str:
+    """Chạy run() trên một Document ở luồng nền (CATALOG_IMPORT_BACKGROUND); trả về job id cho job_status."""
+    job_id = uuid.uuid4().hex
+    job = {"kind": kind_name, "document_id": document.pk, "dry_run": dry_run}
+    cache.set(_job_key(job_id), {**job, "state": "running"}, settings.CATALOG_IMPORT_JOB_TIMEOUT)
+    _beat([job_id])
+
+    def run_job():
+        try:
+            with document.open_file() as f:
+                report = run(kind_name, f, document.file.name, dry_run=dry_run, user=user, diff_limit=500)
+        except CatalogImportError as e:
+            result = {"state": "failed", "error": str(e)}
+        except Exception as e:
+            logger.exception(f"Catalog import {job_id} failed")
+            result = {"state": "failed", "error": f"Lỗi không mong đợi: {e}"}
+        else:
+            result = {"state": "done", "report": report}
+        cache.set(_job_key(job_id), {**job, **result}, settings.CATALOG_IMPORT_JOB_TIMEOUT)
+
+    if not settings.CATALOG_IMPORT_BACKGROUND:
+        run_job()
+        return job_id
+
+    def run_in_thread():
+        try:
+            run_job()
+        finally:
+            with _executor_lock:
+                _active.discard(job_id)
+            connection.close()
+
+    with _executor_lock:
+        _active.add(job_id)
+    _ensure_heartbeat()
+    _import_executor().submit(run_in_thread)
+    return job_id
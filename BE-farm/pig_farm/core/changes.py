@@ -0,0 +1,182 @@
+"""
+Đồng bộ delta cho client giữ bản sao catalog (/api/changes/?since=<token>).
+
+Trigger record_catalog_change (lệnh create_sql_tables) ghi vào catalog_changes
+một dòng cho mỗi lợn / thuốc / danh mục / tin tức, với seq lấy từ
+catalog_change_seq và xid của transaction ghi, mỗi khi dòng đó được insert /
+update / delete. Dòng được đọc theo (xid, seq); token "<xid>-<seq>" là vị trí
+cuối client đã nhận, một lần poll là range scan trên index (xid, seq) rồi đọc
+các dòng theo id.
+
+Transaction ghi catalog không khoá nhau nên commit lệch thứ tự seq. Poll chỉ
+trả dòng có xid < xmin của snapshot hiện tại (mọi transaction đó đã kết thúc);
+dòng của transaction đang chạy có xid >= xmin nên token dừng trước nó và lần
+poll sau vẫn thấy.
+
+Dòng còn hiển thị (is_published, chưa xoá) trả về đầy đủ như trong API danh
+sách; dòng đã unpublish, soft delete (is_deleted, deleted_at) hoặc không còn
+trong bảng (archive_deleted_rows, hard delete) trả về tombstone để client xoá.
+"""
+from django.db import connection
+from django.db.models import Max, Q
+
+from .renditions import largest_url, srcset_for
+from .sql_models import CatalogChange, CmsNewsEntry, Medicine, NewsCategory, Pig
+from .view_counter import view_counts
+
+
+class TokenExpired(Exception):
+    """Token kiểu cũ (chỉ seq) hoặc vượt quá dữ liệu hiện có (catalog_changes bị dựng lại): client tải lại toàn bộ."""
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _pig(pig, _):
+    return {
+        'id': pig.id,
+        'name': pig.name,
+        'price': float(pig.price) if pig.price else None,
+        'is_published': pig.is_published,
+        'published_at': _iso(pig.published_at),
+        'updated_at': _iso(pig.updated_at),
+    }
+
+
+def _medicine(medicine, _):
+    return {
+        'id': medicine.id,
+        'name': medicine.name,
+        'packaging': medicine.packaging,
+        'price_unit': float(medicine.price_unit) if medicine.price_unit else None,
+        'price_total': float(medicine.price_total) if medicine.price_total else None,
+        'is_published': medicine.is_published,
+        'published_at': _iso(medicine.published_at),
+        'updated_at': _iso(medicine.updated_at),
+    }
+
+
+def _category(category, _):
+    return {
+        'id': category.id,
+        'name': category.name,
+        'slug': category.slug,
+        'description': category.description,
+        'color': category.color,
+        'icon': category.icon,
+        'parent_id': category.parent_id,
+        'sort_order': category.sort_order,
+        'is_published': category.is_published,
+        'published_at': _iso(category.published_at),
+        'updated_at': _iso(category.updated_at),
+    }
+
+
+def _news(entry, extra):
+    counts, srcsets = extra
+    srcset = srcsets.get(entry.cover_image_id)
+    return {
+        'id': entry.id,
+        'title': entry.title,
+        'slug': entry.slug,
+        'summary': entry.summary,
+        'content': entry.get_content_text(),
+        'featured_image': largest_url(srcset),
+        'featured_image_srcset': srcset,
+        'author': entry.author_name,
+        'read_time': entry.get_read_time(),
+        'view_count': counts.get(entry.id, 0),
+        'tags': entry.get_tags_list(),
+        'is_published': entry.is_published,
+        'published_at': _iso(entry.published_at),
+        'updated_at': _iso(entry.updated_at),
+    }
+
+
+# entity trong catalog_changes -> (khoá trong response, queryset theo id, serializer)
+ENTITIES = {
+    'pig': ('pigs', lambda: Pig.objects.all(), _pig),
+    'medicine': ('medicines', lambda: Medicine.objects.all(), _medicine),
+    'category': ('categories', lambda: NewsCategory.objects.all(), _category),
+    'news': ('news', lambda: CmsNewsEntry.objects.filter(kind_id=2), _news),
+}
+
+
+def latest_seq() -> int:
+    return CatalogChange.objects.aggregate(top=Max('seq'))['top'] or 0
+
+
+def horizon() -> int:
+    """xmin của snapshot hiện tại: mọi transaction có xid nhỏ hơn đã kết thúc."""
+    if connection.vendor != 'postgresql':
+        # SQLite (test) không có xid; một writer nên mọi dòng đã ghi đều đọc được
+        return (CatalogChange.objects.aggregate(top=Max('xid'))['top'] or 0) + 1
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+        return cursor.fetchone()[0]
+
+
+def parse_token(value) -> tuple:
+    """"<xid>-<seq>" -> (xid, seq), rỗng -> (0, 0); sai định dạng -> ValueError."""
+    if not value:
+        return 0, 0
+    if value.isdigit():
+        raise TokenExpired(value)
+    xid, seq = (int(part) for part in value.split('-'))
+    if xid < 0 or seq < 0:
+        raise ValueError(value)
+    return xid, seq
+
+
+def _tombstone(pk, row):
+    if row is None:
+        return {'id': pk, 'reason': 'removed', 'deleted_at': None}
+    if row.is_deleted:
+        return {'id': pk, 'reason': 'deleted', 'deleted_at': _iso(row.deleted_at)}
+    return {'id': pk, 'reason': 'unpublished', 'deleted_at': None}
+
+
+def changes_since(since: tuple, limit: int) -> dict:
+    """Tối đa limit dòng sau vị trí since = (xid, seq), nhóm theo loại; next_token là vị trí đã đọc tới."""
+    since_xid, since_seq = since
+    top = horizon()
+    if since_xid > top or since_seq > latest_seq():
+        raise TokenExpired(since)
+
+    changes = list(
+        CatalogChange.objects
+        .filter(Q(xid__gt=since_xid) | Q(xid=since_xid, seq__gt=since_seq), xid__lt=top)
+        .order_by('xid', 'seq')
+        .values_list('entity', 'entity_id', 'xid', 'seq')[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    data = {key: {'changed': [], 'deleted': []} for key, _, _ in ENTITIES.values()}
+    for entity, (key, queryset, serialize) in ENTITIES.items():
+        ids = [entity_id for kind, entity_id, _, _ in changes if kind == entity]
+        if not ids:
+            continue
+        rows = queryset().in_bulk(ids)
+        extra = None
+        if entity == 'news':
+            extra = (view_counts(ids), srcset_for([row.cover_image_id for row in rows.values()]))
+        for pk in ids:
+            row = rows.get(pk)
+            if row is not None and row.is_published and not row.is_deleted:
+                data[key]['changed'].append(serialize(row, extra))
+            else:
+                data[key]['deleted'].append(_tombstone(pk, row))
+
+    if has_more:
+        next_token = changes[-1][2:]
+    else:
+        # Đọc hết: tiếp tục từ xmin (dòng của transaction đang chạy có xid >= top, seq >= 1)
+        next_token = (top, 0) if top > since_xid else since
+    return {
+        'data': data,
+        'next_token': '%d-%d' % next_token,
+        'has_more': has_more,
+    }
+
@@ -0,0 +1,131 @@
+"""
+Feed RSS 2.0 / Atom cho N tin tức mới nhất (/api/news/feed.xml, ?format=atom).
+
+Feed được render sẵn và giữ trong cache NEWS_FEED_CACHE_TIMEOUT giây: hook
+publish / unpublish / delete của tin tức (core/sync.py) render lại sau khi
+commit, nên request đọc không chạm DB. Hook chỉ ghi vào cache của process đã
+xử lý publish — với cache dùng chung (Redis, xem docker-compose) mọi worker thấy
+ngay; với LocMemCache các worker khác phục vụ bản cũ tối đa timeout rồi tự
+render lại. Cache hết hạn / bị xoá thì request đầu tiên render lại, các request
+đồng thời chờ chung (single_flight).
+
+Mỗi bản render kèm ETag (sha256 nội dung) và Last-Modified; feed reader gửi
+If-None-Match / If-Modified-Since được trả 304 rỗng. Last-Modified là lúc nội
+dung đổi lần cuối, lưu cùng payload trong cache và chỉ tăng: không dùng
+updated_at mới nhất vì gỡ tin mới nhất sẽ làm mốc lùi lại (304 sai).
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import http_date
+
+from .api_cache import single_flight
+from .sql_models import CmsNewsEntry
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "rss": Rss201rev2Feed,
+    "atom": Atom1Feed,
+}
+
+
+def _cache_key(fmt):
+    return f"news-feed:{fmt}"
+
+
+def latest_entries():
+    return list(
+        CmsNewsEntry.get_news_queryset().filter(is_published=True)
+        .order_by("-published_at", "-id")
+        .only("id", "slug", "title", "summary", "author_name", "published_at", "updated_at")
+        [:settings.NEWS_FEED_SIZE]
+    )
+
+
+def render(fmt, entries, previous=None) -> dict:
+    """Render feed; trả về dict content / etag / last_modified (epoch giây).
+
+    previous: payload đang cache. Nội dung không đổi thì giữ last_modified của nó,
+    đổi thì lấy thời điểm render (luôn lớn hơn mốc cũ).
+    """
+    base_url = settings.FRONTEND_BASE_URL.rstrip("/")
+    feed = FORMATS[fmt](
+        title=settings.NEWS_FEED_TITLE,
+        link=f"{base_url}/news",
+        description=settings.NEWS_FEED_TITLE,
+        language="vi",
+        feed_url=f"{base_url}/api/news/feed.xml" + ("?format=atom" if fmt == "atom" else ""),
+    )
+    for entry in entries:
+        link = base_url + entry.get_url()
+        feed.add_item(
+            title=entry.title,
+            link=link,
+            description=entry.summary or "",
+            unique_id=link,
+            author_name=entry.author_name or None,
+            pubdate=entry.published_at,
+            updateddate=entry.updated_at,
+        )
+    content = feed.writeString("utf-8").encode("utf-8")
+    etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+    if previous and previous["etag"] == etag:
+        last_modified = previous["last_modified"]
+    else:
+        # Last-Modified tính theo giây: hai lần đổi trong cùng một giây vẫn phải khác nhau
+        last_modified = max(int(time.time()), previous["last_modified"] + 1 if previous else 0)
+    return {
+        "content": content,
+        "content_type": feed.content_type,
+        "etag": etag,
+        "last_modified": last_modified,
+    }
+
+
+def rebuild() -> dict:
+    """Render lại mọi định dạng từ một truy vấn và ghi vào cache; trả về {format: payload}."""
+    entries = latest_entries()
+    previous = cache.get_many([_cache_key(fmt) for fmt in FORMATS])
+    payloads = {fmt: render(fmt, entries, previous.get(_cache_key(fmt))) for fmt in FORMATS}
+    cache.set_many({_cache_key(fmt): payload for fmt, payload in payloads.items()},
+                    settings.NEWS_FEED_CACHE_TIMEOUT)
+    return payloads
+
+
+def get(fmt) -> dict:
+    payload = cache.get(_cache_key(fmt))
+    if payload is None:
+        payload = single_flight("news-feed:rebuild", rebuild)[fmt]
+    return payload
+
+
+def schedule_rebuild():
+    """Sau khi transaction commit: render lại feed (lỗi thì xoá để request sau tự render)."""
+    def run():
+        try:
+            rebuild()
+        except Exception as e:
+            logger.warning(f"News feed rebuild failed: {e}")
+            cache.delete_many([_cache_key(fmt) for fmt in FORMATS])
+
+    transaction.on_commit(run)
+
+
+def feed_response(request, fmt) -> HttpResponse:
+    payload = get(fmt)
+    response = get_conditional_response(request, etag=payload["etag"], last_modified=payload["last_modified"])
+    if response is None:
+        response = HttpResponse(b"" if request.method == "HEAD" else payload["content"],
+                                content_type=payload["content_type"])
+    response["ETag"] = payload["etag"]
+    response["Last-Modified"] = http_date(payload["last_modified"])
+    patch_cache_control(response, public=True, max_age=settings.NEWS_FEED_MAX_AGE)
+    return response
@@ -0,0 +1,99 @@
+"""
+Gallery ảnh của sản phẩm cho API, gom trong MỘT query cho cả trang kết quả.
+
+- Thuốc: product_medicine_image (image_id Wagtail, sort)
+- Lợn:   product_pig_image (image_id Wagtail, sort) + các dòng pig_images
+         (PigImagePage) của con lợn đó, xếp sau ảnh gallery.
+
+Rendition sinh sẵn (image_renditions) được nhúng luôn vào từng ảnh.
+"""
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.db import connection
+
+from .renditions import RENDITION_FORMATS
+
+# Rendition của một ảnh Wagtail, sắp theo chiều rộng
+_RENDITIONS_SQL = """
+    (SELECT json_agg(json_build_object('format', r.format, 'url', r.url,
+                                       'width', r.width, 'height', r.height)
+                     ORDER BY r.width)
+       FROM image_renditions r WHERE r.image_id = i.id)
+"""
+
+_WAGTAIL_ITEMS_SQL = f"""
+    SELECT g.{{fk}} AS owner_id, 0 AS source, g.sort AS sort, i.id AS image_id,
+           i.title AS title, i.file AS file, NULL::text AS url,
+           i.width AS width, i.height AS height, NULL::text AS image_type,
+           {_RENDITIONS_SQL} AS renditions
+      FROM {{table}} g
+      JOIN wagtailimages_image i ON i.id = g.image_id
+     WHERE g.{{fk}} = ANY(%s::bigint[])
+"""
+
+_PIG_IMAGES_SQL = """
+    SELECT p.pig_id, 1, p.id::int, NULL::bigint, p.title, NULL::text, p.image_url,
+           p.width, p.height, p.image_type::text, NULL::json
+      FROM pig_images p
+     WHERE p.pig_id = ANY(%s::bigint[]) AND p.is_published AND NOT p.is_deleted
+"""
+
+GALLERY_SOURCES = {
+    "medicine": (_WAGTAIL_ITEMS_SQL.format(table="product_medicine_image", fk="medicine_id"),),
+    "pig": (_WAGTAIL_ITEMS_SQL.format(table="product_pig_image", fk="pig_id"), _PIG_IMAGES_SQL),
+}
+
+
+def _gallery_item(row: dict) -> dict:
+    """Một phần tử json_agg -> ảnh trả về cho frontend."""
+    srcset = {fmt: [] for fmt in RENDITION_FORMATS}
+    for rendition in row.get("renditions") or []:
+        fmt = rendition.pop("format")
+        if fmt in srcset:
+            srcset[fmt].append(rendition)
+    url = row.get("url") or (default_storage.url(row["file"]) if row.get("file") else None)
+    return {
+        "image_id": row.get("image_id"),
+        "title": row.get("title"),
+        "url": url,
+        "width": row.get("width"),
+        "height": row.get("height"),
+        "image_type": row.get("image_type"),
+        "srcset": srcset if any(srcset.values()) else None,
+    }
+
+
+def galleries_for(kind: str, owner_ids) -> dict:
+    """{owner_id: [ảnh theo thứ tự]} cho nhiều sản phẩm trong một query.
+
+    kind: 'medicine' | 'pig'. Sản phẩm không có ảnh sẽ không có key.
+    """
+    owner_ids = [owner_id for owner_id in owner_ids if owner_id]
+    if not owner_ids:
+        return {}
+    sources = GALLERY_SOURCES[kind]
+    union = "\nUNION ALL\n".join(sources)
+    sql = f"""
+        SELECT owner_id,
+               json_agg(json_build_object(
+                   'image_id', image_id, 'title', title, 'file', file, 'url', url,
+                   'width', width, 'height', height, 'image_type', image_type,
+                   'renditions', renditions
+               ) ORDER BY source, sort)
+          FROM ({union}) AS items(owner_id, source, sort, image_id, title, file, url,
+                                  width, height, image_type, renditions)
+         GROUP BY owner_id
+    """
+    result = defaultdict(list)
+    with connection.cursor() as cur:
+        cur.execute(sql, [owner_ids] * len(sources))
+        for owner_id, items in cur.fetchall():
+            result[owner_id] = [_gallery_item(item) for item in items]
+    return dict(result)
+
+
+def wants_images(request) -> bool:
+    """?include=images (có thể kèm giá trị khác, phân tách bằng dấu phẩy)."""
+    include = request.GET.get("include", "")
+    return "images" in {part.strip() for part in include.split(",")}
@@ -0,0 +1,21 @@
+import hashlib
+import json
+from decimal import Decimal
+
+
+def _normalize(value):
+    # 100, Decimal("100.00") và 100.0 phải ra cùng một hash
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return format(Decimal(str(value)).normalize(), "f")
+    return value
+
+
+def content_hash(values: dict) -> str:
+    """Hash ổn định (sha256 hex) của dữ liệu sẽ ghi sang SQL.
+
+    Dùng để bỏ qua các lần publish không đổi nội dung và để đối soát
+    Wagtail ↔ SQL. Số được chuẩn hoá, date/khác được đưa qua str().
+    """
+    normalized = {key: _normalize(value) for key, value in values.items()}
+    raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
@@ -0,0 +1,43 @@
+"""
+Management command để thêm cột content_hash vào các bảng SQL được đồng bộ từ Wagtail
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+
+# Các bảng nhận dữ liệu từ dispatcher trong core/sync.py
+SYNCED_TABLES = [
+    'product_medicine',
+    'product_pig',
+    'pig_images',
+    'news_categories',
+    'cms_content_entry',
+]
+
+
+class Command(BaseCommand):
+    help = 'Thêm cột content_hash (bỏ qua publish không đổi, đối soát Wagtail ↔ SQL)'
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔧 Bắt đầu thêm cột content_hash...")
+
+        try:
+            with connection.cursor() as cursor:
+                for i, table in enumerate(SYNCED_TABLES, 1):
+                    self.stdout.write(f"📝 Thực hiện lệnh {i}/{len(SYNCED_TABLES)}...")
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64) NULL;")
+                    self.stdout.write(
+                        self.style.SUCCESS(f"✅ Đã thêm content_hash cho bảng {table}")
+                    )
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f"❌ Lỗi khi thực hiện migration: {e}")
+            )
+            raise e
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "\n🎉 Hoàn thành! Lần publish đầu tiên sau đó sẽ ghi hash cho từng dòng."
+            )
+        )
@@ -0,0 +1,44 @@
+"""
+Management command tạo text search config 'vietnamese' cho Postgres
+"""
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = "Tạo text search config 'vietnamese' (unaccent + simple) cho search index Postgres"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reindex', action='store_true', help='Chạy wagtail_update_index sau khi tạo config')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Chỉ hỗ trợ PostgreSQL')
+
+        name = settings.WAGTAILSEARCH_BACKENDS['default'].get('SEARCH_CONFIG', 'vietnamese')
+        self.stdout.write(f"🔧 Tạo text search config '{name}'...")
+
+        with connection.cursor() as cursor:
+            # Postgres không có dictionary tiếng Việt: bỏ dấu (lợn ~ lon, đ ~ d) rồi
+            # tách từ theo 'simple' (không stemming, không stop word)
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS unaccent;")
+            cursor.execute("SELECT 1 FROM pg_ts_config WHERE cfgname = %s", [name])
+            if cursor.fetchone():
+                self.stdout.write(f"📋 Config '{name}' đã tồn tại, bỏ qua.")
+            else:
+                cursor.execute(f"CREATE TEXT SEARCH CONFIGURATION {name} (COPY = simple);")
+                cursor.execute(f"""
+                    ALTER TEXT SEARCH CONFIGURATION {name}
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple;
+                """)
+                self.stdout.write(self.style.SUCCESS(f"✅ Đã tạo config '{name}'"))
+
+        if options['reindex']:
+            # tsvector cũ được dựng bằng config khác -> phải dựng lại
+            self.stdout.write('🔄 Dựng lại search index...')
+            call_command('wagtail_update_index', stdout=self.stdout)
+        else:
+            self.stdout.write("ℹ️  Chạy 'python manage.py wagtail_update_index' để dựng lại index với config mới.")
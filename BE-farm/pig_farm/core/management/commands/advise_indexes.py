@@ -0,0 +1,164 @@
+"""
+Chạy EXPLAIN cho các query phía sau /api/ và đề xuất index còn thiếu.
+
+Mỗi query trong API_QUERIES dựng lại đúng queryset của view tương ứng trong
+core/views.py (filter published/deleted, order_by, search). Nếu plan còn Seq
+Scan hoặc Sort trên bảng chính, index đề xuất cho query đó được in ra; với
+--apply thì tạo bằng CREATE INDEX CONCURRENTLY (autocommit, ngoài transaction).
+Bảng partition (cms_content_entry sau partition_content_entry) không hỗ trợ
+CONCURRENTLY: index được tạo thường, khoá ghi bảng trong lúc build.
+"""
+import json
+from typing import Callable, NamedTuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.management.commands.partition_content_entry import is_partitioned
+from core.sql_models import CmsNewsEntry, Medicine, NewsCategory, Pig
+
+
+class IndexProposal(NamedTuple):
+    name: str
+    table: str
+    definition: str  # phần sau "ON table", ví dụ "(updated_at DESC) WHERE ..."
+    extension: str = None
+
+
+class ApiQuery(NamedTuple):
+    label: str
+    table: str
+    queryset: Callable
+    proposal: IndexProposal
+
+
+LIVE = "WHERE is_published AND NOT is_deleted"
+SAMPLE_SEARCH = "lợn"
+
+API_QUERIES = [
+    # api_medicines
+    ApiQuery(
+        "GET /api/medicines/", "product_medicine",
+        lambda: Medicine.objects.filter(is_published=True, is_deleted=False).order_by('-updated_at')[:20],
+        IndexProposal("idx_product_medicine_live_updated", "product_medicine", f"(updated_at DESC) {LIVE}"),
+    ),
+    ApiQuery(
+        "GET /api/medicines/?search=", "product_medicine",
+        lambda: Medicine.objects.filter(is_published=True, is_deleted=False, name__icontains=SAMPLE_SEARCH)
+        .order_by('-updated_at')[:20],
+        IndexProposal("idx_product_medicine_name_trgm", "product_medicine",
+                      f"USING gin (UPPER(name) gin_trgm_ops) {LIVE}", extension="pg_trgm"),
+    ),
+    # api_pigs
+    ApiQuery(
+        "GET /api/pigs/", "product_pig",
+        lambda: Pig.objects.filter(is_published=True, is_deleted=False).order_by('-updated_at')[:20],
+        IndexProposal("idx_product_pig_live_updated", "product_pig", f"(updated_at DESC) {LIVE}"),
+    ),
+    ApiQuery(
+        "GET /api/pigs/?search=", "product_pig",
+        lambda: Pig.objects.filter(is_published=True, is_deleted=False, name__icontains=SAMPLE_SEARCH)
+        .order_by('-updated_at')[:20],
+        IndexProposal("idx_product_pig_name_trgm", "product_pig",
+                      f"USING gin (UPPER(name) gin_trgm_ops) {LIVE}", extension="pg_trgm"),
+    ),
+    # api_news_articles
+    ApiQuery(
+        "GET /api/news/", "cms_content_entry",
+        lambda: CmsNewsEntry.get_news_queryset().filter(is_published=True)
+        .order_by('-published_at', '-created_at')[:20],
+        IndexProposal("idx_cms_content_entry_news_live", "cms_content_entry",
+                      f"(kind_id, published_at DESC, created_at DESC) {LIVE}"),
+    ),
+    ApiQuery(
+        "GET /api/news/?search=", "cms_content_entry",
+        lambda: CmsNewsEntry.get_news_queryset().filter(is_published=True, title__icontains=SAMPLE_SEARCH)
+        .order_by('-published_at', '-created_at')[:20],
+        IndexProposal("idx_cms_content_entry_title_trgm", "cms_content_entry",
+                      f"USING gin (UPPER(title) gin_trgm_ops) {LIVE}", extension="pg_trgm"),
+    ),
+    # api_news_categories
+    ApiQuery(
+        "GET /api/news/categories/", "news_categories",
+        lambda: NewsCategory.objects.filter(is_published=True, is_deleted=False).order_by('sort_order', 'name'),
+        IndexProposal("idx_news_categories_live_sort", "news_categories", f"(sort_order, name) {LIVE}"),
+    ),
+]
+
+
+def walk_plan(node, table):
+    """Các vấn đề trong plan JSON: Seq Scan trên `table` và Sort phía trên nó."""
+    issues = []
+    node_type = node.get("Node Type")
+    if node_type == "Seq Scan" and node.get("Relation Name") == table:
+        issues.append(f"Seq Scan on {table} (rows≈{node.get('Plan Rows')})")
+    elif node_type in ("Sort", "Incremental Sort"):
+        issues.append(f"{node_type} by {', '.join(node.get('Sort Key', []))}")
+    for child in node.get("Plans", []):
+        issues.extend(walk_plan(child, table))
+    return issues
+
+
+def create_index_sql(proposal: IndexProposal, concurrently=True) -> str:
+    # Postgres không cho CREATE INDEX CONCURRENTLY trên bảng cha của partition
+    mode = "CONCURRENTLY " if concurrently else ""
+    return f"CREATE INDEX {mode}IF NOT EXISTS {proposal.name} ON {proposal.table} {proposal.definition};"
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN các query của /api/, báo Seq Scan/Sort và đề xuất (hoặc tạo) index còn thiếu'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--apply', action='store_true', help='Tạo index đề xuất bằng CREATE INDEX CONCURRENTLY')
+        parser.add_argument('--analyze', action='store_true', help='Dùng EXPLAIN ANALYZE (chạy query thật)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Chỉ hỗ trợ PostgreSQL')
+        if options['apply'] and connection.in_atomic_block:
+            raise CommandError('CREATE INDEX CONCURRENTLY không chạy được trong transaction')
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()")
+            existing = {row[0] for row in cursor.fetchall()}
+            partitioned = {query.table for query in API_QUERIES if is_partitioned(cursor, query.table)}
+
+        proposals = []
+        for query in API_QUERIES:
+            plan = json.loads(query.queryset().explain(format='json', analyze=options['analyze']))[0]
+            root = plan['Plan']
+            cost = root.get('Total Cost')
+            timing = f", {plan['Execution Time']:.2f} ms" if 'Execution Time' in plan else ''
+            issues = walk_plan(root, query.table)
+
+            if not issues:
+                self.stdout.write(self.style.SUCCESS(f"✅ {query.label}: cost={cost}{timing}"))
+                continue
+
+            self.stdout.write(self.style.WARNING(f"⚠️  {query.label}: cost={cost}{timing}"))
+            for issue in issues:
+                self.stdout.write(f"   - {issue}")
+            if query.proposal.name in existing:
+                self.stdout.write(f"   📋 {query.proposal.name} đã có (bảng nhỏ nên planner chọn Seq Scan?)")
+            elif query.proposal not in proposals:
+                self.stdout.write(f"   💡 {create_index_sql(query.proposal, query.table not in partitioned)}")
+                proposals.append(query.proposal)
+
+        if not proposals:
+            self.stdout.write(self.style.SUCCESS('\n🎉 Không có index nào cần thêm.'))
+            return
+        if not options['apply']:
+            self.stdout.write(f"\nℹ️  {len(proposals)} index đề xuất. Chạy lại với --apply để tạo.")
+            return
+
+        self.stdout.write(f"\n🔨 Tạo {len(proposals)} index (CONCURRENTLY)...")
+        with connection.cursor() as cursor:
+            for proposal in proposals:
+                if proposal.extension:
+                    cursor.execute(f"CREATE EXTENSION IF NOT EXISTS {proposal.extension};")
+                # Autocommit: mỗi câu lệnh tự commit, không bọc transaction
+                if proposal.table in partitioned:
+                    self.stdout.write(f"   ⚠️  {proposal.table} là bảng partition: tạo index không CONCURRENTLY (khoá ghi)")
+                cursor.execute(create_index_sql(proposal, proposal.table not in partitioned))
+                self.stdout.write(self.style.SUCCESS(f"✅ {proposal.name}"))
+            cursor.execute("ANALYZE product_medicine, product_pig, cms_content_entry, news_categories;")
@@ -0,0 +1,194 @@
+"""
+Chuyển các dòng đã soft delete quá N ngày sang bảng <table>_archive.
+
+Mỗi lô là một transaction ngắn: DELETE ... RETURNING trên tối đa --batch-size
+dòng (FOR UPDATE SKIP LOCKED, không chờ dòng đang bị khoá) rồi INSERT vào bảng
+archive trong cùng câu lệnh. Bảng nóng và index của nó chỉ còn dữ liệu sống.
+
+View <table>_all = bảng nóng UNION ALL bảng archive (cột is_archived) để admin
+vẫn xem được mọi dòng (xem *All models trong sql_models và admin "Lưu trữ").
+create_sql_tables tạo sẵn bảng archive và view (rỗng) để admin chạy được trước
+lần archive đầu tiên.
+
+Dòng con (ARCHIVE_CHILDREN) được chuyển trong cùng câu lệnh với dòng cha:
+pig_images.pig_id là ON DELETE SET NULL, nên xoá lợn trước sẽ làm mất liên kết
+của ảnh cả ở bảng nóng lẫn trong archive.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.sync import refresh_group
+
+ARCHIVE_TABLES = ['product_medicine', 'product_pig', 'pig_images', 'cms_content_entry']
+
+# bảng cha -> [(bảng con, cột khoá ngoài, cột khoá của bảng con hoặc None)]
+ARCHIVE_CHILDREN = {
+    'product_medicine': [('product_medicine_image', 'medicine_id', None)],
+    'product_pig': [('pig_images', 'pig_id', 'id'), ('product_pig_image', 'pig_id', None)],
+}
+
+# bảng -> (nhóm cache /api/ / snapshot, cột id của dòng chi tiết bị ảnh hưởng)
+ARCHIVE_GROUPS = {
+    'product_medicine': ('medicine', 'id'),
+    'product_pig': ('pig', 'id'),
+    'pig_images': ('pig', 'pig_id'),
+    'cms_content_entry': ('news', 'id'),
+}
+
+
+def table_columns(cursor, table):
+    """[(tên cột, kiểu)] theo thứ tự khai báo."""
+    cursor.execute("""
+        SELECT attname, format_type(atttypid, atttypmod)
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+        ORDER BY attnum
+    """, [table])
+    return cursor.fetchall()
+
+
+def table_exists(cursor, table) -> bool:
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [table])
+    return cursor.fetchone()[0]
+
+
+def union_view_sql(table, names) -> str:
+    """View <table>_all: bảng nóng + archive, cột is_archived phân biệt."""
+    return f"""
+        CREATE VIEW {table}_all AS
+            SELECT {names}, FALSE AS is_archived FROM {table}
+            UNION ALL
+            SELECT {names}, TRUE AS is_archived FROM {table}_archive;
+    """
+
+
+def ensure_archive(cursor, table, key='id'):
+    """Tạo/cập nhật bảng archive và view union; trả về danh sách cột chung."""
+    archive = f'{table}_archive'
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {archive} (
+            LIKE {table},
+            archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    if key:
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {archive}_{key} ON {archive}({key});")
+
+    # Bảng nóng có thể đã thêm cột (vd. content_hash) sau khi archive được tạo
+    columns = table_columns(cursor, table)
+    archive_columns = {name for name, _ in table_columns(cursor, archive)}
+    for name, data_type in columns:
+        if name not in archive_columns:
+            cursor.execute(f'ALTER TABLE {archive} ADD COLUMN "{name}" {data_type};')
+
+    names = ', '.join(f'"{name}"' for name, _ in columns)
+    cursor.execute(f"DROP VIEW IF EXISTS {table}_all;")
+    cursor.execute(union_view_sql(table, names))
+    return names
+
+
+def ensure_children(cursor, table):
+    """[(bảng con, khoá ngoài, cột)] đang có trong DB, archive của chúng đã sẵn sàng."""
+    children = []
+    for child, fk, key in ARCHIVE_CHILDREN.get(table, []):
+        if table_exists(cursor, child):
+            children.append((child, fk, ensure_archive(cursor, child, key)))
+    return children
+
+
+def batch_ids_sql(table, lock=True) -> str:
+    """id của một lô dòng đã xoá trước mốc cutoff (tham số: cutoff, batch_size)."""
+    sql = f"""
+        SELECT id FROM {table}
+        WHERE is_deleted AND deleted_at < %s
+        ORDER BY id
+        LIMIT %s
+    """
+    # Không chờ dòng đang bị khoá (admin đang sửa): lô sau sẽ lấy
+    return sql + "FOR UPDATE SKIP LOCKED" if lock else sql
+
+
+def move_batch(cursor, table, names, cutoff, batch_size, children=(), returning='id'):
+    """Chuyển một lô cùng các dòng con của nó trong một câu lệnh; trả về cột `returning` của các dòng cha."""
+    # MATERIALIZED: mọi bước DELETE dùng đúng một lô đã khoá
+    steps = [f"batch AS MATERIALIZED ({batch_ids_sql(table)})"]
+    for i, (child, fk, child_names) in enumerate(children):
+        steps.append(f"""
+            moved_{i} AS (
+                DELETE FROM {child} WHERE {fk} IN (SELECT id FROM batch)
+                RETURNING {child_names}
+            ),
+            archived_{i} AS (
+                INSERT INTO {child}_archive ({child_names})
+                SELECT {child_names} FROM moved_{i}
+            )""")
+    steps.append(f"""
+        moved AS (
+            DELETE FROM {table} WHERE id IN (SELECT id FROM batch)
+            RETURNING {names}
+        )""")
+    cursor.execute(f"""
+        WITH {", ".join(steps)}
+        INSERT INTO {table}_archive ({names})
+        SELECT {names} FROM moved
+        RETURNING {returning}
+    """, [cutoff, batch_size])
+    return [row[0] for row in cursor.fetchall()]
+
+
+class Command(BaseCommand):
+    help = 'Chuyển dòng đã soft delete quá N ngày sang bảng archive theo lô nhỏ'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Chỉ chuyển dòng đã xoá lâu hơn số ngày này')
+        parser.add_argument('--batch-size', type=int, default=500, help='Số dòng mỗi transaction')
+        parser.add_argument('--pause', type=float, default=0.05, help='Nghỉ giữa các lô (giây)')
+        parser.add_argument('--table', choices=ARCHIVE_TABLES, action='append', dest='tables',
+                            help='Chỉ xử lý bảng này (có thể lặp lại); mặc định: tất cả')
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ đếm số dòng sẽ chuyển')
+        parser.add_argument('--vacuum', action='store_true', help='VACUUM ANALYZE bảng nóng sau khi chuyển')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Chỉ hỗ trợ PostgreSQL')
+
+        cutoff = timezone.now() - timezone.timedelta(days=options['days'])
+        tables = options['tables'] or ARCHIVE_TABLES
+        self.stdout.write(f"📦 Archive dòng xoá trước {cutoff:%Y-%m-%d %H:%M} (batch={options['batch_size']})...")
+
+        for table in tables:
+            with connection.cursor() as cursor:
+                if options['dry_run']:
+                    cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE is_deleted AND deleted_at < %s", [cutoff])
+                    self.stdout.write(f"🧪 {table}: {cursor.fetchone()[0]} dòng sẽ được chuyển")
+                    continue
+
+                with transaction.atomic():
+                    names = ensure_archive(cursor, table)
+                    children = ensure_children(cursor, table)
+
+                group, key = ARCHIVE_GROUPS[table]
+                total, affected = 0, set()
+                while True:
+                    # Mỗi lô một transaction ngắn -> khoá dòng chỉ trong thời gian rất ngắn
+                    with transaction.atomic():
+                        moved = move_batch(cursor, table, names, cutoff, options['batch_size'], children, key)
+                    total += len(moved)
+                    # pig_images.pig_id có thể NULL (ảnh không gắn lợn)
+                    affected.update(entity_id for entity_id in moved if entity_id is not None)
+                    if len(moved) < options['batch_size']:
+                        break
+                    time.sleep(options['pause'])
+
+                if affected:
+                    # Một lần cho cả bảng (autocommit: chạy ngay)
+                    refresh_group(group, affected)
+
+                self.stdout.write(self.style.SUCCESS(f"✅ {table}: đã chuyển {total} dòng sang {table}_archive"))
+
+                if options['vacuum'] and total:
+                    # VACUUM không chạy trong transaction; Django đang ở autocommit
+                    cursor.execute(f"VACUUM (ANALYZE) {table};")
@@ -0,0 +1,71 @@
+"""
+So sánh thời gian khởi động và RSS của một worker giữa profile đầy đủ
+(pig_farm.wsgi) và profile chỉ phục vụ /api/ (pig_farm.wsgi_api).
+
+Mỗi lần đo chạy một process Python mới: import module WSGI, nạp URLconf (như
+request đầu tiên), rồi ghi lại thời gian, RSS (VmRSS, chỉ Linux) và số module đã import.
+    python manage.py benchmark_startup --runs 10
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# profile -> (module WSGI, settings module)
+PROFILES = {
+    "full": ("pig_farm.wsgi", "pig_farm.settings.production"),
+    "api": ("pig_farm.wsgi_api", "pig_farm.settings.api"),
+}
+
+CHILD = """
+import importlib, json, sys, time
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+from django.urls import get_resolver
+get_resolver().url_patterns
+seconds = time.perf_counter() - started
+# VmRSS: ru_maxrss trên Linux giữ giá trị của process cha qua fork/exec
+rss_kb = next(int(line.split()[1]) for line in open("/proc/self/status") if line.startswith("VmRSS:"))
+print(json.dumps({"seconds": seconds, "rss_kb": rss_kb, "modules": len(sys.modules)}))
+"""
+
+
+def measure(wsgi_module, settings_module):
+    """Một lần khởi động trong process riêng; trả về dict seconds / rss_kb / modules."""
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module, "API_CACHE_WARM_ON_STARTUP": "False"}
+    result = subprocess.run([sys.executable, "-c", CHILD, wsgi_module], cwd=settings.BASE_DIR,
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise CommandError(f"{wsgi_module} ({settings_module}) lỗi khi khởi động:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = 'Đo thời gian khởi động và RSS mỗi worker: profile đầy đủ so với profile chỉ /api/'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Số lần khởi động mỗi profile (lấy trung vị)')
+
+    def handle(self, *args, **options):
+        runs = max(1, options['runs'])
+        summary = {}
+        for name, (wsgi_module, settings_module) in PROFILES.items():
+            samples = [measure(wsgi_module, settings_module) for _ in range(runs)]
+            summary[name] = {key: statistics.median(sample[key] for sample in samples)
+                             for key in ("seconds", "rss_kb", "modules")}
+            self.stdout.write(
+                f"📊 {name:<5} {wsgi_module:<18} khởi động {summary[name]['seconds'] * 1000:7.1f} ms  "
+                f"RSS {summary[name]['rss_kb'] / 1024:6.1f} MB  {summary[name]['modules']:.0f} module"
+            )
+
+        full, api = summary["full"], summary["api"]
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Profile api: nhanh hơn {(1 - api['seconds'] / full['seconds']) * 100:.0f}%, "
+            f"RSS ít hơn {(full['rss_kb'] - api['rss_kb']) / 1024:.1f} MB mỗi worker "
+            f"(trung vị {runs} lần)"
+        ))
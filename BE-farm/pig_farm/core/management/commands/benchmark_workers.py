@@ -0,0 +1,137 @@
+"""
+Đo bộ nhớ mỗi worker theo cách gunicorn.conf.py chạy app:
+
+    no-preload      mỗi worker tự import app sau khi fork (gunicorn mặc định)
+    preload         master import app rồi fork (preload_app)
+    preload-freeze  như trên + gc.freeze() trước khi fork (pig_farm/serving.py)
+
+Mỗi chế độ chạy một master riêng, fork N worker, mỗi worker xử lý vài request
+/api/ rồi gc.collect() (lúc GC ghi vào object là lúc trang chia sẻ bị copy).
+Khi mọi worker còn sống, master đọc /proc/<pid>/smaps_rollup (chỉ Linux):
+  - private (USS): bộ nhớ chỉ worker đó dùng = chi phí thêm một worker
+  - PSS: phần chia đều của trang dùng chung; tổng PSS = RAM thực của cả nhóm
+    python manage.py benchmark_workers --workers 4 --profile api
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .benchmark_startup import PROFILES
+
+MODES = ("no-preload", "preload", "preload-freeze")
+PATHS = ("/api/health/", "/api/pigs/", "/api/medicines/", "/api/news/", "/api/news/categories/")
+
+MASTER = """
+import gc, importlib, io, json, os, sys
+wsgi_module, mode, workers, requests, host = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), sys.argv[5]
+paths = sys.argv[6:]
+
+def smaps(pid):
+    values = {}
+    for line in open(f"/proc/{pid}/smaps_rollup"):
+        parts = line.split()
+        if len(parts) == 3 and parts[2] == "kB":
+            values[parts[0].rstrip(":")] = int(parts[1])
+    return {"rss_kb": values["Rss"], "pss_kb": values["Pss"],
+            "private_kb": values["Private_Clean"] + values["Private_Dirty"]}
+
+def serve(application):
+    for _ in range(requests):
+        for path in paths:
+            environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "", "SERVER_NAME": host,
+                       "SERVER_PORT": "80", "HTTP_HOST": host, "wsgi.input": io.BytesIO(), "wsgi.url_scheme": "http",
+                       "wsgi.errors": sys.stderr}
+            b"".join(application(environ, lambda status, headers, exc_info=None: None))
+    gc.collect()
+
+if mode != "no-preload":
+    gc.disable()
+    application = importlib.import_module(wsgi_module).application
+    from pig_farm.serving import before_fork
+    before_fork(freeze=mode == "preload-freeze")
+
+children = []
+for _ in range(workers):
+    ready_r, ready_w = os.pipe()
+    exit_r, exit_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Chỉ giữ đầu pipe của mình, để worker khác nhận EOF khi master đóng pipe của chúng
+        for fd in [ready_r, exit_w] + [fd for _, *fds in children for fd in fds]:
+            os.close(fd)
+        try:
+            if mode == "no-preload":
+                application = importlib.import_module(wsgi_module).application
+            else:
+                gc.enable()
+            serve(application)
+            os.write(ready_w, b"1")
+            os.read(exit_r, 1)
+        finally:
+            os._exit(0)
+    os.close(ready_w)
+    os.close(exit_r)
+    children.append((pid, ready_r, exit_w))
+
+for pid, ready_r, _ in children:
+    if os.read(ready_r, 1) != b"1":
+        sys.exit(f"worker {pid} lỗi")
+result = {"master": smaps(os.getpid()), "workers": [smaps(pid) for pid, _, _ in children]}
+for pid, _, exit_w in children:
+    os.close(exit_w)
+    os.waitpid(pid, 0)
+print(json.dumps(result))
+"""
+
+
+def measure(wsgi_module, settings_module, mode, workers, requests):
+    """Chạy một master + N worker theo mode; trả về dict master / workers (rss_kb, pss_kb, private_kb)."""
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module, "API_CACHE_WARM_ON_STARTUP": "False"}
+    env.setdefault("SECRET_KEY", "benchmark-workers")
+    host = (settings.ALLOWED_HOSTS or ["localhost"])[0].lstrip(".").replace("*", "localhost")
+    result = subprocess.run(
+        [sys.executable, "-c", MASTER, wsgi_module, mode, str(workers), str(requests), host, *PATHS],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise CommandError(f"{mode} ({settings_module}) lỗi:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = 'Đo bộ nhớ mỗi worker (USS/PSS) khi không preload, preload và preload + gc.freeze()'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=sorted(PROFILES), default='api')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=20, help='Số vòng request mỗi worker trước khi đo')
+
+    def handle(self, *args, **options):
+        if not os.path.exists("/proc/self/smaps_rollup"):
+            raise CommandError("Cần Linux (/proc/<pid>/smaps_rollup)")
+        wsgi_module, settings_module = PROFILES[options['profile']]
+        workers = max(1, options['workers'])
+        self.stdout.write(f"📊 {wsgi_module}, {workers} worker, {options['requests']} vòng {len(PATHS)} request")
+
+        totals = {}
+        for mode in MODES:
+            result = measure(wsgi_module, settings_module, mode, workers, options['requests'])
+            private = statistics.median(worker["private_kb"] for worker in result["workers"])
+            rss = statistics.median(worker["rss_kb"] for worker in result["workers"])
+            totals[mode] = result["master"]["pss_kb"] + sum(worker["pss_kb"] for worker in result["workers"])
+            self.stdout.write(
+                f"   {mode:<15} worker: private {private / 1024:6.1f} MB  RSS {rss / 1024:6.1f} MB  │  "
+                f"tổng PSS (master + {workers}) {totals[mode] / 1024:6.1f} MB"
+            )
+
+        saved = totals["no-preload"] - totals["preload-freeze"]
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ preload + gc.freeze tiết kiệm {saved / 1024:.1f} MB "
+            f"({saved / totals['no-preload'] * 100:.0f}%) so với không preload"
+        ))
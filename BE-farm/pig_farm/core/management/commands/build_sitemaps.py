@@ -0,0 +1,27 @@
+"""
+Dựng lại toàn bộ sitemap tĩnh (xem core/sitemaps.py).
+
+Sau đó hook publish tự ghi lại đúng shard bị đổi; chạy lại lệnh này sau khi
+import hàng loạt hoặc khi đổi SITEMAP_BASE_URL / SITEMAP_SHARD_SIZE:
+    python manage.py build_sitemaps
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Dựng lại sitemap.xml và các shard (lợn, thuốc, tin tức đã publish)'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        counts = sitemaps.rebuild()
+        for section, count in counts.items():
+            self.stdout.write(f"🗺️  {section}: {count} URL")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(sitemaps.shard_files())} shard trong {settings.SITEMAP_ROOT} "
+            f"({time.monotonic() - started:.2f}s)"
+        ))
@@ -0,0 +1,26 @@
+"""
+Tính lại điểm trending tin tức (news_trending_scores) từ lượt xem theo giờ.
+
+Chạy theo lịch, ví dụ cron mỗi 15 phút:
+    */15 * * * * python manage.py compute_trending_scores
+Mỗi lần chỉ đọc các bucket mới đóng kể từ lần trước (xem core/trending.py).
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import view_counter
+from core.trending import recompute
+
+
+class Command(BaseCommand):
+    help = 'Tính lại điểm trending tin tức (giảm dần theo hàm mũ trên lượt xem theo giờ)'
+
+    def handle(self, *args, **options):
+        # Lượt xem do chính process này giữ (nếu có) được ghi trước khi tính
+        view_counter.flush()
+        started = time.monotonic()
+        count = recompute()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Đã cập nhật điểm trending cho {count} bài ({time.monotonic() - started:.2f}s)"
+        ))
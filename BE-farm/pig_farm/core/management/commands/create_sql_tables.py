@@ -1,9 +1,20 @@
 from django.core.management.base import BaseCommand
 from django.db import connection, transaction
 
+from core.management.commands.archive_deleted_rows import ARCHIVE_TABLES, ensure_archive, ensure_children
+
+
+# Bảng nguồn -> (entity trong catalog_changes, kind_id cần lọc)
+CATALOG_CHANGE_SOURCES = {
+    'product_pig': ('pig', None),
+    'product_medicine': ('medicine', None),
+    'news_categories': ('category', None),
+    'cms_content_entry': ('news', 2),
+}
+
 
 class Command(BaseCommand):
-    help = 'Tạo các bảng SQL cần thiết cho PigImage và NewsCategory'
+    help = 'Tạo các bảng SQL cần thiết cho PigImage, NewsCategory, ImageRendition, lượt xem, điểm trending và nhật ký thay đổi'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -27,6 +38,18 @@ class Command(BaseCommand):
                     
                     # Kiểm tra và tạo bảng news_categories
                     self.create_news_categories_table(cursor, force)
+
+                    # Kiểm tra và tạo bảng image_renditions
+                    self.create_image_renditions_table(cursor, force)
+
+                    # Kiểm tra và tạo bảng news_view_counters
+                    self.create_news_view_counters_table(cursor, force)
+
+                    # Kiểm tra và tạo bảng lượt xem theo giờ + điểm trending
+                    self.create_trending_tables(cursor, force)
+
+                    # Kiểm tra và tạo bảng catalog_changes (/api/changes/)
+                    self.create_catalog_changes_table(cursor, force)
                     
                     # Tạo indexes
                     self.create_indexes(cursor)
@@ -34,6 +57,12 @@ class Command(BaseCommand):
                     # Tạo triggers
                     self.create_triggers(cursor)
 
+                    # Ghi seq cho các dòng đã có trước khi có trigger
+                    self.backfill_catalog_changes(cursor)
+
+                    # Bảng archive + view <table>_all cho admin "Lưu trữ (SQL)"
+                    self.create_archive_tables(cursor)
+
             self.stdout.write(
                 self.style.SUCCESS('✅ Tất cả bảng đã được tạo thành công!')
             )
@@ -139,6 +168,134 @@ class Command(BaseCommand):
 
         self.stdout.write(f'✅ Bảng {table_name} đã được tạo')
 
+    def create_image_renditions_table(self, cursor, force):
+        """Tạo bảng image_renditions (rendition sinh sẵn khi publish)"""
+        table_name = 'image_renditions'
+
+        if self.table_exists(cursor, table_name):
+            if force:
+                self.stdout.write(f'🗑️  Xóa bảng {table_name} hiện có...')
+                cursor.execute(f'DROP TABLE IF EXISTS {table_name} CASCADE;')
+            else:
+                # Bảng tạo trước khi có cột file_hash: rendition cũ sẽ được sinh lại một lần
+                cursor.execute("ALTER TABLE image_renditions ADD COLUMN IF NOT EXISTS file_hash VARCHAR(40) NOT NULL DEFAULT '';")
+                self.stdout.write(f'📋 Bảng {table_name} đã tồn tại, bỏ qua.')
+                return
+
+        self.stdout.write(f'🔨 Tạo bảng {table_name}...')
+
+        cursor.execute("""
+            CREATE TABLE image_renditions (
+                id BIGSERIAL PRIMARY KEY,
+                image_id BIGINT NOT NULL,
+                spec TEXT NOT NULL,
+                format VARCHAR(10) NOT NULL,
+                url TEXT NOT NULL,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                file_hash VARCHAR(40) NOT NULL DEFAULT '',
+                created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (image_id, spec)
+            );
+        """)
+
+        self.stdout.write(f'✅ Bảng {table_name} đã được tạo')
+
+    def create_news_view_counters_table(self, cursor, force):
+        """Tạo bảng news_view_counters (lượt xem tin tức, flush theo lô)"""
+        table_name = 'news_view_counters'
+
+        if self.table_exists(cursor, table_name):
+            if force:
+                self.stdout.write(f'🗑️  Xóa bảng {table_name} hiện có...')
+                cursor.execute(f'DROP TABLE IF EXISTS {table_name} CASCADE;')
+            else:
+                self.stdout.write(f'📋 Bảng {table_name} đã tồn tại, bỏ qua.')
+                return
+
+        self.stdout.write(f'🔨 Tạo bảng {table_name}...')
+
+        # Không FK tới cms_content_entry: bảng đó có thể là bảng partition (PK gồm kind_id)
+        cursor.execute("""
+            CREATE TABLE news_view_counters (
+                entry_id BIGINT PRIMARY KEY,
+                view_count BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+
+        self.stdout.write(f'✅ Bảng {table_name} đã được tạo')
+
+    def create_trending_tables(self, cursor, force):
+        """Tạo bảng news_view_hourly và news_trending_scores (core/trending.py)"""
+        for table_name, ddl in (
+            ('news_view_hourly', """
+                CREATE TABLE news_view_hourly (
+                    entry_id BIGINT NOT NULL,
+                    bucket_hour TIMESTAMP WITH TIME ZONE NOT NULL,
+                    views INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (entry_id, bucket_hour)
+                );
+            """),
+            ('news_trending_scores', """
+                CREATE TABLE news_trending_scores (
+                    entry_id BIGINT PRIMARY KEY,
+                    score DOUBLE PRECISION NOT NULL,
+                    base_score DOUBLE PRECISION NOT NULL,
+                    base_hour TIMESTAMP WITH TIME ZONE NOT NULL,
+                    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+                );
+            """),
+        ):
+            if self.table_exists(cursor, table_name):
+                if force:
+                    self.stdout.write(f'🗑️  Xóa bảng {table_name} hiện có...')
+                    cursor.execute(f'DROP TABLE IF EXISTS {table_name} CASCADE;')
+                else:
+                    self.stdout.write(f'📋 Bảng {table_name} đã tồn tại, bỏ qua.')
+                    continue
+
+            self.stdout.write(f'🔨 Tạo bảng {table_name}...')
+            cursor.execute(ddl)
+            self.stdout.write(f'✅ Bảng {table_name} đã được tạo')
+
+    def create_catalog_changes_table(self, cursor, force):
+        """Tạo bảng catalog_changes + sequence catalog_change_seq (core/changes.py)"""
+        table_name = 'catalog_changes'
+
+        if self.table_exists(cursor, table_name):
+            if force:
+                self.stdout.write(f'🗑️  Xóa bảng {table_name} hiện có...')
+                cursor.execute(f'DROP TABLE IF EXISTS {table_name} CASCADE;')
+                cursor.execute('DROP SEQUENCE IF EXISTS catalog_change_seq;')
+            else:
+                # Bảng tạo trước khi có cột xid: dòng cũ có xid 0, token cũ (chỉ seq) nhận 410 và đồng bộ lại
+                cursor.execute("""
+                    ALTER TABLE catalog_changes ADD COLUMN IF NOT EXISTS xid BIGINT NOT NULL DEFAULT 0;
+                    CREATE INDEX IF NOT EXISTS idx_catalog_changes_xid_seq ON catalog_changes(xid, seq);
+                """)
+                self.stdout.write(f'📋 Bảng {table_name} đã tồn tại, bỏ qua.')
+                return
+
+        self.stdout.write(f'🔨 Tạo bảng {table_name}...')
+
+        # Một dòng cho mỗi (entity, entity_id): thay đổi lại chỉ đổi seq, bảng không phình theo số lần sửa.
+        # xid = transaction đã ghi dòng; (xid, seq) là thứ tự đọc của /api/changes/ (xem core/changes.py).
+        cursor.execute("""
+            CREATE SEQUENCE IF NOT EXISTS catalog_change_seq;
+            CREATE TABLE catalog_changes (
+                entity VARCHAR(20) NOT NULL,
+                entity_id BIGINT NOT NULL,
+                seq BIGINT NOT NULL UNIQUE,
+                xid BIGINT NOT NULL DEFAULT 0,
+                changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (entity, entity_id)
+            );
+            CREATE INDEX idx_catalog_changes_xid_seq ON catalog_changes(xid, seq);
+        """)
+
+        self.stdout.write(f'✅ Bảng {table_name} đã được tạo')
+
     def create_indexes(self, cursor):
         """Tạo indexes để tăng performance"""
         self.stdout.write('🔍 Tạo indexes...')
@@ -155,10 +312,27 @@ class Command(BaseCommand):
             "CREATE INDEX IF NOT EXISTS idx_news_categories_slug ON news_categories(slug);",
             "CREATE INDEX IF NOT EXISTS idx_news_categories_published ON news_categories(is_published);",
             "CREATE INDEX IF NOT EXISTS idx_news_categories_sort ON news_categories(sort_order);",
+
+            # Image renditions indexes
+            "CREATE INDEX IF NOT EXISTS idx_image_renditions_image ON image_renditions(image_id, width);",
+
+            # Xếp hạng tin tức: ?sort=popular / ?sort=trending là index scan
+            "CREATE INDEX IF NOT EXISTS idx_news_view_counters_popular ON news_view_counters(view_count DESC, entry_id);",
+            "CREATE INDEX IF NOT EXISTS idx_news_trending_scores_score ON news_trending_scores(score DESC, entry_id);",
+            "CREATE INDEX IF NOT EXISTS idx_news_view_hourly_bucket ON news_view_hourly(bucket_hour);",
         ]
         
         for index_sql in indexes:
             cursor.execute(index_sql)
+
+        # Bảng nối gallery do script SQL gốc tạo; index (owner, sort) cho API gallery
+        gallery_indexes = {
+            'product_medicine_image': "CREATE INDEX IF NOT EXISTS idx_product_medicine_image_sort ON product_medicine_image(medicine_id, sort);",
+            'product_pig_image': "CREATE INDEX IF NOT EXISTS idx_product_pig_image_sort ON product_pig_image(pig_id, sort);",
+        }
+        for table_name, index_sql in gallery_indexes.items():
+            if self.table_exists(cursor, table_name):
+                cursor.execute(index_sql)
         
         self.stdout.write('✅ Indexes đã được tạo')
 
@@ -192,5 +366,67 @@ class Command(BaseCommand):
         
         for trigger_sql in triggers:
             cursor.execute(trigger_sql)
+
+        self.create_catalog_change_triggers(cursor)
         
-        self.stdout.write('✅ Triggers đã được tạo')
\ No newline at end of file
+        self.stdout.write('✅ Triggers đã được tạo')
+
+    def create_catalog_change_triggers(self, cursor):
+        """Trigger ghi catalog_changes khi lợn / thuốc / danh mục / tin tức thay đổi"""
+        # Không khoá gì ngoài dòng catalog_changes: transaction ghi song song vẫn chạy song song.
+        # Thứ tự commit không cần khớp seq; dòng của transaction chưa xong có xid >= xmin của
+        # snapshot, nên core/changes.py giữ token lại cho tới khi transaction đó kết thúc.
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION record_catalog_change()
+            RETURNS TRIGGER AS $$
+            DECLARE
+                row_data JSONB := to_jsonb(CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END);
+            BEGIN
+                IF TG_NARGS > 1 AND row_data->>'kind_id' IS DISTINCT FROM TG_ARGV[1] THEN
+                    RETURN NULL;
+                END IF;
+                INSERT INTO catalog_changes (entity, entity_id, seq, xid, changed_at)
+                VALUES (TG_ARGV[0], (row_data->>'id')::BIGINT, nextval('catalog_change_seq'),
+                        pg_current_xact_id()::text::BIGINT, CURRENT_TIMESTAMP)
+                ON CONFLICT (entity, entity_id)
+                DO UPDATE SET seq = EXCLUDED.seq, xid = EXCLUDED.xid, changed_at = EXCLUDED.changed_at;
+                RETURN NULL;
+            END;
+            $$ language 'plpgsql';
+        """)
+
+        # Bảng gốc do script SQL tạo; chạy lại lệnh này sau partition_content_entry để gắn lại trigger
+        for table_name, (entity, kind_id) in CATALOG_CHANGE_SOURCES.items():
+            if not self.table_exists(cursor, table_name):
+                continue
+            args = f"'{entity}'" + (f", '{kind_id}'" if kind_id is not None else "")
+            cursor.execute(f"DROP TRIGGER IF EXISTS record_{table_name}_change ON {table_name};")
+            cursor.execute(f"""
+                CREATE TRIGGER record_{table_name}_change
+                AFTER INSERT OR UPDATE OR DELETE ON {table_name}
+                FOR EACH ROW EXECUTE FUNCTION record_catalog_change({args});
+            """)
+
+    def create_archive_tables(self, cursor):
+        """Tạo bảng <table>_archive và view <table>_all (rỗng) để admin "Lưu trữ" chạy ngay từ lần cài đầu"""
+        for table_name in ARCHIVE_TABLES:
+            if not self.table_exists(cursor, table_name):
+                continue
+            ensure_archive(cursor, table_name)
+            ensure_children(cursor, table_name)
+        self.stdout.write('✅ Bảng archive và view *_all đã sẵn sàng')
+
+    def backfill_catalog_changes(self, cursor):
+        """Thêm các dòng chưa có trong catalog_changes (lần đầu cài trigger), theo thứ tự updated_at"""
+        for table_name, (entity, kind_id) in CATALOG_CHANGE_SOURCES.items():
+            if not self.table_exists(cursor, table_name):
+                continue
+            where = f"WHERE kind_id = {int(kind_id)}" if kind_id is not None else ""
+            cursor.execute(f"""
+                INSERT INTO catalog_changes (entity, entity_id, seq, xid, changed_at)
+                SELECT %s, id, nextval('catalog_change_seq'), pg_current_xact_id()::text::BIGINT, CURRENT_TIMESTAMP
+                FROM (SELECT id FROM {table_name} {where} ORDER BY updated_at, id) AS source
+                ON CONFLICT (entity, entity_id) DO NOTHING;
+            """, [entity])
+            if cursor.rowcount:
+                self.stdout.write(f'📝 catalog_changes: thêm {cursor.rowcount} dòng {entity}')
\ No newline at end of file
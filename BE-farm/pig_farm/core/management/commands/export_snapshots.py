@@ -0,0 +1,27 @@
+"""
+Dựng lại toàn bộ snapshot JSON tĩnh của /api/ (xem core/snapshots.py).
+
+Sau đó hook publish tự cập nhật nhóm bị đổi; chạy lại lệnh này sau khi import
+hàng loạt hoặc khi đổi định dạng response:
+    python manage.py export_snapshots
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Xuất snapshot JSON tĩnh (danh sách, danh mục, chi tiết đã publish) cho nginx'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        counts = snapshots.export_all()
+        for group, count in counts.items():
+            self.stdout.write(f"📦 {group}: {count} file")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {snapshots.current_dir()} ({time.monotonic() - started:.2f}s)"
+        ))
+        self.stdout.write(f"   nginx đọc qua {settings.SNAPSHOT_ROOT}/{snapshots.CURRENT}")
@@ -0,0 +1,78 @@
+"""
+Nhập bảng giá lợn / thuốc từ CSV hoặc XLSX (xem core/catalog_import.py).
+
+Cột: name (hoặc "Tên"), với lợn: price ("Giá"); với thuốc: packaging ("Quy cách"),
+price_unit ("Đơn giá"), price_total ("Thành tiền"). Cột id ("Mã") tuỳ chọn: có id
+thì sửa đúng dòng đó, không có thì khớp theo tên, không khớp thì tạo mới.
+    python manage.py import_catalog bang-gia.xlsx --kind medicine --dry-run
+    python manage.py import_catalog bang-gia.xlsx --kind medicine
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from wagtail.models import Page
+
+from core import catalog_import
+
+
+class Command(BaseCommand):
+    help = 'Nhập lợn / thuốc từ CSV hoặc XLSX: COPY vào bảng tạm, MERGE một lần, tạo / sửa page Wagtail theo lô'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File .csv hoặc .xlsx')
+        parser.add_argument('--kind', choices=sorted(catalog_import.KINDS), required=True)
+        parser.add_argument('--sheet', help='Tên sheet (XLSX); mặc định sheet đang mở')
+        parser.add_argument('--parent', type=int, help='id page cha cho page mới; mặc định cha của page cùng loại')
+        parser.add_argument('--batch-size', type=int, default=500, help='Số dòng mỗi lô')
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ in diff, không ghi gì')
+
+    def handle(self, *args, **options):
+        parent = None
+        if options['parent']:
+            parent = Page.objects.filter(pk=options['parent']).first()
+            if parent is None:
+                raise CommandError(f"Không có page id={options['parent']}")
+
+        verbose = options['dry_run'] or options['verbosity'] > 1
+        started = time.monotonic()
+        try:
+            with open(options['path'], 'rb') as f:
+                report = catalog_import.run(
+                    options['kind'], f, options['path'],
+                    dry_run=options['dry_run'],
+                    batch_size=max(1, options['batch_size']),
+                    sheet=options['sheet'],
+                    parent=parent,
+                    on_batch=self.print_diff if verbose else None,
+                )
+        except (OSError, catalog_import.CatalogImportError) as e:
+            raise CommandError(str(e))
+
+        counts = report.counts
+        self.stdout.write(
+            f"📋 {counts['create']} tạo mới, {counts['update']} cập nhật, "
+            f"{counts['unchanged']} không đổi, {len(report.errors)} lỗi"
+        )
+        if report.errors:
+            for line, message in report.errors[:50]:
+                self.stdout.write(self.style.ERROR(f"   ❌ dòng {line}: {message}"))
+            if len(report.errors) > 50:
+                self.stdout.write(self.style.ERROR(f"   ... và {len(report.errors) - 50} lỗi khác"))
+            raise CommandError("File có lỗi, không ghi gì.")
+
+        if options['dry_run']:
+            self.stdout.write("🧪 Dry-run: không ghi gì.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ MERGE {report.written} dòng, tạo {report.pages_created} page, sửa {report.pages_updated} page "
+            f"({time.monotonic() - started:.2f}s)"
+        ))
+
+    def print_diff(self, plans):
+        for plan in plans:
+            if plan.error or plan.action == catalog_import.UNCHANGED:
+                continue
+            marker = "+" if plan.action == catalog_import.CREATE else "~"
+            changes = ", ".join(f"{name}: {old} → {new}" for name, (old, new) in plan.changes.items())
+            target = f"#{plan.target_id}" if plan.target_id else "mới"
+            self.stdout.write(f"   {marker} dòng {plan.line} {plan.fields['name']} ({target}): {changes or 'đồng bộ page'}")
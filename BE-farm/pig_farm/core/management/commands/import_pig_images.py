@@ -0,0 +1,247 @@
+"""
+Nhập hàng loạt ảnh lợn từ thư mục hoặc file .zip.
+
+Hash, giải mã và đọc metadata chạy song song trên process pool; sau đó tạo
+Image Wagtail và dòng pig_images bằng bulk_create. File CSV (filename,pig_id
+[,image_type,title,description]) quyết định ảnh thuộc con lợn nào.
+"""
+import csv
+import hashlib
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from wagtail.images import get_image_model
+from wagtail.models import Collection
+from wagtail.search.backends import get_search_backend
+
+from core import sql_models
+from core.renditions import schedule_renditions
+from core.sync import refresh_group
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+IMAGE_TYPES = {'main', 'gallery', 'thumbnail', 'profile'}
+# Số ảnh mỗi lần gửi sang process con (mỗi chunk mở zip một lần)
+CHUNK_SIZE = 50
+
+
+@contextmanager
+def open_source(source):
+    """Hàm read(name) -> bytes; zip chỉ mở (đọc central directory) một lần."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            yield archive.read
+        return
+
+    def read(name):
+        with open(os.path.join(source, name), 'rb') as f:
+            return f.read()
+    yield read
+
+
+def inspect_image(read, name):
+    """SHA-1 (giống Image.file_hash), giải mã đầy đủ và kích thước của một ảnh."""
+    from PIL import Image as PILImage
+
+    try:
+        data = read(name)
+        with PILImage.open(io.BytesIO(data)) as img:
+            img.load()  # Giải mã hết để loại file hỏng ngay từ đầu
+            width, height = img.size
+        return {
+            'name': name,
+            'hash': hashlib.sha1(data).hexdigest(),
+            'size': len(data),
+            'width': width,
+            'height': height,
+            'error': None,
+        }
+    except Exception as e:
+        return {'name': name, 'error': str(e)}
+
+
+def inspect_chunk(source, names):
+    """Chạy trong process con: kiểm tra một chunk ảnh với một lần mở nguồn."""
+    with open_source(source) as read:
+        return [inspect_image(read, name) for name in names]
+
+
+def list_images(source):
+    """Tên file ảnh (tương đối với thư mục hoặc trong zip), đã sắp xếp."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            names = [n for n in archive.namelist() if not n.endswith('/')]
+    elif os.path.isdir(source):
+        names = [
+            os.path.relpath(os.path.join(root, f), source)
+            for root, _, files in os.walk(source) for f in files
+        ]
+    else:
+        raise CommandError(f"{source} không phải thư mục hoặc file zip")
+    return sorted(n for n in names if os.path.splitext(n)[1].lower() in IMAGE_EXTENSIONS)
+
+
+def load_mapping(path):
+    """{filename: {'pig_id', 'image_type', 'title', 'description'}} từ CSV."""
+    mapping = {}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            filename = (row.get('filename') or '').strip()
+            if not filename:
+                continue
+            try:
+                pig_id = int(row['pig_id'])
+            except (KeyError, TypeError, ValueError):
+                raise CommandError(f"CSV dòng {line}: pig_id không hợp lệ")
+            image_type = (row.get('image_type') or 'gallery').strip()
+            if image_type not in IMAGE_TYPES:
+                raise CommandError(f"CSV dòng {line}: image_type '{image_type}' không hợp lệ")
+            mapping[filename] = {
+                'pig_id': pig_id,
+                'image_type': image_type,
+                'title': (row.get('title') or '').strip(),
+                'description': (row.get('description') or '').strip() or None,
+            }
+    return mapping
+
+
+def _mapping_for(mapping, name):
+    """Dòng CSV theo đường dẫn đầy đủ, hoặc chỉ theo tên file."""
+    return mapping.get(name) or mapping.get(os.path.basename(name))
+
+
+class Command(BaseCommand):
+    help = 'Nhập hàng loạt ảnh lợn (thư mục hoặc zip) theo CSV mapping filename -> pig_id'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Thư mục ảnh hoặc file .zip')
+        parser.add_argument('--mapping', required=True, help='CSV: filename,pig_id[,image_type,title,description]')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Số process đọc ảnh')
+        parser.add_argument('--batch-size', type=int, default=200, help='Số dòng mỗi lần bulk_create')
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ kiểm tra, không ghi gì')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        mapping = load_mapping(options['mapping'])
+        names = [n for n in list_images(source) if _mapping_for(mapping, n)]
+        if not names:
+            raise CommandError('Không có ảnh nào khớp với CSV mapping')
+
+        pig_ids = {_mapping_for(mapping, n)['pig_id'] for n in names}
+        known_pigs = set(sql_models.Pig.objects.filter(id__in=pig_ids, is_deleted=False).values_list('id', flat=True))
+        missing_pigs = pig_ids - known_pigs
+        if missing_pigs:
+            raise CommandError(f"pig_id không tồn tại: {', '.join(map(str, sorted(missing_pigs)))}")
+
+        self.stdout.write(f"🔍 Đọc {len(names)} ảnh với {options['workers']} process...")
+        workers = max(1, options['workers'])
+        chunks = [names[i:i + CHUNK_SIZE] for i in range(0, len(names), CHUNK_SIZE)]
+        if workers == 1:
+            results = [r for chunk in chunks for r in inspect_chunk(source, chunk)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = [r for chunk in pool.map(inspect_chunk, [source] * len(chunks), chunks) for r in chunk]
+
+        broken = [r for r in results if r['error']]
+        for r in broken:
+            self.stdout.write(self.style.WARNING(f"⚠️  Bỏ qua {r['name']}: {r['error']}"))
+        results = [r for r in results if not r['error']]
+
+        # Dedupe trong lô và với ảnh đã có trong Wagtail (cùng SHA-1)
+        ImageModel = get_image_model()
+        existing = {
+            image.file_hash: image
+            for image in ImageModel.objects.filter(file_hash__in={r['hash'] for r in results})
+        }
+        first_by_hash = {}
+        new_images = []
+        for r in results:
+            if r['hash'] not in existing and r['hash'] not in first_by_hash:
+                first_by_hash[r['hash']] = r
+                new_images.append(r)
+        self.stdout.write(
+            f"📋 {len(results)} ảnh hợp lệ, {len(new_images)} ảnh mới, "
+            f"{len(results) - len(new_images)} trùng nội dung, {len(broken)} lỗi"
+        )
+        if options['dry_run']:
+            self.stdout.write('🧪 Dry-run: không ghi gì.')
+            return
+
+        batch_size = options['batch_size']
+        collection = Collection.get_first_root_node()
+        storage = ImageModel._meta.get_field('file').storage
+        stored = []  # file đã ghi; xoá nếu transaction rollback
+        try:
+            with transaction.atomic(), open_source(source) as read:
+                images = []
+                for r in new_images:
+                    meta = _mapping_for(mapping, r['name'])
+                    image = ImageModel(
+                        title=meta['title'] or os.path.splitext(os.path.basename(r['name']))[0],
+                        collection=collection,
+                        width=r['width'],
+                        height=r['height'],
+                        file_size=r['size'],
+                        file_hash=r['hash'],
+                    )
+                    image.file.name = storage.save(
+                        image.get_upload_to(os.path.basename(r['name'])),
+                        ContentFile(read(r['name'])),
+                    )
+                    stored.append(image.file.name)
+                    images.append(image)
+                ImageModel.objects.bulk_create(images, batch_size=batch_size)
+                # bulk_create không chạy signal -> tự thêm vào search index, sau commit
+                if images:
+                    transaction.on_commit(lambda: get_search_backend().add_bulk(ImageModel, images))
+                image_by_hash = {**existing, **{image.file_hash: image for image in images}}
+
+                # Một dòng pig_images cho mỗi cặp (pig, ảnh) chưa có
+                now = timezone.now()
+                rows, seen = [], set()
+                for r in results:
+                    meta = _mapping_for(mapping, r['name'])
+                    image = image_by_hash[r['hash']]
+                    key = (meta['pig_id'], image.file.url)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    rows.append(sql_models.PigImage(
+                        title=meta['title'] or image.title,
+                        description=meta['description'],
+                        image_url=image.file.url,
+                        pig_id=meta['pig_id'],
+                        image_type=meta['image_type'],
+                        file_size=r['size'],
+                        width=r['width'],
+                        height=r['height'],
+                        is_published=True,
+                        published_at=now,
+                    ))
+                already = set(
+                    sql_models.PigImage.objects
+                    .filter(pig_id__in={pig for pig, _ in seen}, image_url__in={url for _, url in seen},
+                            is_deleted=False)
+                    .values_list('pig_id', 'image_url')
+                )
+                rows = [row for row in rows if (row.pig_id, row.image_url) not in already]
+                sql_models.PigImage.objects.bulk_create(rows, batch_size=batch_size)
+
+                # Chạy sau commit; chi tiết lợn (cache /api/, snapshot) có danh sách ảnh
+                schedule_renditions([image.id for image in images])
+                if rows:
+                    refresh_group('pig', [row.pig_id for row in rows])
+        except BaseException:
+            for name in stored:
+                storage.delete(name)
+            raise
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Đã tạo {len(images)} ảnh Wagtail và {len(rows)} dòng pig_images."
+        ))
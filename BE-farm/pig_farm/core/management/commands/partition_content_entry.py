@@ -0,0 +1,202 @@
+"""
+Chuyển cms_content_entry sang bảng LIST-partition theo kind_id.
+
+Các bước (một transaction, khoá bảng trong lúc copy):
+  1. Đổi tên bảng cũ -> cms_content_entry_unpartitioned (giữ lại để rollback)
+  2. Tạo bảng cha cùng tên, PARTITION BY LIST (kind_id), PK (id, kind_id);
+     sequence của id chuyển sang bảng mới nên INSERT ... RETURNING id vẫn như cũ
+  3. Mỗi dòng lu_content_kind một partition (cms_content_entry_<code>) + DEFAULT
+  4. Index tạo trên bảng cha -> Postgres tạo riêng cho từng partition
+  5. Copy dữ liệu, dựng lại view cms_content_entry_all nếu đã archive
+  6. Chuyển trigger record_cms_content_entry_change (/api/changes/) sang bảng mới
+
+CmsNewsEntry/CmsContentEntry và SQL thuần trong core/news_models.write_news
+không đổi: tên bảng, cột và id giữ nguyên; query có kind_id = 2 chỉ quét
+partition news (partition pruning).
+
+--benchmark dựng hai bảng tạm (thường vs partition) trong schema riêng, seed
+--rows dòng và so sánh EXPLAIN ANALYZE của query danh sách tin tức.
+"""
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.management.commands import create_sql_tables
+from core.management.commands.archive_deleted_rows import ensure_archive
+
+TABLE = 'cms_content_entry'
+OLD_TABLE = 'cms_content_entry_unpartitioned'
+
+# Tạo trên bảng cha, áp dụng cho mọi partition
+PARTITION_INDEXES = [
+    f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_live_published ON {TABLE} "
+    f"(published_at DESC, created_at DESC) WHERE is_published AND NOT is_deleted;",
+    f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_slug ON {TABLE} (slug);",
+    f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_soft_delete ON {TABLE} (is_deleted, deleted_at);",
+]
+
+# Query của api_news_articles (trang đầu)
+NEWS_LIST_SQL = """
+    SELECT id, title, slug, summary, published_at FROM {table}
+    WHERE kind_id = 2 AND is_published AND NOT is_deleted
+    ORDER BY published_at DESC, created_at DESC
+    LIMIT 20
+"""
+
+
+def is_partitioned(cursor, table=TABLE):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+    row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def partition_name(code):
+    return f"{TABLE}_{re.sub(r'[^a-z0-9_]', '_', code.lower())}"
+
+
+class Command(BaseCommand):
+    help = 'Chuyển cms_content_entry sang bảng partition theo kind_id (hoặc --benchmark trên dữ liệu seed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ in các bước sẽ chạy')
+        parser.add_argument('--benchmark', action='store_true', help='So sánh bảng thường vs partition trên dữ liệu seed')
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Số dòng seed cho --benchmark')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Chỉ hỗ trợ PostgreSQL')
+        if options['benchmark']:
+            return self.benchmark(options['rows'])
+
+        with connection.cursor() as cursor:
+            if is_partitioned(cursor):
+                self.stdout.write(f"📋 {TABLE} đã là bảng partition, bỏ qua.")
+                return
+
+            # Partitioned table chỉ được tham chiếu bởi FK nếu khoá gồm cả kind_id
+            cursor.execute("""
+                SELECT conrelid::regclass::text, conname FROM pg_constraint
+                WHERE contype = 'f' AND confrelid = to_regclass(%s)
+            """, [TABLE])
+            foreign_keys = cursor.fetchall()
+            if foreign_keys:
+                listed = ', '.join(f"{table}.{name}" for table, name in foreign_keys)
+                raise CommandError(f"Có FK trỏ tới {TABLE}: {listed}. Gỡ/đổi các FK này trước khi partition.")
+
+            cursor.execute("SELECT id, code FROM lu_content_kind ORDER BY id")
+            kinds = cursor.fetchall()
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+            sequence = cursor.fetchone()[0]
+
+            steps = [
+                f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE;",
+                f"ALTER TABLE {TABLE} RENAME TO {OLD_TABLE};",
+                f"""CREATE TABLE {TABLE} (
+                        LIKE {OLD_TABLE} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING GENERATED,
+                        PRIMARY KEY (id, kind_id)
+                    ) PARTITION BY LIST (kind_id);""",
+            ]
+            cursor.execute("SELECT attidentity <> '' FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'id'",
+                           [TABLE])
+            identity = cursor.fetchone()[0]
+            if sequence and not identity:
+                # serial: default nextval(...) đã copy sang, chỉ cần chuyển quyền sở hữu sequence
+                steps.append(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id;")
+            steps += [
+                f"CREATE TABLE {partition_name(code)} PARTITION OF {TABLE} FOR VALUES IN ({kind_id});"
+                for kind_id, code in kinds
+            ]
+            steps.append(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT;")
+            steps += PARTITION_INDEXES
+            steps.append(f"INSERT INTO {TABLE} OVERRIDING SYSTEM VALUE SELECT * FROM {OLD_TABLE};")
+            if identity:
+                # identity: bảng mới có sequence riêng, đẩy lên sau id lớn nhất
+                steps.append(f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+                             f"COALESCE((SELECT MAX(id) FROM {TABLE}), 0) + 1, false);")
+            steps.append(f"ANALYZE {TABLE};")
+
+            if options['dry_run']:
+                self.stdout.write('🧪 Dry-run, các bước sẽ chạy:')
+                for sql in steps:
+                    self.stdout.write('   ' + ' '.join(sql.split()))
+                return
+
+            self.stdout.write(f"🔨 Partition {TABLE} theo kind_id ({len(kinds)} loại + default)...")
+            with transaction.atomic():
+                for sql in steps:
+                    cursor.execute(sql)
+                cursor.execute(f"SELECT (SELECT COUNT(*) FROM {TABLE}), (SELECT COUNT(*) FROM {OLD_TABLE})")
+                new_count, old_count = cursor.fetchone()
+                if new_count != old_count:
+                    raise CommandError(f"Số dòng lệch sau khi copy ({new_count} != {old_count}), đã rollback")
+                if self.table_exists(cursor, f'{TABLE}_archive'):
+                    # View cũ vẫn trỏ vào bảng đã đổi tên
+                    ensure_archive(cursor, TABLE)
+                # Trigger đi theo bảng bị đổi tên: gỡ khỏi bảng cũ (không ghi catalog_changes
+                # khi dọn bảng cũ) và gắn lại trên bảng mới trong cùng transaction
+                cursor.execute(f"DROP TRIGGER IF EXISTS record_{TABLE}_change ON {OLD_TABLE};")
+                create_sql_tables.Command(stdout=self.stdout).create_catalog_change_triggers(cursor)
+
+            cursor.execute("SELECT tgname FROM pg_trigger WHERE tgrelid = to_regclass(%s) AND NOT tgisinternal",
+                           [OLD_TABLE])
+            triggers = [row[0] for row in cursor.fetchall()]
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Đã chuyển {new_count} dòng sang {TABLE} (partition)."))
+        self.stdout.write(f"⚡ Trigger record_{TABLE}_change đã gắn lại trên {TABLE}.")
+        if triggers:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️  Trigger khác trên bảng cũ cần tạo lại trên {TABLE}: {', '.join(triggers)}"
+            ))
+        self.stdout.write(f"ℹ️  Bảng cũ giữ ở {OLD_TABLE}; DROP TABLE khi đã kiểm tra xong.")
+
+    @staticmethod
+    def table_exists(cursor, table):
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [table])
+        return cursor.fetchone()[0]
+
+    def benchmark(self, rows):
+        """Seed hai bảng giống hệt nhau (thường / partition) rồi EXPLAIN ANALYZE query tin tức."""
+        self.stdout.write(f"🌱 Seed {rows:,} dòng (10% news, kind_id 1..5)...")
+        with connection.cursor() as cursor:
+            with transaction.atomic():
+                cursor.execute("DROP SCHEMA IF EXISTS partition_bench CASCADE; CREATE SCHEMA partition_bench;")
+                columns = """
+                    id BIGINT NOT NULL, kind_id SMALLINT NOT NULL, slug TEXT, title TEXT, summary TEXT,
+                    body_html TEXT, is_published BOOLEAN, is_deleted BOOLEAN,
+                    published_at TIMESTAMPTZ, created_at TIMESTAMPTZ
+                """
+                cursor.execute(f"CREATE TABLE partition_bench.flat ({columns}, PRIMARY KEY (id));")
+                cursor.execute(f"CREATE TABLE partition_bench.parted ({columns}, PRIMARY KEY (id, kind_id)) "
+                               "PARTITION BY LIST (kind_id);")
+                for kind_id in range(1, 6):
+                    cursor.execute(f"CREATE TABLE partition_bench.parted_{kind_id} "
+                                   f"PARTITION OF partition_bench.parted FOR VALUES IN ({kind_id});")
+                for table in ('flat', 'parted'):
+                    cursor.execute(f"""
+                        INSERT INTO partition_bench.{table}
+                        SELECT g, CASE WHEN g %% 10 = 0 THEN 2 ELSE (ARRAY[1, 3, 4, 5])[1 + g %% 4] END,
+                               'slug-' || g, 'Bài ' || g, repeat('x', 200), repeat('<p>y</p>', 50),
+                               g %% 7 <> 0, g %% 50 = 0,
+                               now() - (g || ' minutes')::interval, now() - (g || ' minutes')::interval
+                        FROM generate_series(1, %s) AS g
+                    """, [rows])
+                    cursor.execute(f"CREATE INDEX ON partition_bench.{table} "
+                                   "(kind_id, published_at DESC, created_at DESC) WHERE is_published AND NOT is_deleted;")
+                    cursor.execute(f"ANALYZE partition_bench.{table};")
+
+            try:
+                for label, table in (('Bảng thường', 'partition_bench.flat'), ('Partition', 'partition_bench.parted')):
+                    for name, sql in (
+                        ('danh sách tin', NEWS_LIST_SQL.format(table=table)),
+                        ('đếm tin (phân trang)', f"SELECT COUNT(*) FROM {table} "
+                                                 "WHERE kind_id = 2 AND is_published AND NOT is_deleted"),
+                    ):
+                        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+                        plan = cursor.fetchone()[0]
+                        plan = plan[0] if isinstance(plan, list) else json.loads(plan)[0]
+                        buffers = plan['Plan'].get('Shared Hit Blocks', 0) + plan['Plan'].get('Shared Read Blocks', 0)
+                        self.stdout.write(f"⏱️  {label:12} {name:22} {plan['Execution Time']:8.2f} ms, {buffers} buffers")
+            finally:
+                cursor.execute("DROP SCHEMA IF EXISTS partition_bench CASCADE;")
@@ -0,0 +1,216 @@
+"""
+Đối soát toàn bộ Wagtail ↔ SQL theo content_hash và sửa các dòng bị lệch.
+"""
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.hashing import content_hash
+from core.news_models import NewsPage, write_news
+from core.pages import MedicineProductPage, PigPage, PigImagePage, NewsCategoryPage
+from core.sync import (GALLERY_TABLES, SQL_MODELS, SYNC_HANDLERS, _diff_gallery, _sync_gallery, apply_row_values,
+                       load_galleries, refresh_derived_bulk, sync_state)
+
+
+PAGE_TYPES = {
+    'medicine': MedicineProductPage,
+    'pig': PigPage,
+    'pig_image': PigImagePage,
+    'news_category': NewsCategoryPage,
+    'news': NewsPage,
+}
+
+# Quan hệ cần nạp cùng page để values() không phát sinh query theo từng page
+SELECT_RELATED = {
+    PigImagePage: ['image', 'pig_reference'],
+    NewsCategoryPage: ['parent_category'],
+    NewsPage: ['cover'],
+}
+
+ROW_FIELDS = ['content_hash', 'is_published', 'published_at', 'is_deleted', 'deleted_at', 'updated_at']
+
+
+def _load_gallery_rows(page_cls, owner_ids):
+    """{owner_id: {image_id: sort}} đọc từ bảng nối trong một query."""
+    table, fk = GALLERY_TABLES[page_cls]
+    result = defaultdict(dict)
+    if not owner_ids:
+        return result
+    with connection.cursor() as cur:
+        placeholders = ', '.join(['%s'] * len(owner_ids))
+        cur.execute(f"SELECT {fk}, image_id, sort FROM {table} WHERE {fk} IN ({placeholders})", list(owner_ids))
+        for owner_id, image_id, sort in cur.fetchall():
+            result[owner_id][image_id] = sort
+    return result
+
+
+def reconcile_chunk(page_cls, page_ids, dry_run=False):
+    """So sánh và (nếu không dry-run) sửa một chunk page; trả về báo cáo lệch."""
+    model, _ = SQL_MODELS[page_cls]
+    spec = SYNC_HANDLERS[page_cls]
+    row_columns = {field.attname for field in model._meta.concrete_fields}
+    has_gallery = page_cls in GALLERY_TABLES
+    report = {'pages': 0, 'missing': [], 'changed': [], 'gallery': [], 'unpublished': []}
+
+    pages = list(
+        page_cls.objects.filter(pk__in=page_ids).select_related(*SELECT_RELATED.get(page_cls, []))
+    )
+    rows = model.objects.in_bulk([p.external_id for p in pages if p.external_id])
+    galleries = load_galleries(page_cls, page_ids) if has_gallery else {}
+
+    current_gallery = _load_gallery_rows(page_cls, list(rows)) if has_gallery else {}
+
+    to_create, to_update, gallery_sync = [], [], []
+    for page in pages:
+        report['pages'] += 1
+        row = rows.get(page.external_id)
+        if not page.live:
+            # Page đã unpublish nhưng dòng SQL vẫn hiển thị trên web
+            if row is not None and row.is_published:
+                report['unpublished'].append(page.pk)
+            continue
+
+        # Tin tức: values=None, body chỉ render cho dòng phải ghi (như dispatch_publish)
+        values, image_ids, digest = sync_state(page, galleries.get(page.pk, []), render=False)
+        if row is None:
+            report['missing'].append(page.pk)
+            to_create.append((page, values if values is not None else spec.values(page), image_ids, digest))
+            continue
+
+        # Dữ liệu thực có trên dòng SQL so với values (bắt cả sửa tay trong DB); tin tức chỉ so
+        # các cột lấy thẳng từ nguồn, digest của nó so riêng với content_hash đã lưu
+        columns = values if values is not None else {
+            name: value for name, value in spec.source(page).items() if name in row_columns
+        }
+        row_digest = content_hash({**{name: getattr(row, name) for name in columns}, "images": image_ids})
+        values_digest = content_hash({**columns, "images": image_ids})
+        if row_digest != values_digest or row.content_hash != digest or not row.is_published or row.is_deleted:
+            report['changed'].append(page.pk)
+            values = values if values is not None else spec.values(page)
+            to_update.append((page, row, values, image_ids, digest))
+        elif has_gallery and any(_diff_gallery(current_gallery[row.id], image_ids)):
+            # Gallery có thể lệch dù cột khớp (ai đó sửa tay bảng nối)
+            report['gallery'].append(page.pk)
+            gallery_sync.append((page, row.id, image_ids))
+
+    if dry_run:
+        return report
+
+    now = timezone.now()
+    with transaction.atomic():
+        if to_update:
+            objs = []
+            for page, row, values, image_ids, digest in to_update:
+                apply_row_values(row, values, digest, row.published_at or now)
+                row.updated_at = now
+                objs.append(row)
+                gallery_sync.append((page, row.id, image_ids))
+            fields = list(to_update[0][2].keys()) + ROW_FIELDS
+            model.objects.bulk_update(objs, fields, batch_size=500)
+
+        if to_create and page_cls is NewsPage:
+            # cms_content_entry cần kind_id; số bài thiếu thường rất ít
+            for page, values, image_ids, digest in to_create:
+                write_news(page, values, digest)
+        elif to_create:
+            objs = []
+            for page, values, image_ids, digest in to_create:
+                obj = model()
+                apply_row_values(obj, values, digest, now)
+                objs.append(obj)
+            model.objects.bulk_create(objs, batch_size=500)
+            for (page, values, image_ids, digest), obj in zip(to_create, objs):
+                page.external_id = obj.id
+                gallery_sync.append((page, obj.id, image_ids))
+            page_cls.objects.bulk_update([page for page, *_ in to_create], ['external_id'], batch_size=500)
+
+        if report['unpublished']:
+            stale_ids = [rows[p.external_id].id for p in pages if p.pk in report['unpublished']]
+            model.objects.filter(id__in=stale_ids).update(is_published=False, updated_at=now)
+
+        if has_gallery:
+            for page, owner_id, image_ids in gallery_sync:
+                _sync_gallery(*GALLERY_TABLES[page_cls], owner_id, image_ids)
+
+        # Cache /api/, snapshot, sitemap, autocomplete, search index của các dòng vừa sửa (sau commit)
+        refresh_derived_bulk(page_cls, [page for page, *_ in gallery_sync])
+        refresh_derived_bulk(page_cls, [p for p in pages if p.pk in report['unpublished']], published=False)
+
+    return report
+
+
+class Command(BaseCommand):
+    help = 'Đối soát Wagtail ↔ SQL theo content_hash, chạy theo chunk trên nhiều worker và chỉ sửa dòng bị lệch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            choices=list(PAGE_TYPES),
+            action='append',
+            dest='types',
+            help='Chỉ đối soát loại này (có thể lặp lại); mặc định: tất cả',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500, help='Số page mỗi chunk')
+        parser.add_argument('--workers', type=int, default=4, help='Số worker chạy song song')
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ in báo cáo lệch, không ghi DB')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        chunk_size = options['chunk_size']
+        workers = max(1, options['workers'])
+        types = options['types'] or list(PAGE_TYPES)
+
+        self.stdout.write(f"🔍 Đối soát {', '.join(types)} (chunk={chunk_size}, workers={workers}"
+                          f"{', dry-run' if dry_run else ''})...")
+
+        tasks = []
+        for key in types:
+            page_cls = PAGE_TYPES[key]
+            page_ids = list(page_cls.objects.order_by('pk').values_list('pk', flat=True))
+            for i in range(0, len(page_ids), chunk_size):
+                tasks.append((key, page_cls, page_ids[i:i + chunk_size]))
+
+        totals = {key: {'pages': 0, 'missing': [], 'changed': [], 'gallery': [], 'unpublished': []} for key in types}
+        if workers == 1:
+            results = [reconcile_chunk(page_cls, ids, dry_run) for _, page_cls, ids in tasks]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(lambda task: self._run_chunk(*task[1:], dry_run), tasks))
+
+        for (key, _, _), report in zip(tasks, results):
+            totals[key]['pages'] += report['pages']
+            for name in ('missing', 'changed', 'gallery', 'unpublished'):
+                totals[key][name].extend(report[name])
+
+        drift = 0
+        for key, total in totals.items():
+            _, label = SQL_MODELS[PAGE_TYPES[key]]
+            counts = {name: len(total[name]) for name in ('missing', 'changed', 'gallery', 'unpublished')}
+            drift += sum(counts.values())
+            style = self.style.WARNING if any(counts.values()) else self.style.SUCCESS
+            self.stdout.write(style(
+                f"📋 {label}: {total['pages']} page, {counts['missing']} thiếu dòng SQL, "
+                f"{counts['changed']} lệch dữ liệu, {counts['gallery']} lệch gallery, "
+                f"{counts['unpublished']} còn publish sai"
+            ))
+            if options['verbosity'] > 1:
+                for name, ids in total.items():
+                    if name != 'pages' and ids:
+                        self.stdout.write(f"   - {name}: page id {', '.join(map(str, ids))}")
+
+        if dry_run:
+            self.stdout.write(f"\n🧪 Dry-run: phát hiện {drift} dòng lệch, không ghi gì.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"\n✅ Đã sửa {drift} dòng lệch."))
+
+    @staticmethod
+    def _run_chunk(page_cls, page_ids, dry_run):
+        # Mỗi thread có connection riêng; đóng lại khi xong chunk
+        try:
+            return reconcile_chunk(page_cls, page_ids, dry_run)
+        finally:
+            connection.close()
@@ -0,0 +1,39 @@
+"""
+Tính sẵn các response /api/ mà FE-farm gọi đầu tiên (xem core/warmup.py).
+
+Chạy sau mỗi lần deploy, ví dụ:
+    python manage.py warm_api_cache --top 50 --workers 8
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.warmup import all_targets, warm
+
+
+class Command(BaseCommand):
+    help = 'Làm nóng cache /api/: danh sách (page_size 10/12/20/100), danh mục và N trang chi tiết mới nhất'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=settings.API_CACHE_WARM_TOP_N,
+                            help='Số trang chi tiết mới nhất mỗi loại')
+        parser.add_argument('--workers', type=int, default=settings.API_CACHE_WARM_WORKERS,
+                            help='Số request chạy song song (0 = tuần tự)')
+        parser.add_argument('--force', action='store_true', help='Tính lại cả các khoá đang còn hạn')
+
+    def handle(self, *args, **options):
+        targets = all_targets(options['top'])
+        self.stdout.write(f"🔥 Warm {len(targets)} response (workers={options['workers']})...")
+
+        started = time.monotonic()
+        results = warm(targets, workers=options['workers'], force=options['force'])
+        failed = [(target, result) for target, result in results if result not in ('fresh', 200)]
+        warmed = sum(1 for _, result in results if result == 200)
+
+        for target, result in failed:
+            self.stdout.write(self.style.WARNING(f"⚠️  {target.path} {target.params or ''}: {result}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {warmed} response mới, {len(results) - warmed - len(failed)} đã có sẵn, "
+            f"{len(failed)} lỗi ({time.monotonic() - started:.2f}s)"
+        ))
@@ -0,0 +1,148 @@
+"""
+Media theo địa chỉ nội dung.
+
+- HashedMediaStorage: mọi file lưu dưới thư mục là hash nội dung
+  (original_images/<hash>/a.jpg, images/<hash>/a.width-640.webp) nên URL đổi
+  khi nội dung đổi. Mỗi lần save là một file riêng (a_XyZ.jpg nếu trùng tên):
+  Wagtail xoá file khi xoá Image / rendition, nên hai bản ghi không được dùng
+  chung một file.
+- serve_media (chỉ khi DEBUG; production do nginx phục vụ /media/, xem
+  FE-farm/nginx.conf): MEDIA_ROOT với ETag, 304, Range (206/416) và
+  Cache-Control immutable 1 năm cho đường dẫn có hash.
+"""
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_http_methods
+
+HASH_LENGTH = 16
+HASHED_PATH_RE = re.compile(rf"(^|/)[0-9a-f]{{{HASH_LENGTH}}}/[^/]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# File cũ (chưa có hash trong đường dẫn) vẫn phải revalidate
+MUTABLE_CACHE_CONTROL = "public, max-age=3600, must-revalidate"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def content_digest(content) -> str:
+    """SHA-256 rút gọn của một File/ContentFile, trả con trỏ về đầu file."""
+    hasher = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return hasher.hexdigest()[:HASH_LENGTH]
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """FileSystemStorage chèn hash nội dung vào đường dẫn trước tên file."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            from django.core.files import File
+            content = File(content, name)
+        dirname, basename = posixpath.split(str(name).replace("\\", "/"))
+        hashed = posixpath.join(dirname, content_digest(content), basename)
+        # Đã có file cùng tên: get_available_name thêm hậu tố, không ghi đè / dùng chung
+        return super().save(hashed, content, max_length=max_length)
+
+
+def _etag(stat) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _parse_range(header: str, size: int):
+    """(start, end) cho một khoảng byte; None nếu không có/không hỗ trợ; False nếu ngoài file."""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # bytes=-N: N byte cuối
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+@require_http_methods(["GET", "HEAD"])
+def serve_media(request, path):
+    """Phục vụ file trong MEDIA_ROOT khi chạy dev (DEBUG)."""
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except ValueError:
+        raise Http404("Media not found")
+    if not os.path.isfile(fullpath):
+        raise Http404("Media not found")
+
+    stat = os.stat(fullpath)
+    etag = _etag(stat)
+    cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_PATH_RE.search(path) else MUTABLE_CACHE_CONTROL
+
+    if etag in [tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")]:
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        response["Cache-Control"] = cache_control
+        return response
+
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or "application/octet-stream"
+    size = stat.st_size
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if range_header and (not if_range or if_range == etag):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            response["Accept-Ranges"] = "bytes"
+            return response
+
+    f = open(fullpath, "rb")
+    if byte_range:
+        start, end = byte_range
+        f.seek(start)
+        response = FileResponse(_read_range(f, end - start + 1), status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+    else:
+        response = FileResponse(f, content_type=content_type)
+        response["Content-Length"] = str(size)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Cache-Control"] = cache_control
+    return response
+
+
+def _read_range(f, length, chunk_size=64 * 1024):
+    """Đọc đúng `length` byte từ vị trí hiện tại rồi đóng file."""
+    try:
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_medicineimageitem_pigimageitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageRendition',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('image_id', models.BigIntegerField()),
+                ('spec', models.TextField()),
+                ('format', models.CharField(max_length=10)),
+                ('url', models.TextField()),
+                ('width', models.IntegerField()),
+                ('height', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'image_renditions',
+                'managed': False,
+            },
+        ),
+    ]
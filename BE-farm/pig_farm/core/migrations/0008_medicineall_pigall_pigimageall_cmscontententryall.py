@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_imagerendition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CmsContentEntryAll',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('kind_id', models.SmallIntegerField()),
+                ('slug', models.TextField()),
+                ('title', models.TextField()),
+                ('is_published', models.BooleanField(default=False)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('is_archived', models.BooleanField(default=False)),
+            ],
+            options={
+                'db_table': 'cms_content_entry_all',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MedicineAll',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.TextField()),
+                ('packaging', models.TextField(blank=True, null=True)),
+                ('price_unit', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('price_total', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('is_published', models.BooleanField(default=False)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('is_archived', models.BooleanField(default=False)),
+            ],
+            options={
+                'db_table': 'product_medicine_all',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PigAll',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.TextField()),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('is_published', models.BooleanField(default=False)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('is_archived', models.BooleanField(default=False)),
+            ],
+            options={
+                'db_table': 'product_pig_all',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PigImageAll',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.TextField()),
+                ('image_url', models.TextField()),
+                ('pig_id', models.BigIntegerField(blank=True, null=True)),
+                ('image_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('is_published', models.BooleanField(default=False)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('is_archived', models.BooleanField(default=False)),
+            ],
+            options={
+                'db_table': 'pig_images_all',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_medicineall_pigall_pigimageall_cmscontententryall'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsViewCounter',
+            fields=[
+                ('entry_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('view_count', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'news_view_counters',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_newsviewcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsTrendingScore',
+            fields=[
+                ('entry_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('score', models.FloatField()),
+                ('base_score', models.FloatField()),
+                ('base_hour', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'news_trending_scores',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='NewsViewHourly',
+            fields=[
+                ('pk', models.CompositePrimaryKey('entry_id', 'bucket_hour', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('entry_id', models.BigIntegerField()),
+                ('bucket_hour', models.DateTimeField()),
+                ('views', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'news_view_hourly',
+                'managed': False,
+            },
+        ),
+    ]
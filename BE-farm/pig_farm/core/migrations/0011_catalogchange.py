@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_newsviewhourly_newstrendingscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('pk', models.CompositePrimaryKey('entity', 'entity_id', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('entity', models.CharField(max_length=20)),
+                ('entity_id', models.BigIntegerField()),
+                ('seq', models.BigIntegerField(unique=True)),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'catalog_changes',
+                'managed': False,
+            },
+        ),
+    ]
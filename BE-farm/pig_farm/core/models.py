@@ -1,7 +1,8 @@
 from django.db import models
 from .news_models import NewsIndexPage, NewsPage
+from .product_gallery import MedicineImageItem, PigImageItem
 
 # Create your models here.
 
 # Import Wagtail page models to register them
-__all__ = ['NewsIndexPage', 'NewsPage']
+__all__ = ['NewsIndexPage', 'NewsPage', 'MedicineImageItem', 'PigImageItem']
@@ -1,14 +1,24 @@
+import logging
+
+from django.core.cache import cache
 from django.db import models, transaction, connection
 from django.utils import timezone
 from wagtail.models import Page
 from wagtail.admin.panels import FieldPanel, MultiFieldPanel
 from wagtail.fields import StreamField, RichTextField
-from wagtail import blocks, hooks
+from wagtail import blocks
 from wagtail.images.blocks import ImageChooserBlock
 from wagtail.embeds.blocks import EmbedBlock
 from wagtail.images.models import Image
 import json
 
+from .hashing import content_hash
+
+logger = logging.getLogger(__name__)
+
+# Thời gian giữ kết quả render StreamField (giây)
+NEWS_RENDER_CACHE_TIMEOUT = 60 * 60 * 24
+
 # ===== Khối nội dung tin tức (dễ nhập cho low-tech) =====
 NEWS_BLOCKS = [
     ("paragraph", blocks.RichTextBlock(features=["bold","italic","ol","ul","link","h2","h3"])),
@@ -76,92 +86,150 @@ class NewsPage(Page):
 
     # ===== Helpers =====
     def _get_kind_id_news(self, cursor):
-        cursor.execute("SELECT id FROM lu_content_kind WHERE code='news' LIMIT 1;")
-        row = cursor.fetchone()
-        if not row:
-            raise RuntimeError("Thiếu seed lu_content_kind ('news') – chạy 10_lookups.sql")
-        return row[0]
+        return get_kind_id(cursor, "news")
 
     def _slug_value(self):
         return (self.slug_override or self.slug or (self.title or "")).strip()
 
-    def _body_json(self):
+    def _cover_id(self):
+        return self.cover_id if self.cover_id else None
+
+    def _body_source(self) -> dict:
+        """Dữ liệu thô của StreamField + tên file của các ảnh trong body.
+
+        HTML đã render chứa URL file ảnh (đường dẫn theo hash nội dung), nên thay
+        file của một ảnh cũng phải đổi hash dù dữ liệu StreamField giữ nguyên.
+        """
+        raw = list(self.body.raw_data) if self.body else []
+        image_ids = [block.get("value") for block in raw if block.get("type") == "image" and block.get("value")]
+        files = dict(Image.objects.filter(id__in=image_ids).values_list("id", "file")) if image_ids else {}
+        return {"body": raw, "body_images": {str(pk): name for pk, name in sorted(files.items())}}
+
+    def _render_body(self):
+        """StreamField -> (body_json, body_html), có cache theo revision + hash nội dung.
+
+        Chỉ được gọi khi content_hash khác dòng SQL (xem news_source / write_news):
+        publish lại một bài không đổi không render gì.
+        """
         if not self.body:
-            return []
-        
-        # Convert StreamValue to JSON-serializable format
+            return [], ""
+        key = f"news-body:{self.live_revision_id}:{content_hash(self._body_source())}"
+        rendered = cache.get(key)
+        if rendered is None:
+            rendered = self._serialize_body()
+            cache.set(key, rendered, NEWS_RENDER_CACHE_TIMEOUT)
+        return rendered
+
+    def _serialize_body(self):
+        """Duyệt StreamField MỘT lần, tạo đồng thời JSON và HTML để lưu."""
+        body_data = []
+        html_parts = []
         try:
-            body_data = []
             for block in self.body:
                 block_data = {
                     "type": block.block_type,
                     "value": None
                 }
-                
+
                 # Handle different block types
                 if block.block_type == 'paragraph':
                     block_data["value"] = str(block.value)
+                    html_parts.append(str(block.value))
                 elif block.block_type == 'quote':
                     block_data["value"] = str(block.value)
+                    html_parts.append(f'<blockquote>{block.value}</blockquote>')
                 elif block.block_type == 'image':
                     if block.value:
                         block_data["value"] = {
                             "title": getattr(block.value, 'title', ''),
                             "url": getattr(block.value, 'url', '') if hasattr(block.value, 'url') else ''
                         }
+                        # Simple image HTML
+                        html_parts.append(f'<img src="{block.value.file.url}" alt="{block.value.title}">')
                 else:
                     # For other types, convert to string
                     block_data["value"] = str(block.value)
-                
+
                 body_data.append(block_data)
-            
-            return body_data
-            
         except Exception as e:
-            print(f"Error converting body to JSON: {e}")
-            return []
+            logger.error(f"Error converting body to JSON/HTML: {e}")
+            return [], ""
 
-    def _cover_id(self):
-        return self.cover_id if self.cover_id else None
+        return body_data, '\n'.join(html_parts)
+
+
+# Bảng lookup gần như không đổi -> nhớ trong process thay vì query mỗi lần publish
+_KIND_IDS = {}
+
+
+def get_kind_id(cursor, code: str) -> int:
+    """id của lu_content_kind theo code, memo trong process."""
+    if code not in _KIND_IDS:
+        cursor.execute("SELECT id FROM lu_content_kind WHERE code=%s LIMIT 1;", [code])
+        row = cursor.fetchone()
+        if not row:
+            raise RuntimeError(f"Thiếu seed lu_content_kind ('{code}') – chạy 10_lookups.sql")
+        _KIND_IDS[code] = row[0]
+    return _KIND_IDS[code]
+
+
+# ===== Đồng bộ SQL (được gọi bởi dispatcher trong core/sync.py) =====
+
+def news_values(page: NewsPage) -> dict:
+    """Các cột nghiệp vụ của cms_content_entry cho một NewsPage."""
+    body_json, body_html = page._render_body()
+    return {
+        "slug": page._slug_value(),
+        "title": page.title or "",
+        "summary": page.summary or None,
+        "body_json": body_json or None,
+        "body_html": body_html,
+        "cover_image_id": page._cover_id(),
+        "seo_title": page.seo_title or None,
+        "seo_desc": page.search_description or None,
+        "author_name": page.author_name or None,
+    }
+
+
+def news_source(page: NewsPage) -> dict:
+    """Dữ liệu quyết định news_values() mà không cần render body (tính content_hash)."""
+    return {
+        "slug": page._slug_value(),
+        "title": page.title or "",
+        "summary": page.summary or None,
+        "cover_image_id": page._cover_id(),
+        # Thay file ảnh bìa giữ nguyên id: hash đổi để publish lại sinh rendition mới
+        "cover_file_hash": page.cover.file_hash if page.cover_id else None,
+        "seo_title": page.seo_title or None,
+        "seo_desc": page.search_description or None,
+        "author_name": page.author_name or None,
+        **page._body_source(),
+    }
+
+
+def write_news(page: NewsPage, values, digest: str) -> int:
+    """Upsert cms_content_entry(kind='news') bằng SQL thuần.
+
+    Trả về số câu lệnh ghi; 0 nếu content_hash đã lưu trùng `digest`. values=None
+    (publish): body chỉ được render sau khi so hash.
+    """
+    now = timezone.now()
 
-    def _render_body_html(self):
-        """Convert StreamField to HTML for storage"""
-        if not self.body:
-            return ""
-        
-        html_parts = []
-        for block in self.body:
-            if block.block_type == 'paragraph':
-                html_parts.append(str(block.value))
-            elif block.block_type == 'image' and block.value:
-                # Simple image HTML
-                html_parts.append(f'<img src="{block.value.file.url}" alt="{block.value.title}">')
-            elif block.block_type == 'quote':
-                html_parts.append(f'<blockquote>{block.value}</blockquote>')
-            # Add more block type handling as needed
-        
-        return '\n'.join(html_parts)
-
-
-# ===== Hooks: Publish/Unpublish/Delete -> đồng bộ SQL =====
-
-@hooks.register("after_publish_page")
-def news_after_publish(request, page):
-    if not isinstance(page, NewsPage):
-        return
-    
     with transaction.atomic(), connection.cursor() as cur:
-        kind_id = page._get_kind_id_news(cur)
-        slug = page._slug_value()
-        title = page.title or ""
-        summary = page.summary or None
-        body_json = json.dumps(page._body_json()) if page._body_json() else None
-        body_html = page._render_body_html()
-        cover_image_id = page._cover_id()
-        published_at = timezone.now()
-        seo_title = page.seo_title or None
-        seo_desc = page.search_description or None
-        author_name = page.author_name or None
+        if page.external_id:
+            cur.execute(
+                "SELECT content_hash, is_published, is_deleted FROM cms_content_entry WHERE id=%s",
+                [page.external_id],
+            )
+            row = cur.fetchone()
+            if row and row[0] == digest and row[1] and not row[2]:
+                return 0
+            if not row:
+                page.external_id = None
+
+        if values is None:
+            values = news_values(page)
+        body_json = json.dumps(values["body_json"]) if values["body_json"] else None
 
         if page.external_id:
             # UPDATE existing entry
@@ -170,45 +238,30 @@ def news_after_publish(request, page):
                 UPDATE cms_content_entry
                 SET slug=%s, title=%s, summary=%s, body_json=%s, body_html=%s,
                     cover_image_id=%s, published_at=%s, is_published=TRUE, is_deleted=FALSE,
-                    seo_title=%s, seo_desc=%s, author_name=%s, updated_at=NOW()
+                    seo_title=%s, seo_desc=%s, author_name=%s, content_hash=%s, updated_at=%s
                 WHERE id=%s
                 """,
-                [slug, title, summary, body_json, body_html,
-                 cover_image_id, published_at, seo_title, seo_desc, author_name, page.external_id],
-            )
-        else:
-            # INSERT new entry
-            cur.execute(
-                """
-                INSERT INTO cms_content_entry
-                    (kind_id, slug, title, summary, body_json, body_html, cover_image_id,
-                     published_at, is_published, is_deleted, seo_title, seo_desc, author_name, created_at, updated_at)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s, TRUE, FALSE, %s, %s, %s, NOW(), NOW())
-                RETURNING id
-                """,
-                [kind_id, slug, title, summary, body_json, body_html, cover_image_id,
-                 published_at, seo_title, seo_desc, author_name],
+                [values["slug"], values["title"], values["summary"], body_json,
+                 values["body_html"], values["cover_image_id"], now, values["seo_title"],
+                 values["seo_desc"], values["author_name"], digest, now, page.external_id],
             )
-            page.external_id = cur.fetchone()[0]
-            page.save(update_fields=["external_id"])
-
-        print(f"✅ Synced NewsPage '{title}' to cms_content_entry (ID: {page.external_id})")
-
+            return 1
 
-@hooks.register("after_unpublish_page")
-def news_after_unpublish(request, page):
-    if not isinstance(page, NewsPage) or not page.external_id:
-        return
-    with connection.cursor() as cur:
-        cur.execute("UPDATE cms_content_entry SET is_published=FALSE WHERE id=%s", [page.external_id])
-        print(f"📴 Unpublished NewsPage '{page.title}' in cms_content_entry")
-
-
-@hooks.register("after_delete_page")
-def news_after_delete(request, page):
-    if not isinstance(page, NewsPage) or not page.external_id:
-        return
-    with connection.cursor() as cur:
-        # Soft delete: ẩn khỏi web, vẫn giữ DB
-        cur.execute("UPDATE cms_content_entry SET is_published=FALSE, is_deleted=TRUE WHERE id=%s", [page.external_id])
-        print(f"🗑️  Soft deleted NewsPage '{page.title}' in cms_content_entry")
\ No newline at end of file
+        # INSERT new entry
+        kind_id = page._get_kind_id_news(cur)
+        cur.execute(
+            """
+            INSERT INTO cms_content_entry
+                (kind_id, slug, title, summary, body_json, body_html, cover_image_id,
+                 published_at, is_published, is_deleted, seo_title, seo_desc, author_name,
+                 content_hash, created_at, updated_at)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,%s, TRUE, FALSE, %s, %s, %s, %s, %s, %s)
+            RETURNING id
+            """,
+            [kind_id, values["slug"], values["title"], values["summary"], body_json,
+             values["body_html"], values["cover_image_id"], now, values["seo_title"],
+             values["seo_desc"], values["author_name"], digest, now, now],
+        )
+        page.external_id = cur.fetchone()[0]
+        type(page).objects.filter(pk=page.pk).update(external_id=page.external_id)
+        return 1
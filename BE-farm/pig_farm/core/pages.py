@@ -4,7 +4,7 @@ from django.core.exceptions import ValidationError, PermissionDenied
 from django.utils.text import slugify
 from django.utils import timezone
 from wagtail.models import Page
-from wagtail.admin.panels import FieldPanel, MultiFieldPanel
+from wagtail.admin.panels import FieldPanel, InlinePanel, MultiFieldPanel
 from wagtail.images import get_image_model
 import re
 
@@ -24,6 +24,7 @@ class MedicineProductPage(Page):
         FieldPanel("packaging"),
         FieldPanel("price_unit"),
         FieldPanel("price_total"),
+        InlinePanel("images", label="Hình ảnh"),
     ]
     
     def delete(self, *args, **kwargs):
@@ -54,6 +55,7 @@ class PigPage(Page):
     content_panels = Page.content_panels + [
         FieldPanel("name"),
         FieldPanel("price"),
+        InlinePanel("images", label="Hình ảnh"),
     ]
     
     def delete(self, *args, **kwargs):
@@ -100,7 +102,7 @@ class PigImagePage(Page):
         null=True,
         blank=True,
         on_delete=models.SET_NULL,
-        related_name="images",
+        related_name="image_pages",
         help_text="Chọn lợn liên quan đến hình ảnh này"
     )
     
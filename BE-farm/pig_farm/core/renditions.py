@@ -0,0 +1,154 @@
+"""
+Sinh rendition ảnh (nhiều chiều rộng, WebP + JPEG) ở background khi publish.
+
+Kết quả (url, width, height) được lưu vào bảng image_renditions để API trả về
+srcset mà không phải mở Pillow trong request.
+"""
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from wagtail.images import get_image_model
+
+from . import sql_models
+from .news_models import NewsPage
+from .pages import MedicineProductPage, PigPage, PigImagePage
+
+logger = logging.getLogger(__name__)
+
+RENDITION_FORMATS = ("webp", "jpeg")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def rendition_specs() -> list:
+    """Filter spec Wagtail cho mọi (chiều rộng, định dạng) cần sinh."""
+    widths = getattr(settings, "RENDITION_WIDTHS", [320, 640, 1024])
+    return [f"width-{width}|format-{fmt}" for width in widths for fmt in RENDITION_FORMATS]
+
+
+def image_ids_for_page(page) -> list:
+    """Các ảnh cần rendition của một page vừa publish."""
+    if isinstance(page, NewsPage):
+        return [page.cover_id] if page.cover_id else []
+    if isinstance(page, PigImagePage):
+        return [page.image_id] if page.image_id else []
+    if isinstance(page, (MedicineProductPage, PigPage)):
+        return [image_id for image_id in page.images.values_list("image_id", flat=True) if image_id]
+    return []
+
+
+def generate_renditions(image_id: int) -> int:
+    """Sinh và lưu rendition cho một ảnh; trả về số rendition đã lưu.
+
+    Bỏ qua nếu ảnh đã có đủ rendition cho bộ spec hiện tại, sinh từ đúng file
+    hiện tại (file_hash). Thay file giữ nguyên id ảnh: rendition Wagtail cũ bị xoá
+    để file mới nằm ở đường dẫn hash mới (URL cũ được cache immutable), các dòng
+    image_renditions cũ được thay hết.
+    """
+    image = get_image_model().objects.filter(id=image_id).first()
+    if image is None:
+        return 0
+
+    specs = rendition_specs()
+    file_hash = image.get_file_hash()
+    existing = set(
+        sql_models.ImageRendition.objects.filter(image_id=image_id).values_list("spec", "file_hash")
+    )
+    if existing == {(spec, file_hash) for spec in specs}:
+        return 0
+    if any(stored_hash != file_hash for _, stored_hash in existing):
+        image.renditions.all().delete()
+
+    renditions = image.get_renditions(*specs)
+    rows = [
+        sql_models.ImageRendition(
+            image_id=image_id,
+            spec=spec,
+            format=spec.rsplit("format-", 1)[1],
+            url=rendition.url,
+            width=rendition.width,
+            height=rendition.height,
+            file_hash=file_hash,
+        )
+        for spec, rendition in renditions.items()
+    ]
+    with transaction.atomic():
+        sql_models.ImageRendition.objects.filter(image_id=image_id).delete()
+        sql_models.ImageRendition.objects.bulk_create(rows)
+    return len(rows)
+
+
+def _run(image_id: int) -> None:
+    try:
+        count = generate_renditions(image_id)
+        if count:
+            logger.info(f"🖼️ Generated {count} renditions for image {image_id}")
+    except Exception as e:
+        logger.error(f"Rendition generation failed for image {image_id}: {e}")
+    finally:
+        # Thread worker có connection riêng
+        connection.close()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "RENDITION_WORKERS", 2),
+                thread_name_prefix="renditions",
+            )
+    return _executor
+
+
+def schedule_renditions(image_ids) -> None:
+    """Đưa ảnh vào worker pool sau khi transaction publish commit.
+
+    RENDITION_WORKERS = 0 thì sinh đồng bộ (dev/test).
+    """
+    image_ids = list(dict.fromkeys(image_ids))
+    if not image_ids:
+        return
+
+    def submit():
+        if getattr(settings, "RENDITION_WORKERS", 2) == 0:
+            for image_id in image_ids:
+                generate_renditions(image_id)
+            return
+        executor = _get_executor()
+        for image_id in image_ids:
+            executor.submit(_run, image_id)
+
+    transaction.on_commit(submit)
+
+
+def srcset_for(image_ids) -> dict:
+    """{image_id: {"webp": [...], "jpeg": [...]}} cho nhiều ảnh trong một query.
+
+    Mỗi phần tử là {"url", "width", "height"}, sắp theo chiều rộng tăng dần.
+    """
+    result = defaultdict(lambda: {fmt: [] for fmt in RENDITION_FORMATS})
+    image_ids = [image_id for image_id in image_ids if image_id]
+    if not image_ids:
+        return {}
+    rows = (
+        sql_models.ImageRendition.objects
+        .filter(image_id__in=image_ids)
+        .order_by("image_id", "width")
+        .values_list("image_id", "format", "url", "width", "height")
+    )
+    for image_id, fmt, url, width, height in rows:
+        result[image_id][fmt].append({"url": url, "width": width, "height": height})
+    return dict(result)
+
+
+def largest_url(srcset, fmt: str = "jpeg"):
+    """URL rendition lớn nhất của một định dạng (fallback cho <img src>)."""
+    if not srcset or not srcset.get(fmt):
+        return None
+    return srcset[fmt][-1]["url"]
@@ -0,0 +1,142 @@
+"""
+Cập nhật search index theo lô ở background.
+
+Wagtail mặc định ghi index ngay trong request lưu (AUTO_UPDATE). Ở đây
+AUTO_UPDATE tắt; post_save/post_delete của mọi model được index chỉ ghi
+(model, pk) vào hàng đợi sau khi transaction commit. Một thread gom hàng đợi
+mỗi SEARCH_INDEX_FLUSH_SECONDS giây và ghi bằng add_bulk — một lần cho mỗi
+model.
+
+Hàng đợi nằm trong bộ nhớ process: nếu process chết trước khi flush thì các
+thay đổi chưa ghi bị mất. Chạy `python manage.py wagtail_update_index` để
+dựng lại toàn bộ index khi cần.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from wagtail.search import index
+from wagtail.search.backends import get_search_backend
+
+logger = logging.getLogger(__name__)
+
+SEARCH_VERSION_KEY = "site-search:version"
+
+_pending = {}  # model label -> set(pk)
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_worker = None
+
+
+def search_version() -> int:
+    """Phiên bản index hiện tại; đổi sau mỗi lần flush để bỏ cache kết quả cũ."""
+    version = cache.get(SEARCH_VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(SEARCH_VERSION_KEY, version, None)
+    return version
+
+
+def _bump_version():
+    try:
+        cache.incr(SEARCH_VERSION_KEY)
+    except ValueError:
+        cache.set(SEARCH_VERSION_KEY, 2, None)
+
+
+def enqueue(model, pk):
+    """Đánh dấu một object cần index lại (thêm, sửa hoặc xoá)."""
+    def add():
+        with _lock:
+            _pending.setdefault(model._meta.label, set()).add(pk)
+            size = sum(len(pks) for pks in _pending.values())
+        if settings.SEARCH_INDEX_FLUSH_SECONDS <= 0:
+            flush()
+        elif size >= settings.SEARCH_INDEX_BATCH_SIZE:
+            _wakeup.set()
+        else:
+            _ensure_worker()
+
+    transaction.on_commit(add)
+
+
+def enqueue_if_indexed(model, pk):
+    """enqueue cho ghi bằng .update() (không có post_save), bỏ qua model không index."""
+    if index.class_is_indexed(model):
+        enqueue(model, pk)
+
+
+def flush() -> int:
+    """Ghi toàn bộ hàng đợi vào backend; trả về số object đã xử lý."""
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+    if not batch:
+        return 0
+
+    backend = get_search_backend()
+    processed = 0
+    for label, pks in batch.items():
+        model = apps.get_model(label)
+        objs = list(model.get_indexed_objects().filter(pk__in=pks))
+        try:
+            backend.add_bulk(model, objs)
+            # Không còn trong get_indexed_objects (xoá, unpublish) -> bỏ khỏi index
+            for pk in pks - {obj.pk for obj in objs}:
+                backend.delete(model(pk=pk))
+        except Exception as e:
+            logger.error(f"Search index flush failed for {label}: {e}")
+            with _lock:
+                _pending.setdefault(label, set()).update(pks)
+            continue
+        processed += len(pks)
+
+    _bump_version()
+    return processed
+
+
+def _run():
+    while True:
+        _wakeup.wait(settings.SEARCH_INDEX_FLUSH_SECONDS)
+        _wakeup.clear()
+        try:
+            # Chờ thêm một nhịp để gom các lần lưu liên tiếp
+            time.sleep(min(settings.SEARCH_INDEX_FLUSH_SECONDS, 0.5))
+            flush()
+        except Exception as e:
+            logger.error(f"Search index worker error: {e}")
+        finally:
+            connection.close()
+
+
+def _ensure_worker():
+    global _worker
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="search-index", daemon=True)
+            _worker.start()
+
+
+def _on_save(sender, instance, **kwargs):
+    enqueue(sender, instance.pk)
+
+
+def _on_delete(sender, instance, **kwargs):
+    enqueue(sender, instance.pk)
+
+
+def register_signal_handlers():
+    """Nối signal cho mọi model được index (gọi từ CoreConfig.ready)."""
+    for model in index.get_indexed_models():
+        if not getattr(model, "search_auto_update", True):
+            continue
+        post_save.connect(_on_save, sender=model, dispatch_uid=f"search-index-save-{model._meta.label}")
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f"search-index-delete-{model._meta.label}")
+    # Cố ghi nốt hàng đợi khi process tắt bình thường
+    atexit.register(flush)
@@ -0,0 +1,220 @@
+"""
+Sitemap XML cho lợn, thuốc và tin tức đã publish, ghi sẵn thành file tĩnh.
+
+- Mỗi loại chia thành shard theo khoảng id: shard k chứa id trong
+  [k * SITEMAP_SHARD_SIZE, (k + 1) * SITEMAP_SHARD_SIZE), tối đa 50k URL mỗi
+  file (giới hạn của sitemaps.org). Một dòng luôn nằm trong đúng một shard.
+- Hook publish/unpublish/delete (core/sync.py) chỉ ghi lại shard chứa dòng vừa
+  đổi (một truy vấn theo khoảng khoá chính) rồi ghi lại file index.
+- lastmod của URL lấy từ updated_at; lastmod của shard là mtime của file, tức
+  lúc nội dung đổi lần cuối (file giống hệt thì không ghi lại). Không dùng
+  updated_at lớn nhất: gỡ dòng mới nhất sẽ làm mốc lùi lại và client gửi
+  If-Modified-Since nhận 304 sai. Ghi index chỉ cần đọc thư mục, không truy vấn DB.
+- File được ghi ra file tạm rồi os.replace(), người đọc không thấy file dở.
+  Khoá file (fcntl, như core/snapshots.py) bao cả đọc DB - render - thay file,
+  nên các worker/process không ghi đè bản mới bằng bản cũ.
+
+Lệnh build_sitemaps dựng lại toàn bộ (lần đầu, hoặc sau khi import hàng loạt).
+File nằm ở SITEMAP_ROOT; nginx (FE-farm/nginx.conf) phục vụ trực tiếp, Django
+chỉ phục vụ khi chạy dev (pig_farm/urls.py).
+"""
+import fcntl
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.views.static import serve
+
+from .sql_models import CmsNewsEntry, Medicine, Pig
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "sitemap.xml"
+SHARD_RE = re.compile(r"^sitemap-(?P<section>[a-z]+)-(?P<shard>\d+)\.xml$")
+
+# loại -> (queryset đã publish, cột thứ hai cho URL, đường dẫn trên FE-farm)
+SECTIONS = {
+    "pig": (lambda: Pig.objects.filter(is_published=True, is_deleted=False), "id",
+            lambda pk, _: f"/products/pig/{pk}"),
+    "medicine": (lambda: Medicine.objects.filter(is_published=True, is_deleted=False), "id",
+                 lambda pk, _: f"/products/medicine/{pk}"),
+    "news": (lambda: CmsNewsEntry.get_news_queryset().filter(is_published=True).exclude(slug=""), "slug",
+             lambda _, slug: f"/news/{quote(slug)}"),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def shard_of(pk: int) -> int:
+    return pk // settings.SITEMAP_SHARD_SIZE
+
+
+def shard_name(section: str, shard: int) -> str:
+    return f"sitemap-{section}-{shard}.xml"
+
+
+def _absolute(path: str) -> str:
+    return settings.SITEMAP_BASE_URL.rstrip("/") + path
+
+
+def _lastmod(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).replace(microsecond=0).isoformat()
+
+
+@contextmanager
+def _locked():
+    os.makedirs(settings.SITEMAP_ROOT, exist_ok=True)
+    with open(os.path.join(settings.SITEMAP_ROOT, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _write_atomic(name: str, content: str) -> bool:
+    """Ghi file nếu nội dung khác bản hiện có (mtime = lúc ghi). Trả về True nếu đã ghi."""
+    os.makedirs(settings.SITEMAP_ROOT, exist_ok=True)
+    try:
+        with open(os.path.join(settings.SITEMAP_ROOT, name), encoding="utf-8") as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    fd, tmp = tempfile.mkstemp(dir=settings.SITEMAP_ROOT, prefix=".tmp-", suffix=".xml")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, os.path.join(settings.SITEMAP_ROOT, name))
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return True
+
+
+def render_urlset(urls) -> str:
+    """urls: [(loc, lastmod datetime)]"""
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    lines.extend(f"<url><loc>{escape(loc)}</loc><lastmod>{_lastmod(lastmod)}</lastmod></url>"
+                 for loc, lastmod in urls)
+    lines.append("</urlset>\n")
+    return "\n".join(lines)
+
+
+def write_shard(section: str, shard: int) -> int:
+    """Ghi lại một shard từ DB; xoá file nếu shard không còn URL. Trả về số URL. Gọi trong _locked()."""
+    queryset, field, path = SECTIONS[section]
+    size = settings.SITEMAP_SHARD_SIZE
+    rows = list(queryset().filter(id__gte=shard * size, id__lt=(shard + 1) * size)
+                .order_by("id").values_list("id", field, "updated_at"))
+    name = shard_name(section, shard)
+    if not rows:
+        try:
+            os.remove(os.path.join(settings.SITEMAP_ROOT, name))
+        except FileNotFoundError:
+            pass
+        return 0
+    _write_atomic(name, render_urlset((_absolute(path(pk, value)), updated_at) for pk, value, updated_at in rows))
+    return len(rows)
+
+
+def shard_files() -> list:
+    """[(tên file, section, shard)] đang có trong SITEMAP_ROOT, theo thứ tự section, shard."""
+    try:
+        names = os.listdir(settings.SITEMAP_ROOT)
+    except FileNotFoundError:
+        return []
+    shards = [(name, m["section"], int(m["shard"])) for name in names if (m := SHARD_RE.match(name))]
+    return sorted(shards, key=lambda item: (item[1], item[2]))
+
+
+def write_index() -> int:
+    """Ghi sitemap.xml liệt kê mọi shard (lastmod = mtime của shard). Trả về số shard. Gọi trong _locked()."""
+    entries = []
+    for name, _, _ in shard_files():
+        mtime = os.path.getmtime(os.path.join(settings.SITEMAP_ROOT, name))
+        entries.append(f"<sitemap><loc>{escape(_absolute('/' + name))}</loc>"
+                       f"<lastmod>{_lastmod(datetime.fromtimestamp(mtime, timezone.utc))}</lastmod></sitemap>")
+    _write_atomic(INDEX_NAME, "\n".join([
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+        *entries,
+        "</sitemapindex>\n",
+    ]))
+    return len(entries)
+
+
+def rebuild() -> dict:
+    """Dựng lại mọi shard và index; xoá shard không còn dùng. Trả về {section: số URL}."""
+    counts = {}
+    with _locked():
+        for section, (queryset, _, _) in SECTIONS.items():
+            max_id = queryset().aggregate(top=Max("id"))["top"]
+            shards = range(shard_of(max_id) + 1) if max_id is not None else range(0)
+            counts[section] = sum(write_shard(section, shard) for shard in shards)
+            for name, file_section, shard in shard_files():
+                if file_section == section and shard not in shards:
+                    os.remove(os.path.join(settings.SITEMAP_ROOT, name))
+        write_index()
+    return counts
+
+
+def update(section: str, pk: int):
+    """Ghi lại shard chứa dòng pk và index."""
+    with _locked():
+        write_shard(section, shard_of(pk))
+        write_index()
+
+
+def serve_sitemap(request, path):
+    """Phục vụ file trong SITEMAP_ROOT khi chạy không có nginx (hỗ trợ If-Modified-Since)."""
+    return serve(request, path, document_root=settings.SITEMAP_ROOT)
+
+
+def _sitemap_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Một luồng: các lần ghi lại nối tiếp nhau trong process; giữa các process là _locked()
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sitemap")
+    return _executor
+
+
+def schedule_update(section: str, pk):
+    """Sau khi transaction commit: ghi lại shard của dòng pk (ở background nếu SITEMAP_BACKGROUND)."""
+    if section not in SECTIONS or not pk:
+        return
+
+    def run():
+        try:
+            update(section, pk)
+        except Exception as e:
+            logger.warning(f"Sitemap update failed for {section} {pk}: {e}")
+
+    def schedule():
+        if not settings.SITEMAP_BACKGROUND:
+            run()
+            return
+
+        def run_in_thread():
+            try:
+                run()
+            finally:
+                connection.close()
+
+        _sitemap_executor().submit(run_in_thread)
+
+    transaction.on_commit(schedule)
@@ -0,0 +1,229 @@
+"""
+Snapshot JSON tĩnh của các response /api/ công khai, để nginx (FE-farm/nginx.conf)
+trả thẳng từ đĩa mà không gọi Django/Postgres.
+
+Nội dung: danh sách lợn, thuốc, tin tức (mặc định và trang 1 với các page_size
+FE dùng, như core/warmup.py), danh mục tin tức và trang chi tiết của mọi dòng
+đã publish. Đường dẫn file theo URL:
+    /api/pigs/                      -> api/pigs/index.json
+    /api/pigs/?page=1&page_size=12  -> api/pigs/page-1-size-12.json
+    /api/pigs/5/                    -> api/pigs/5/index.json
+Request có tham số khác (search, category, sort, include...) vẫn đi tới Django.
+
+Phiên bản và swap nguyên tử:
+    SNAPSHOT_ROOT/versions/<version>/api/...
+    SNAPSHOT_ROOT/current -> versions/<version>   (symlink, đổi bằng os.replace)
+nginx luôn đọc qua `current`, nên không bao giờ thấy một bộ file ghi dở.
+
+Hook publish/unpublish/delete (core/sync.py) cập nhật tăng dần sau commit, ngay
+trong phiên bản hiện tại: ghi lại các file danh sách của nhóm bị đổi và file chi
+tiết của các dòng đó (xoá nếu dòng không còn hiển thị). Mỗi file được thay bằng
+os.replace nên nginx thấy bản cũ hoặc bản mới, không bao giờ file ghi dở; chi
+phí theo số file bị đổi, không theo tổng số file. Khoá file (fcntl) giữ cho các
+worker không ghi chồng nhau. Lệnh export_snapshots dựng lại toàn bộ vào một
+phiên bản mới rồi swap.
+
+view_count (tin tức) bị bỏ khỏi snapshot: file tĩnh chỉ đổi khi publish, giữ
+lượt xem trong đó sẽ cho số cũ mãi. FE ẩn lượt xem khi không có trường này;
+nginx vẫn gửi một request mirror tới Django để đếm lượt xem.
+"""
+import fcntl
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.urls import reverse
+
+from . import warmup
+
+logger = logging.getLogger(__name__)
+
+CURRENT = "current"
+VERSIONS = "versions"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def list_targets(group):
+    """Danh sách mặc định (index.json) + trang 1 với các page_size FE dùng (+ danh mục với news)."""
+    name, view = warmup.LIST_VIEWS[group]
+    return [warmup.Target(view, reverse(name), {}, {})] + warmup.list_targets(group)
+
+
+def detail_ids(group):
+    return warmup.DETAIL_VIEWS[group][3]().values_list("id", flat=True)
+
+
+def target_file(target) -> str:
+    """Đường dẫn tương đối của file snapshot cho một target."""
+    directory = target.path.strip("/")
+    if not target.params:
+        return f"{directory}/index.json"
+    return f"{directory}/page-{target.params['page']}-size-{target.params['page_size']}.json"
+
+
+def _without_live_fields(content):
+    """Bỏ các trường đổi theo request (view_count) khỏi item trong "data"."""
+    if b'"view_count"' not in content:
+        return content
+    body = json.loads(content)
+    items = body["data"] if isinstance(body.get("data"), list) else [body.get("data")]
+    for item in items:
+        if isinstance(item, dict):
+            item.pop("view_count", None)
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def render(target):
+    """Nội dung response 200 của target (không qua cache /api/), None nếu không còn hiển thị."""
+    response = target.view.uncached_view(warmup.make_request(target.path, target.params), **target.kwargs)
+    return _without_live_fields(response.content) if response.status_code == 200 else None
+
+
+def current_dir():
+    path = os.path.join(settings.SNAPSHOT_ROOT, CURRENT)
+    return os.path.realpath(path) if os.path.islink(path) else None
+
+
+def _write(version_dir, relpath, content):
+    path = os.path.join(version_dir, relpath)
+    os.makedirs(os.path.dirname(path), mode=0o755, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.chmod(tmp, 0o644)
+        # Đổi tên nguyên tử: nginx đang đọc file cũ vẫn đọc hết bản cũ
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _remove(version_dir, relpath):
+    try:
+        os.remove(os.path.join(version_dir, relpath))
+        os.rmdir(os.path.dirname(os.path.join(version_dir, relpath)))
+    except OSError:  # chưa có file, hoặc thư mục còn file khác
+        pass
+
+
+def _export(version_dir, target) -> bool:
+    content = render(target)
+    if content is None:
+        _remove(version_dir, target_file(target))
+        return False
+    _write(version_dir, target_file(target), content)
+    return True
+
+
+def _new_version():
+    versions = os.path.join(settings.SNAPSHOT_ROOT, VERSIONS)
+    os.makedirs(versions, exist_ok=True)
+    # Tên sắp theo thời điểm tạo (ns): _swap dọn bản cũ theo thứ tự tên
+    version_dir = tempfile.mkdtemp(dir=versions, prefix=f"{time.time_ns()}-")
+    os.chmod(version_dir, 0o755)
+    return version_dir
+
+
+def _swap(version_dir):
+    """Trỏ current sang phiên bản mới (symlink tương đối, đổi nguyên tử) rồi dọn bản cũ."""
+    root = settings.SNAPSHOT_ROOT
+    tmp = os.path.join(root, f".{CURRENT}-{os.getpid()}-{threading.get_ident()}")
+    os.symlink(os.path.relpath(version_dir, root), tmp)
+    os.replace(tmp, os.path.join(root, CURRENT))
+
+    versions = os.path.join(root, VERSIONS)
+    old = sorted(name for name in os.listdir(versions) if os.path.join(versions, name) != version_dir)
+    # Giữ vài bản trước cho request nginx đang đọc dở
+    for name in old[:max(0, len(old) - settings.SNAPSHOT_KEEP_VERSIONS + 1)]:
+        shutil.rmtree(os.path.join(versions, name), ignore_errors=True)
+
+
+@contextmanager
+def _building():
+    """Phiên bản mới, giữ khoá tới khi swap; lỗi giữa chừng thì bỏ phiên bản dở."""
+    with _locked():
+        version_dir = _new_version()
+        try:
+            yield version_dir
+        except BaseException:
+            shutil.rmtree(version_dir, ignore_errors=True)
+            raise
+        _swap(version_dir)
+
+
+@contextmanager
+def _locked():
+    os.makedirs(settings.SNAPSHOT_ROOT, exist_ok=True)
+    with open(os.path.join(settings.SNAPSHOT_ROOT, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def export_all() -> dict:
+    """Dựng một phiên bản đầy đủ rồi swap; trả về {nhóm: số file}."""
+    counts = {}
+    with _building() as version_dir:
+        for group in warmup.LIST_VIEWS:
+            targets = list_targets(group) + [warmup.detail_target(group, pk) for pk in detail_ids(group).iterator()]
+            counts[group] = sum(_export(version_dir, target) for target in targets)
+    return counts
+
+
+def update(group, *pks) -> int:
+    """Ghi lại danh sách của nhóm và chi tiết của các dòng pks vào phiên bản hiện tại; trả về số file đã ghi."""
+    with _locked():
+        # current được đọc sau khi có khoá: export_all có thể vừa swap
+        version_dir = current_dir()
+        if version_dir is not None:
+            targets = list_targets(group) + [warmup.detail_target(group, pk) for pk in dict.fromkeys(pks) if pk]
+            return sum(_export(version_dir, target) for target in targets)
+    return sum(export_all().values())
+
+
+def _snapshot_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+    return _executor
+
+
+def schedule_update(group, *pks):
+    """Sau khi transaction commit: cập nhật snapshot của nhóm (ở background nếu SNAPSHOT_BACKGROUND)."""
+    if not settings.SNAPSHOT_ENABLED or group not in warmup.LIST_VIEWS:
+        return
+
+    def run():
+        try:
+            update(group, *pks)
+        except Exception as e:
+            logger.warning(f"Snapshot update failed for {group} {pks}: {e}")
+
+    def schedule():
+        if not settings.SNAPSHOT_BACKGROUND:
+            run()
+            return
+
+        def run_in_thread():
+            try:
+                run()
+            finally:
+                connection.close()
+
+        _snapshot_executor().submit(run_in_thread)
+
+    transaction.on_commit(schedule)
@@ -1,5 +1,8 @@
+from urllib.parse import quote
+
 
 from django.db import models
+from wagtail.search import index
 
 
 class CmsNewsEntry(models.Model):
@@ -24,12 +27,17 @@ class CmsNewsEntry(models.Model):
     published_at = models.DateTimeField(null=True, blank=True)
     is_published = models.BooleanField(default=False)
     is_deleted = models.BooleanField(default=False)  # Soft delete
+    content_hash = models.CharField(max_length=64, null=True, blank=True)  # Hash dữ liệu đồng bộ từ Wagtail
+    deleted_at = models.DateTimeField(null=True, blank=True)  # Timestamp when deleted
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.title or f"CmsNewsEntry #{self.id}"
 
+    def get_url(self):
+        return f"/news/{quote(self.slug)}"
+
     def get_tags_list(self):
         """Extract tags from body_json if exists"""
         if self.body_json:
@@ -62,10 +70,11 @@ class CmsNewsEntry(models.Model):
         return ""
 
     def get_featured_image_url(self):
-        """Get featured image URL if cover_image_id exists"""
-        # This would need integration with Wagtail images
-        # For now, return None
-        return None
+        """Get featured image URL (largest pre-generated JPEG rendition) if cover_image_id exists"""
+        if not self.cover_image_id:
+            return None
+        from .renditions import largest_url, srcset_for
+        return largest_url(srcset_for([self.cover_image_id]).get(self.cover_image_id))
 
     @classmethod
     def get_news_queryset(cls):
@@ -73,11 +82,20 @@ class CmsNewsEntry(models.Model):
         return cls.objects.filter(kind_id=2, is_deleted=False)  # kind_id=2 is 'news'
 
 
-class Medicine(models.Model):
+class Medicine(index.Indexed, models.Model):
     class Meta:
         db_table = "product_medicine"
         managed = False
 
+    # Tìm kiếm toàn site (search/views.py) gồm cả dòng SQL
+    search_fields = [
+        index.SearchField("name", boost=2),
+        index.AutocompleteField("name"),
+        index.SearchField("packaging"),
+        index.FilterField("is_published"),
+        index.FilterField("is_deleted"),
+    ]
+
     id = models.BigAutoField(primary_key=True)
     name = models.TextField()
     packaging = models.TextField(null=True, blank=True)
@@ -85,6 +103,7 @@ class Medicine(models.Model):
     price_total = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
     is_published = models.BooleanField(default=False)
     is_deleted = models.BooleanField(default=False)  # Soft delete
+    content_hash = models.CharField(max_length=64, null=True, blank=True)  # Hash dữ liệu đồng bộ từ Wagtail
     published_at = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)  # Auto update on save
     deleted_at = models.DateTimeField(null=True, blank=True)  # Timestamp when deleted
@@ -92,17 +111,33 @@ class Medicine(models.Model):
     def __str__(self):
         return self.name or f"Medicine #{self.id}"
 
+    @classmethod
+    def get_indexed_objects(cls):
+        """Chỉ index dòng đang hiển thị trên web"""
+        return cls.objects.filter(is_published=True, is_deleted=False)
+
+    def get_url(self):
+        return f"/products/medicine/{self.id}"
+
 
-class Pig(models.Model):
+class Pig(index.Indexed, models.Model):
     class Meta:
         db_table = "product_pig"
         managed = False
 
+    search_fields = [
+        index.SearchField("name", boost=2),
+        index.AutocompleteField("name"),
+        index.FilterField("is_published"),
+        index.FilterField("is_deleted"),
+    ]
+
     id = models.BigAutoField(primary_key=True)
     name = models.TextField()
     price = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
     is_published = models.BooleanField(default=False)
     is_deleted = models.BooleanField(default=False)  # Soft delete
+    content_hash = models.CharField(max_length=64, null=True, blank=True)  # Hash dữ liệu đồng bộ từ Wagtail
     published_at = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)  # Auto update on save
     deleted_at = models.DateTimeField(null=True, blank=True)  # Timestamp when deleted
@@ -110,6 +145,14 @@ class Pig(models.Model):
     def __str__(self):
         return self.name or f"Pig #{self.id}"
 
+    @classmethod
+    def get_indexed_objects(cls):
+        """Chỉ index dòng đang hiển thị trên web"""
+        return cls.objects.filter(is_published=True, is_deleted=False)
+
+    def get_url(self):
+        return f"/products/pig/{self.id}"
+
 
 class CmsContentEntry(models.Model):
     class Meta:
@@ -122,6 +165,7 @@ class CmsContentEntry(models.Model):
     title = models.TextField()
     is_published = models.BooleanField(default=False)
     is_deleted = models.BooleanField(default=False)  # Soft delete
+    content_hash = models.CharField(max_length=64, null=True, blank=True)  # Hash dữ liệu đồng bộ từ Wagtail
     published_at = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)  # Auto update on save
     deleted_at = models.DateTimeField(null=True, blank=True)  # Timestamp when deleted
@@ -147,6 +191,7 @@ class PigImage(models.Model):
     height = models.IntegerField(null=True, blank=True)
     is_published = models.BooleanField(default=False)
     is_deleted = models.BooleanField(default=False)  # Soft delete
+    content_hash = models.CharField(max_length=64, null=True, blank=True)  # Hash dữ liệu đồng bộ từ Wagtail
     published_at = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)  # Auto update on save
     created_at = models.DateTimeField(auto_now_add=True)  # Auto set on create
@@ -184,6 +229,7 @@ class NewsCategory(models.Model):
     sort_order = models.IntegerField(default=0)
     is_published = models.BooleanField(default=False)
     is_deleted = models.BooleanField(default=False)  # Soft delete
+    content_hash = models.CharField(max_length=64, null=True, blank=True)  # Hash dữ liệu đồng bộ từ Wagtail
     published_at = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)  # Auto update on save
     created_at = models.DateTimeField(auto_now_add=True)  # Auto set on create
@@ -257,3 +303,171 @@ class NewsArticle(models.Model):
         if self.view_count >= 1000:
             return f"{self.view_count/1000:.1f}k lượt xem"
         return f"{self.view_count} lượt xem"
+
+
+class ImageRendition(models.Model):
+    """Unmanaged model cho bảng image_renditions - rendition sinh sẵn khi publish (core/renditions.py)"""
+    class Meta:
+        db_table = "image_renditions"
+        managed = False
+
+    id = models.BigAutoField(primary_key=True)
+    image_id = models.BigIntegerField()  # wagtailimages_image.id
+    spec = models.TextField()  # Filter spec Wagtail, ví dụ 'width-640|format-webp'
+    format = models.CharField(max_length=10)  # 'webp' | 'jpeg'
+    url = models.TextField()
+    width = models.IntegerField()
+    height = models.IntegerField()
+    file_hash = models.CharField(max_length=40, default="")  # file_hash của ảnh gốc lúc sinh rendition
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Rendition {self.spec} of image #{self.image_id}"
+
+
+class NewsViewCounter(models.Model):
+    """Unmanaged model cho bảng news_view_counters - lượt xem tin tức, ghi theo lô (core/view_counter.py)"""
+    class Meta:
+        db_table = "news_view_counters"
+        managed = False
+
+    entry_id = models.BigIntegerField(primary_key=True)  # cms_content_entry.id
+    view_count = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.view_count} views of entry #{self.entry_id}"
+
+
+class NewsViewHourly(models.Model):
+    """Unmanaged model cho bảng news_view_hourly - lượt xem mỗi bài theo giờ (UTC)"""
+    class Meta:
+        db_table = "news_view_hourly"
+        managed = False
+
+    pk = models.CompositePrimaryKey("entry_id", "bucket_hour")
+    entry_id = models.BigIntegerField()  # cms_content_entry.id
+    bucket_hour = models.DateTimeField()  # đầu giờ
+    views = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.views} views of entry #{self.entry_id} at {self.bucket_hour:%Y-%m-%d %H:00}"
+
+
+class NewsTrendingScore(models.Model):
+    """Unmanaged model cho bảng news_trending_scores - điểm trending tính sẵn (core/trending.py)"""
+    class Meta:
+        db_table = "news_trending_scores"
+        managed = False
+
+    entry_id = models.BigIntegerField(primary_key=True)  # cms_content_entry.id
+    score = models.FloatField()  # base_score giảm dần tới giờ tính + lượt xem 2 giờ gần nhất
+    base_score = models.FloatField()  # tổng các bucket đã đóng, quy về base_hour
+    base_hour = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Entry #{self.entry_id}: {self.score:.2f}"
+
+
+class CatalogChange(models.Model):
+    """Unmanaged model cho bảng catalog_changes - seq thay đổi mới nhất của mỗi dòng, do trigger ghi (core/changes.py)"""
+    class Meta:
+        db_table = "catalog_changes"
+        managed = False
+
+    pk = models.CompositePrimaryKey("entity", "entity_id")
+    entity = models.CharField(max_length=20)  # 'pig' | 'medicine' | 'category' | 'news'
+    entity_id = models.BigIntegerField()  # id trong bảng nguồn
+    seq = models.BigIntegerField(unique=True)  # nextval('catalog_change_seq'), lúc trigger chạy
+    xid = models.BigIntegerField(default=0)  # pg_current_xact_id() của transaction đã ghi dòng
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.entity} #{self.entity_id} @ {self.seq}"
+
+
+# ===== View <table>_all: bảng nóng UNION ALL bảng archive (lệnh archive_deleted_rows) =====
+
+class MedicineAll(models.Model):
+    """Unmanaged model cho view product_medicine_all - gồm cả dòng đã archive"""
+    class Meta:
+        db_table = "product_medicine_all"
+        managed = False
+
+    id = models.BigIntegerField(primary_key=True)
+    name = models.TextField()
+    packaging = models.TextField(null=True, blank=True)
+    price_unit = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    price_total = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    is_published = models.BooleanField(default=False)
+    is_deleted = models.BooleanField(default=False)
+    published_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    is_archived = models.BooleanField(default=False)
+
+    def __str__(self):
+        return self.name or f"Medicine #{self.id}"
+
+
+class PigAll(models.Model):
+    """Unmanaged model cho view product_pig_all - gồm cả dòng đã archive"""
+    class Meta:
+        db_table = "product_pig_all"
+        managed = False
+
+    id = models.BigIntegerField(primary_key=True)
+    name = models.TextField()
+    price = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    is_published = models.BooleanField(default=False)
+    is_deleted = models.BooleanField(default=False)
+    published_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    is_archived = models.BooleanField(default=False)
+
+    def __str__(self):
+        return self.name or f"Pig #{self.id}"
+
+
+class PigImageAll(models.Model):
+    """Unmanaged model cho view pig_images_all - gồm cả dòng đã archive"""
+    class Meta:
+        db_table = "pig_images_all"
+        managed = False
+
+    id = models.BigIntegerField(primary_key=True)
+    title = models.TextField()
+    image_url = models.TextField()
+    pig_id = models.BigIntegerField(null=True, blank=True)
+    image_type = models.CharField(max_length=50, null=True, blank=True)
+    is_published = models.BooleanField(default=False)
+    is_deleted = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    is_archived = models.BooleanField(default=False)
+
+    def __str__(self):
+        return self.title or f"PigImage #{self.id}"
+
+
+class CmsContentEntryAll(models.Model):
+    """Unmanaged model cho view cms_content_entry_all - gồm cả dòng đã archive"""
+    class Meta:
+        db_table = "cms_content_entry_all"
+        managed = False
+
+    id = models.BigIntegerField(primary_key=True)
+    kind_id = models.SmallIntegerField()
+    slug = models.TextField()
+    title = models.TextField()
+    is_published = models.BooleanField(default=False)
+    is_deleted = models.BooleanField(default=False)
+    published_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    is_archived = models.BooleanField(default=False)
+
+    def __str__(self):
+        return self.title or f"Content #{self.id}"
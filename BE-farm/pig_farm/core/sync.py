@@ -1,521 +1,486 @@
+"""
+Đồng bộ Wagtail Page -> bảng SQL.
 
-from django.db import transaction, DatabaseError
-from wagtail import hooks
-from django.utils import timezone
-from django.core.exceptions import ValidationError, PermissionDenied
+Mỗi loại page có đúng MỘT handler trong SYNC_HANDLERS. Handler so sánh
+content_hash của dữ liệu sẽ ghi với hash đã lưu trên dòng SQL và bỏ qua hoàn
+toàn khi không đổi; giá trị trả về là số câu lệnh ghi để báo cáo mỗi lần publish.
+"""
 import logging
-from wagtail.admin.panels import FieldPanel, InlinePanel, MultiFieldPanel
-from . import sql_models
+from collections import defaultdict
+from typing import Callable, NamedTuple
+
+from django.core.exceptions import PermissionDenied
+from django.db import transaction, connection, DatabaseError
+from django.dispatch import receiver
+from django.utils import timezone
+from wagtail import hooks
+from wagtail.signals import page_published, page_unpublished
+
+from . import api_cache, autocomplete, feeds, sitemaps, snapshots, sql_models, warmup
+from .hashing import content_hash
+from .news_models import NewsPage, news_source, news_values, write_news
 from .pages import MedicineProductPage, PigPage, PigImagePage, NewsCategoryPage
+from .product_gallery import MedicineImageItem, PigImageItem
+from .renditions import image_ids_for_page, schedule_renditions
+from .search_index import enqueue_if_indexed
 from .signals import notify_dev
 
 logger = logging.getLogger(__name__)
 
-def upsert_medicine(page: MedicineProductPage):
-    """Sync MedicineProductPage to SQL medicine table."""
-    try:
-        with transaction.atomic():
-            if page.external_id:
-                try:
-                    obj = sql_models.Medicine.objects.get(id=page.external_id)
-                except sql_models.Medicine.DoesNotExist:
-                    obj = sql_models.Medicine()
-                    page.external_id = None
-            else:
-                obj = sql_models.Medicine()
-            obj.name = page.name
-            obj.packaging = page.packaging or None
-            obj.price_unit = page.price_unit
-            obj.price_total = page.price_total
-            obj.is_published = True
-            obj.published_at = timezone.now()
-            obj.is_deleted = False
-            obj.deleted_at = None
-            obj.save()
-            if not page.external_id:
-                page.external_id = obj.id
-                page.save(update_fields=["external_id"])
-        notify_dev(f"✅ [Wagtail] Medicine upserted → SQL: {page.title} (id={page.external_id})")
-    except DatabaseError as e:
-        logger.error(f"Medicine sync failed for {page.title}: {e}")
-        notify_dev(f"❌ [Wagtail] Medicine sync failed: {page.title} - {str(e)}")
 
-def upsert_pig(page: PigPage):
-    """Sync PigPage to SQL pig table."""
-    try:
-        with transaction.atomic():
-            if page.external_id:
-                try:
-                    obj = sql_models.Pig.objects.get(id=page.external_id)
-                except sql_models.Pig.DoesNotExist:
-                    obj = sql_models.Pig()
-                    page.external_id = None
-            else:
-                obj = sql_models.Pig()
-            obj.name = page.name
-            obj.price = page.price
-            obj.is_published = True
-            obj.published_at = timezone.now()
-            obj.is_deleted = False
-            obj.deleted_at = None
-            obj.save()
-            if not page.external_id:
-                page.external_id = obj.id
-                page.save(update_fields=["external_id"])
-        notify_dev(f"✅ [Wagtail] Pig upserted → SQL: {page.title} (id={page.external_id})")
-    except DatabaseError as e:
-        logger.error(f"Pig sync failed for {page.title}: {e}")
-        notify_dev(f"❌ [Wagtail] Pig sync failed: {page.title} - {str(e)}")
+# ---------- Registry ----------
+
+# page type -> (SQL model, nhãn hiển thị); dùng chung cho publish/unpublish/delete
+SQL_MODELS = {
+    MedicineProductPage: (sql_models.Medicine, "Medicine"),
+    PigPage: (sql_models.Pig, "Pig"),
+    PigImagePage: (sql_models.PigImage, "PigImage"),
+    NewsCategoryPage: (sql_models.NewsCategory, "NewsCategory"),
+    NewsPage: (sql_models.CmsNewsEntry, "News"),
+}
+
+# page type -> (loại trong /api/autocomplete/, tiêu đề hiển thị)
+AUTOCOMPLETE_TITLES = {
+    MedicineProductPage: ("medicine", lambda page: page.name),
+    PigPage: ("pig", lambda page: page.name),
+    NewsPage: ("news", lambda page: page.title),
+}
+
+# page type -> (nhóm response cache của /api/ cần bỏ khi page đổi, id trang chi tiết cần warm lại)
+API_CACHE_GROUPS = {
+    MedicineProductPage: ("medicine", lambda page: page.external_id),
+    PigPage: ("pig", lambda page: page.external_id),
+    # ảnh nằm trong gallery của lợn
+    PigImagePage: ("pig", lambda page: page.pig_reference.external_id if page.pig_reference else None),
+    NewsCategoryPage: ("news", lambda page: None),
+    NewsPage: ("news", lambda page: page.external_id),
+}
+
+# page type -> (bảng nối ảnh, cột khoá ngoài)
+GALLERY_TABLES = {
+    MedicineProductPage: ("product_medicine_image", "medicine_id"),
+    PigPage: ("product_pig_image", "pig_id"),
+}
+
+# page type -> model ảnh của InlinePanel "images"
+GALLERY_ITEMS = {
+    MedicineProductPage: MedicineImageItem,
+    PigPage: PigImageItem,
+}
+
+
+class SyncSpec(NamedTuple):
+    """Handler đồng bộ của một loại page.
+
+    values(page) -> dict các cột nghiệp vụ;
+    write(page, values, image_ids, digest) -> số câu lệnh ghi;
+    source(page) -> dict dữ liệu nguồn để tính hash khi values() tốn kém (render
+    StreamField): hash so được với dòng SQL trước khi gọi values(), và write nhận
+    values=None rồi tự gọi values() khi thật sự cần ghi.
+    """
+    values: Callable
+    write: Callable
+    source: Callable = None
 
 
-def upsert_pig_image(page: PigImagePage):
-    """Sync PigImagePage to SQL pig_images table"""
-    try:
-        with transaction.atomic():
-            if page.external_id:
-                try:
-                    obj = sql_models.PigImage.objects.get(id=page.external_id)
-                except sql_models.PigImage.DoesNotExist:
-                    obj = sql_models.PigImage()
-                    page.external_id = None
-            else:
-                obj = sql_models.PigImage()
-            
-            obj.title = page.title
-            obj.description = page.description or None
-            obj.image_url = page.image.file.url if page.image else None
-            obj.pig_id = page.pig_reference.external_id if page.pig_reference and page.pig_reference.external_id else None
-            obj.image_type = page.image_type
-            obj.file_size = page.file_size
-            obj.width = page.width
-            obj.height = page.height
-            obj.is_published = True
-            obj.published_at = timezone.now()
-            obj.is_deleted = False
-            obj.deleted_at = None
-            obj.save()
-            
-            if not page.external_id:
-                page.external_id = obj.id
-                page.save(update_fields=["external_id"])
-                
-        notify_dev(f"✅ [Wagtail] PigImage upserted → SQL: {page.title} (id={obj.id})")
-        
-    except sql_models.PigImage.DoesNotExist:
-        logger.error(f"PigImage with id={page.external_id} not found for {page.title}")
-        notify_dev(f"❌ [Wagtail] PigImage not found for {page.title} (id={page.external_id})")
-    except DatabaseError as e:
-        logger.error(f"Database error during PigImage sync for {page.title}: {e}")
-        notify_dev(f"❌ [Wagtail] Database error for {page.title}: {str(e)}")
+# page type -> SyncSpec (đúng một handler cho mỗi loại page)
+SYNC_HANDLERS = {}
 
 
-def upsert_news_category(page: NewsCategoryPage):
-    """Sync NewsCategoryPage to SQL news_categories table"""
-    try:
-        with transaction.atomic():
-            if page.external_id:
-                try:
-                    obj = sql_models.NewsCategory.objects.get(id=page.external_id)
-                except sql_models.NewsCategory.DoesNotExist:
-                    obj = sql_models.NewsCategory()
-                    page.external_id = None
-            else:
-                obj = sql_models.NewsCategory()
-            
-            obj.name = page.title
-            obj.slug = page._slug_value()
-            obj.description = page.description or None
-            obj.color = page.color
-            obj.icon = page.icon
-            obj.parent_id = page.parent_category.external_id if page.parent_category and page.parent_category.external_id else None
-            obj.sort_order = page.sort_order
-            obj.is_published = True
-            obj.published_at = timezone.now()
-            obj.is_deleted = False
-            obj.deleted_at = None
-            obj.save()
-            
-            if not page.external_id:
-                page.external_id = obj.id
-                page.save(update_fields=["external_id"])
-                
-        notify_dev(f"✅ [Wagtail] NewsCategory upserted → SQL: {page.title} (id={obj.id})")
-        
-    except sql_models.NewsCategory.DoesNotExist:
-        logger.error(f"NewsCategory with id={page.external_id} not found for {page.title}")
-        notify_dev(f"❌ [Wagtail] NewsCategory not found for {page.title} (id={page.external_id})")
-    except DatabaseError as e:
-        logger.error(f"Database error during NewsCategory sync for {page.title}: {e}")
-        notify_dev(f"❌ [Wagtail] Database error for {page.title}: {str(e)}")
-
-@hooks.register("after_delete_page")
-def on_delete(request, page):
-    if isinstance(page, MedicineProductPage) and page.external_id:
-        # Soft delete cho admin
-        sql_models.Medicine.objects.filter(id=page.external_id).update(is_deleted=True, is_published=False)
-        notify_dev(f"[Wagtail] Medicine soft-deleted: {page.title} (id={page.external_id})")
-    if isinstance(page, PigPage) and page.external_id:
-        sql_models.Pig.objects.filter(id=page.external_id).update(is_deleted=True, is_published=False)
-        notify_dev(f"[Wagtail] Pig soft-deleted: {page.title} (id={page.external_id})")
-
-@hooks.register("after_publish_page")
-def on_publish(request, page):
-    if isinstance(page, MedicineProductPage):
-        upsert_medicine(page)
-    elif isinstance(page, PigPage):
-        upsert_pig(page)
-    elif isinstance(page, PigImagePage):
-        upsert_pig_image(page)
-    elif isinstance(page, NewsCategoryPage):
-        upsert_news_category(page)
-
-
-@hooks.register("after_unpublish_page")
-def on_unpublish(request, page):
-    """Mark SQL record as unpublished."""
-    try:
-        model_mapping = {
-            MedicineProductPage: (sql_models.Medicine, "Medicine"),
-            PigPage: (sql_models.Pig, "Pig"),
-            PigImagePage: (sql_models.PigImage, "PigImage"),
-            NewsCategoryPage: (sql_models.NewsCategory, "NewsCategory"),
-        }
-        model, model_name = model_mapping.get(type(page), (None, None))
-        if model and page.external_id:
-            model.objects.filter(id=page.external_id).update(is_published=False)
-            notify_dev(f"📤 [Wagtail] {model_name} unpublished: {page.title} (id={page.external_id})")
-    except DatabaseError as e:
-        logger.error(f"Unpublish failed for {page.title}: {e}")
-        notify_dev(f"❌ [Wagtail] Unpublish failed: {page.title} - {str(e)}")
+def register_sync(page_cls, write=None, source=None):
+    """Đăng ký hàm values() cho một loại page; mặc định ghi qua ORM (_upsert_row)."""
+    def decorator(values):
+        if page_cls in SYNC_HANDLERS:
+            raise ValueError(f"Sync handler for {page_cls.__name__} already registered")
+        SYNC_HANDLERS[page_cls] = SyncSpec(values, write or _upsert_row, source)
+        return values
+    return decorator
 
 
-@hooks.register("before_delete_page")
-def prevent_hard_delete_and_log(request, page):
-    """
-    Block all hard deletes, including for superusers.
-    Only developers can delete directly in the database.
-    """
-    # Log delete attempt đầu tiên
-    logger.info(f"🔍 DELETE ATTEMPT: {page.__class__.__name__} '{page.title}' by {request.user.username}")
-    notify_dev(f"🔍 [DEBUG] Delete attempt: {page.__class__.__name__} '{page.title}' by {request.user.username}")
-    
-    if isinstance(page, (MedicineProductPage, PigPage, PigImagePage, NewsCategoryPage)):
-        logger.info(f"🚫 Blocking hard delete for {page.title} by user {request.user.username} (superuser: {request.user.is_superuser})")
-        
-        raise PermissionDenied(
-            f"⛔ DELETE BLOCKED! "
-            f"Cannot delete '{page.title}'. "
-            f"Only developers can delete directly in the database. "
-            f"Please use 'Unpublish' instead."
-        )
+# ---------- Helpers: sync image join tables ----------
 
+def _diff_gallery(current: dict, desired: list) -> tuple:
+    """So sánh gallery hiện có trong SQL với thứ tự mong muốn.
 
-@hooks.register("after_delete_page")
-def handle_soft_delete_fallback(request, page):
+    `current` là {image_id: sort} đọc từ bảng nối, `desired` là danh sách
+    image_id theo thứ tự trên UI. Trả về (inserts, deletes, updates) tối thiểu:
+    inserts/updates là list (image_id, sort), deletes là list image_id.
+    Ảnh bị chọn trùng chỉ giữ lần xuất hiện đầu tiên.
     """
-    Fallback handler - nếu somehow page vẫn bị delete, thực hiện soft delete
-    """
-    if isinstance(page, (MedicineProductPage, PigPage, PigImagePage, NewsCategoryPage)):
-        logger.warning(f"🚨 FALLBACK: Page was deleted despite prevention: {page.title}")
-        
-        try:
-            current_time = timezone.now()
-            
-            # Thực hiện soft delete trong SQL database
-            if isinstance(page, MedicineProductPage) and page.external_id:
-                sql_models.Medicine.objects.filter(id=page.external_id).update(
-                    is_published=False,
-                    is_deleted=True,
-                    deleted_at=current_time
-                )
-                notify_dev(f"🗑️ [FALLBACK SOFT DELETE] Medicine: {page.title} (id={page.external_id})")
-                
-            elif isinstance(page, PigPage) and page.external_id:
-                sql_models.Pig.objects.filter(id=page.external_id).update(
-                    is_published=False,
-                    is_deleted=True,
-                    deleted_at=current_time
-                )
-                notify_dev(f"🗑️ [FALLBACK SOFT DELETE] Pig: {page.title} (id={page.external_id})")
-                
-            elif isinstance(page, PigImagePage) and page.external_id:
-                sql_models.PigImage.objects.filter(id=page.external_id).update(
-                    is_published=False,
-                    is_deleted=True,
-                    deleted_at=current_time
-                )
-                notify_dev(f"🗑️ [FALLBACK SOFT DELETE] PigImage: {page.title} (id={page.external_id})")
-                
-            elif isinstance(page, NewsCategoryPage) and page.external_id:
-                sql_models.NewsCategory.objects.filter(id=page.external_id).update(
-                    is_published=False,
-                    is_deleted=True,
-                    deleted_at=current_time
-                )
-                notify_dev(f"🗑️ [FALLBACK SOFT DELETE] NewsCategory: {page.title} (id={page.external_id})")
-                
-        except Exception as e:
-            logger.error(f"Fallback soft delete failed for {page.title}: {e}")
-            notify_dev(f"❌ [FALLBACK] Soft delete failed: {page.title} - {str(e)}")
-
-
-
-from django.db import transaction, connection
-from wagtail import hooks
-from django.utils import timezone
-from . import sql_models
-from .pages import MedicineProductPage, PigPage
-
-def _sync_medicine_images(external_id: int, page: MedicineProductPage):
-    """Đồng bộ bảng nối product_medicine_image từ InlinePanel images."""
-    # Xoá các liên kết cũ rồi chèn lại theo thứ tự
-    with connection.cursor() as cur:
-        cur.execute("DELETE FROM product_medicine_image WHERE medicine_id=%s", [external_id])
-        # Insert theo thứ tự sort_index của Orderable
-        sort = 0
-        for item in page.images.all():
-            if item.image_id:
-                cur.execute(
-                    "INSERT INTO product_medicine_image (medicine_id, image_id, sort) VALUES (%s, %s, %s)",
-                    [external_id, item.image_id, sort],
-                )
-                sort += 1
-
-def _sync_pig_images(external_id: int, page: PigPage):
-    """Đồng bộ bảng nối product_pig_image từ InlinePanel images."""
-    with connection.cursor() as cur:
-        cur.execute("DELETE FROM product_pig_image WHERE pig_id=%s", [external_id])
-        sort = 0
-        for item in page.images.all():
-            if item.image_id:
-                cur.execute(
-                    "INSERT INTO product_pig_image (pig_id, image_id, sort) VALUES (%s, %s, %s)",
-                    [external_id, item.image_id, sort],
-                )
-                sort += 1
-
-def upsert_medicine(page: MedicineProductPage):
-    with transaction.atomic():
-        if page.external_id:
-            obj = sql_models.Medicine.objects.select_for_update().get(id=page.external_id)
-        else:
-            obj = sql_models.Medicine()
-        obj.name = page.name
-        obj.packaging = page.packaging or None
-        obj.price_unit = page.price_unit
-        obj.price_total = page.price_total
-        obj.is_published = True
-        obj.published_at = timezone.now()
-        obj.save()
-        if not page.external_id:
-            page.external_id = obj.id
-            page.save(update_fields=["external_id"])
-
-        # Đồng bộ ảnh sang bảng nối
-        _sync_medicine_images(page.external_id, page)
-
-    notify_dev(f"[Wagtail] Medicine upserted → SQL: {page.title} (id={page.external_id})")
-
-def upsert_pig(page: PigPage):
-    with transaction.atomic():
-        if page.external_id:
-            obj = sql_models.Pig.objects.select_for_update().get(id=page.external_id)
-        else:
-            obj = sql_models.Pig()
-        obj.name = page.name
-        obj.price = page.price
-        obj.is_published = True
-        obj.published_at = timezone.now()
-        obj.save()
-        if not page.external_id:
-            page.external_id = obj.id
-            page.save(update_fields=["external_id"])
+    wanted = {}
+    for image_id in desired:
+        if image_id and image_id not in wanted:
+            wanted[image_id] = len(wanted)
 
-        # Đồng bộ ảnh sang bảng nối
-        _sync_pig_images(page.external_id, page)
+    inserts = [(image_id, sort) for image_id, sort in wanted.items() if image_id not in current]
+    updates = [
+        (image_id, sort) for image_id, sort in wanted.items()
+        if image_id in current and current[image_id] != sort
+    ]
+    deletes = [image_id for image_id in current if image_id not in wanted]
+    return inserts, deletes, updates
 
-    notify_dev(f"[Wagtail] Pig upserted → SQL: {page.title} (id={page.external_id})")
 
-@hooks.register("after_publish_page")
-def on_publish(request, page):
-    if isinstance(page, MedicineProductPage):
-        upsert_medicine(page)
-    elif isinstance(page, PigPage):
-        upsert_pig(page)
+def _split_duplicates(rows) -> tuple:
+    """({image_id: sort}, {image_id bị lặp}) từ các dòng (image_id, sort) của bảng nối.
 
-@hooks.register("after_unpublish_page")
-def on_unpublish(request, page):
-    if isinstance(page, MedicineProductPage) and page.external_id:
-        sql_models.Medicine.objects.filter(id=page.external_id).update(is_published=False)
-        notify_dev(f"[Wagtail] Medicine unpublished: {page.title} (id={page.external_id})")
-    if isinstance(page, PigPage) and page.external_id:
-        sql_models.Pig.objects.filter(id=page.external_id).update(is_published=False)
-        notify_dev(f"[Wagtail] Pig unpublished: {page.title} (id={page.external_id})")
+    Code delete/re-insert cũ có thể để lại nhiều dòng cùng (owner, image_id);
+    các ảnh đó bị xoá hết rồi insert lại đúng một dòng.
+    """
+    current, duplicates = {}, set()
+    for image_id, sort in rows:
+        if image_id in current:
+            duplicates.add(image_id)
+        current[image_id] = sort
+    for image_id in duplicates:
+        del current[image_id]
+    return current, duplicates
 
-@hooks.register("after_delete_page")
-def on_delete(request, page):
-    if isinstance(page, MedicineProductPage) and page.external_id:
-        # Soft delete + clear gallery
-        sql_models.Medicine.objects.filter(id=page.external_id).update(is_published=False, is_deleted=True)
-        with connection.cursor() as cur:
-            cur.execute("DELETE FROM product_medicine_image WHERE medicine_id=%s", [page.external_id])
-        notify_dev(f"[Wagtail] Medicine deleted (soft): {page.title} (id={page.external_id})")
-    if isinstance(page, PigPage) and page.external_id:
-        sql_models.Pig.objects.filter(id=page.external_id).update(is_published=False, is_deleted=True)
-        with connection.cursor() as cur:
-            cur.execute("DELETE FROM product_pig_image WHERE pig_id=%s", [page.external_id])
-        notify_dev(f"[Wagtail] Pig deleted (soft): {page.title} (id={page.external_id})")
-
-
-# core/sync.py
-from django.db import transaction, connection
-from django.utils import timezone
-from wagtail import hooks
 
-from . import sql_models
-from .pages import MedicineProductPage, PigPage
-from .signals import notify_dev
+def _sync_gallery(table: str, fk: str, owner_id: int, image_ids: list) -> bool:
+    """Đồng bộ một bảng nối ảnh theo diff; trả về True nếu có ghi DB.
 
+    Đọc các dòng hiện có một lần, rồi áp insert/delete/update sort trong MỘT câu
+    lệnh (writable CTE của Postgres). Gallery không đổi thì không ghi gì cả.
+    """
+    with connection.cursor() as cur:
+        cur.execute(f"SELECT image_id, sort FROM {table} WHERE {fk}=%s", [owner_id])
+        current, duplicates = _split_duplicates(cur.fetchall())
 
-# ---------- Helpers: sync image join tables ----------
+        inserts, deletes, updates = _diff_gallery(current, image_ids)
+        # DELETE và INSERT trong cùng câu lệnh thấy cùng snapshot: dòng mới không bị xoá
+        deletes += sorted(duplicates)
+        if not (inserts or deletes or updates):
+            return False
 
-def _sync_medicine_images(medicine_id: int, page: MedicineProductPage) -> None:    
-    with connection.cursor() as cur:
-        # Clear old relations
         cur.execute(
-            "DELETE FROM product_medicine_image WHERE medicine_id=(%s)",
-            [medicine_id]
+            f"""
+            WITH del AS (
+                DELETE FROM {table} WHERE {fk}=%s AND image_id = ANY(%s::bigint[])
+            ), upd AS (
+                UPDATE {table} AS t SET sort = d.sort
+                FROM unnest(%s::bigint[], %s::int[]) AS d(image_id, sort)
+                WHERE t.{fk}=%s AND t.image_id = d.image_id
+            )
+            INSERT INTO {table} ({fk}, image_id, sort)
+            SELECT %s, d.image_id, d.sort
+            FROM unnest(%s::bigint[], %s::int[]) AS d(image_id, sort)
+            """,
+            [
+                owner_id, deletes,
+                [i for i, _ in updates], [s for _, s in updates], owner_id,
+                owner_id, [i for i, _ in inserts], [s for _, s in inserts],
+            ],
         )
+    return True
 
-        # Re-insert by current order in UI
-        sort = 0
-        for item in page.images.order_by("sort_order").all():
-            # item.image là Wagtail Image, dùng ID để tham chiếu lỏng
-            if item.image_id:
-                cur.execute(
-                    "INSERT INTO product_medicine_image (medicine_id, image_id, sort) VALUES (%s, %s, %s)",
-                    [medicine_id, item.image_id, sort],
-                )
-                sort += 1
 
+def _gallery(page) -> list:
+    """(image_id, file_hash) theo thứ tự kéo-thả trong InlinePanel (item.image là Wagtail Image)."""
+    return [
+        (image_id, file_hash)
+        for image_id, file_hash in (
+            page.images.order_by("sort_order").values_list("image_id", "image__file_hash")
+        )
+        if image_id
+    ]
 
-def _sync_pig_images(pig_id: int, page: PigPage) -> None:
 
-    with connection.cursor() as cur:
-        cur.execute("DELETE FROM product_pig_image WHERE pig_id=%s", [pig_id])
+def load_galleries(page_cls, page_ids) -> dict:
+    """{page_id: [(image_id, file_hash) theo sort_order]} cho nhiều page trong một query."""
+    result = defaultdict(list)
+    items = (
+        GALLERY_ITEMS[page_cls].objects
+        .filter(page_id__in=page_ids, image_id__isnull=False)
+        .order_by("page_id", "sort_order")
+        .values_list("page_id", "image_id", "image__file_hash")
+    )
+    for page_id, image_id, file_hash in items:
+        result[page_id].append((image_id, file_hash))
+    return result
+
 
-        sort = 0
-        for item in page.images.order_by("sort_order").all():
-            if item.image_id:
-                cur.execute(
-                    "INSERT INTO product_pig_image (pig_id, image_id, sort) VALUES (%s, %s, %s)",
-                    [pig_id, item.image_id, sort],
-                )
-                sort += 1
+def state_digest(values: dict, gallery) -> str:
+    """content_hash của dòng SQL + gallery; file_hash có trong hash nên thay file ảnh (giữ id) cũng đổi digest."""
+    return content_hash({**values, "images": [[image_id, file_hash] for image_id, file_hash in gallery]})
 
 
 # ---------- Upsert main rows + image relations ----------
 
-def upsert_medicine(page: MedicineProductPage) -> None:
+def sync_state(page, gallery=None, render=True) -> tuple:
+    """(values, image_ids, digest) mà dòng SQL của page cần có.
+
+    `gallery` [(image_id, file_hash)] có thể truyền sẵn (reconcile nạp theo lô);
+    gallery được tính vào hash nên publish lại một page không đổi chỉ tốn một
+    lần SELECT. Handler có source(): digest tính từ dữ liệu nguồn, và
+    render=False trả về values=None để write chỉ render khi hash khác.
+    """
+    spec = SYNC_HANDLERS[type(page)]
+    if gallery is None:
+        gallery = _gallery(page) if type(page) in GALLERY_TABLES else []
+    image_ids = [image_id for image_id, _ in gallery]
+    if spec.source:
+        return (spec.values(page) if render else None), image_ids, state_digest(spec.source(page), gallery)
+    values = spec.values(page)
+    return values, image_ids, state_digest(values, gallery)
+
+
+def apply_row_values(obj, values: dict, digest: str, now) -> None:
+    """Gán dữ liệu đã publish lên một dòng SQL (chưa save)."""
+    for name, value in values.items():
+        setattr(obj, name, value)
+    obj.content_hash = digest
+    obj.is_published = True
+    obj.published_at = now
+    obj.is_deleted = False
+    obj.deleted_at = None
+
+
+def _upsert_row(page, values: dict, image_ids: list, digest: str) -> int:
+    """Upsert dòng SQL tương ứng với page qua ORM; trả về số câu lệnh ghi."""
+    model, _ = SQL_MODELS[type(page)]
+    gallery = GALLERY_TABLES.get(type(page))
 
     with transaction.atomic():
+        obj = None
         if page.external_id:
-            obj = sql_models.Medicine.objects.select_for_update().get(id=page.external_id)
-        else:
-            obj = sql_models.Medicine()
-
-        # Map các field tối thiểu (mở rộng theo schema của bạn)
-        obj.name = page.name
-        obj.packaging = page.packaging or None
-        obj.price_unit = page.price_unit
-        obj.price_total = page.price_total
-        obj.is_published = True
-        # Nếu bạn có cột is_deleted trong model map:
-        if hasattr(obj, "is_deleted"):
-            obj.is_deleted = False
-        obj.published_at = timezone.now()
+            obj = model.objects.select_for_update().filter(id=page.external_id).first()
+        if obj is not None and obj.content_hash == digest and obj.is_published and not obj.is_deleted:
+            return 0
+
+        if obj is None:
+            obj = model()
+        apply_row_values(obj, values, digest, timezone.now())
         obj.save()
+        writes = 1
 
-        # Gắn external_id nếu là insert lần đầu
-        if not page.external_id:
+        if page.external_id != obj.id:
             page.external_id = obj.id
-            page.save(update_fields=["external_id"])
+            type(page).objects.filter(pk=page.pk).update(external_id=obj.id)
+
+        if gallery and _sync_gallery(*gallery, obj.id, image_ids):
+            writes += 1
+    return writes
+
+
+@register_sync(MedicineProductPage)
+def medicine_values(page: MedicineProductPage) -> dict:
+    """MedicineProductPage -> product_medicine."""
+    return {
+        "name": page.name,
+        "packaging": page.packaging or None,
+        "price_unit": page.price_unit,
+        "price_total": page.price_total,
+    }
+
+
+@register_sync(PigPage)
+def pig_values(page: PigPage) -> dict:
+    """PigPage -> product_pig."""
+    return {
+        "name": page.name,
+        "price": page.price,
+    }
+
+
+@register_sync(PigImagePage)
+def pig_image_values(page: PigImagePage) -> dict:
+    """PigImagePage -> pig_images."""
+    pig = page.pig_reference
+    return {
+        "title": page.title,
+        "description": page.description or None,
+        "image_url": page.image.file.url if page.image else None,
+        "pig_id": pig.external_id if pig and pig.external_id else None,
+        "image_type": page.image_type,
+        "file_size": page.file_size,
+        "width": page.width,
+        "height": page.height,
+    }
+
+
+@register_sync(NewsCategoryPage)
+def news_category_values(page: NewsCategoryPage) -> dict:
+    """NewsCategoryPage -> news_categories."""
+    parent = page.parent_category
+    return {
+        "name": page.title,
+        "slug": page._slug_value(),
+        "description": page.description or None,
+        "color": page.color,
+        "icon": page.icon,
+        "parent_id": parent.external_id if parent and parent.external_id else None,
+        "sort_order": page.sort_order,
+    }
+
+
+def _write_news(page: NewsPage, values: dict, image_ids: list, digest: str) -> int:
+    # Tin tức không có gallery; ghi bằng SQL thuần trong news_models
+    return write_news(page, values, digest)
+
+
+register_sync(NewsPage, write=_write_news, source=news_source)(news_values)
+
+
+def dispatch_publish(page) -> int:
+    """Chạy handler đã đăng ký cho page; trả về số câu lệnh ghi (0 nếu bỏ qua)."""
+    spec = SYNC_HANDLERS.get(type(page))
+    if spec is None:
+        return 0
+    _, label = SQL_MODELS[type(page)]
+    try:
+        values, image_ids, digest = sync_state(page, render=False)
+        writes = spec.write(page, values, image_ids, digest)
+    except DatabaseError as e:
+        logger.error(f"{label} sync failed for {page.title}: {e}")
+        notify_dev(f"❌ [Wagtail] {label} sync failed: {page.title} - {str(e)}")
+        return 0
 
-        # Sync gallery relations
-        _sync_medicine_images(page.external_id, page)
+    if writes:
+        notify_dev(f"✅ [Wagtail] {label} upserted → SQL: {page.title} (id={page.external_id}, writes={writes})")
+    else:
+        logger.info(f"⏭️ [Wagtail] {label} unchanged, skipped: {page.title} (id={page.external_id})")
+    return writes
 
-    notify_dev(f"[Wagtail] Medicine upserted → SQL: {page.title} (id={page.external_id})")
 
+# ---------- Publish / unpublish (signals: cả admin lẫn publish theo lịch) ----------
 
-def upsert_pig(page: PigPage) -> None:
-    
-    with transaction.atomic():
-        if page.external_id:
-            obj = sql_models.Pig.objects.select_for_update().get(id=page.external_id)
-        else:
-            obj = sql_models.Pig()
-
-        obj.name = page.name
-        obj.price = page.price
-        obj.is_published = True
-        if hasattr(obj, "is_deleted"):
-            obj.is_deleted = False
-        obj.published_at = timezone.now()
-        obj.save()
+def _invalidate_api_cache(page):
+    group, detail_id = API_CACHE_GROUPS.get(type(page), (None, None))
+    if group:
+        api_cache.invalidate(group)
+        warmup.rewarm(group, detail_id(page))
 
-        if not page.external_id:
-            page.external_id = obj.id
-            page.save(update_fields=["external_id"])
 
-        _sync_pig_images(page.external_id, page)
+def _refresh_derived(page):
+    """Cache /api/, sitemap, snapshot JSON và feed tin tức của dòng vừa đổi (chạy sau commit)."""
+    _invalidate_api_cache(page)
+    # Nhóm cache trùng tên với loại sitemap / snapshot (pig, medicine, news)
+    group, detail_id = API_CACHE_GROUPS.get(type(page), (None, None))
+    if group:
+        sitemaps.schedule_update(group, detail_id(page))
+        snapshots.schedule_update(group, detail_id(page))
+    if isinstance(page, NewsPage):
+        feeds.schedule_rebuild()
+
+
+def refresh_group(group, ids):
+    """Cache /api/ và snapshot JSON của nhóm sau khi các dòng ids bị sửa thẳng bằng SQL (chạy sau commit).
+
+    Cho các lệnh không có page (import_pig_images, archive_deleted_rows).
+    """
+    api_cache.invalidate(group)
+    warmup.rewarm(group)
+    snapshots.schedule_update(group, *sorted(set(ids) - {None}))
 
-    notify_dev(f"[Wagtail] Pig upserted → SQL: {page.title} (id={page.external_id})")
 
+def refresh_derived_bulk(page_cls, pages, published=True):
+    """Như _refresh_derived + autocomplete + search index, một lần cho cả lô page cùng loại.
 
-# ---------- Hooks ----------
+    Dùng cho các đường ghi hàng loạt không qua hook publish (reconcile_catalog,
+    import_catalog). `pages` chỉ cần external_id và các field mà lambda trong
+    API_CACHE_GROUPS / AUTOCOMPLETE_TITLES đọc; mọi việc chạy sau commit.
+    """
+    pages = [page for page in pages if page.external_id]
+    group, detail_id = API_CACHE_GROUPS.get(page_cls, (None, None))
+    if not pages or group is None:
+        return
+    detail_ids = sorted({detail_id(page) for page in pages} - {None})
+    refresh_group(group, detail_ids)
+    # Mỗi shard sitemap ghi lại một lần
+    for pk in {sitemaps.shard_of(pk): pk for pk in detail_ids}.values():
+        sitemaps.schedule_update(group, pk)
+    if page_cls is NewsPage:
+        feeds.schedule_rebuild()
+
+    model, _ = SQL_MODELS[page_cls]
+    kind, title = AUTOCOMPLETE_TITLES.get(page_cls, (None, None))
+    for page in pages:
+        if kind:
+            autocomplete.patch(kind, page.external_id, title(page) if published else None)
+        enqueue_if_indexed(model, page.external_id)
+
+
+def _patch_autocomplete(page, published: bool):
+    kind, title = AUTOCOMPLETE_TITLES.get(type(page), (None, None))
+    if kind and page.external_id:
+        autocomplete.patch(kind, page.external_id, title(page) if published else None)
+
+
+@receiver(page_published)
+def on_publish(sender, instance, **kwargs):
+    if dispatch_publish(instance):
+        schedule_renditions(image_ids_for_page(instance))
+        _patch_autocomplete(instance, published=True)
+        _refresh_derived(instance)
+
+
+@receiver(page_unpublished)
+def on_unpublish(sender, instance, **kwargs):
+    """Mark SQL record as unpublished."""
+    model, label = SQL_MODELS.get(type(instance), (None, None))
+    if model is None or not instance.external_id:
+        return
+    try:
+        model.objects.filter(id=instance.external_id).update(is_published=False, updated_at=timezone.now())
+        enqueue_if_indexed(model, instance.external_id)
+        _patch_autocomplete(instance, published=False)
+        _refresh_derived(instance)
+        notify_dev(f"📤 [Wagtail] {label} unpublished: {instance.title} (id={instance.external_id})")
+    except DatabaseError as e:
+        logger.error(f"Unpublish failed for {instance.title}: {e}")
+        notify_dev(f"❌ [Wagtail] Unpublish failed: {instance.title} - {str(e)}")
 
-@hooks.register("after_publish_page")
-def on_publish(request, page, **kwargs):
-    if isinstance(page, MedicineProductPage):
-        upsert_medicine(page)
-    elif isinstance(page, PigPage):
-        upsert_pig(page)
 
+# ---------- Delete ----------
 
-@hooks.register("after_unpublish_page")
-def on_unpublish(request, page, **kwargs):
-    # Unpublish: chỉ ẩn trên web, KHÔNG xoá ảnh; giữ quan hệ ảnh (tuỳ bạn).
-    if isinstance(page, MedicineProductPage) and page.external_id:
-        sql_models.Medicine.objects.filter(id=page.external_id).update(is_published=False)
-        notify_dev(f"[Wagtail] Medicine unpublished: {page.title} (id={page.external_id})")
+@hooks.register("before_delete_page")
+def prevent_hard_delete_and_log(request, page):
+    """
+    Block all hard deletes, including for superusers.
+    Only developers can delete directly in the database.
+    """
+    # Log delete attempt đầu tiên
+    logger.info(f"🔍 DELETE ATTEMPT: {page.__class__.__name__} '{page.title}' by {request.user.username}")
+    notify_dev(f"🔍 [DEBUG] Delete attempt: {page.__class__.__name__} '{page.title}' by {request.user.username}")
 
-    if isinstance(page, PigPage) and page.external_id:
-        sql_models.Pig.objects.filter(id=page.external_id).update(is_published=False)
-        notify_dev(f"[Wagtail] Pig unpublished: {page.title} (id={page.external_id})")
+    if isinstance(page, (MedicineProductPage, PigPage, PigImagePage, NewsCategoryPage)):
+        logger.info(f"🚫 Blocking hard delete for {page.title} by user {request.user.username} (superuser: {request.user.is_superuser})")
+
+        raise PermissionDenied(
+            f"⛔ DELETE BLOCKED! "
+            f"Cannot delete '{page.title}'. "
+            f"Only developers can delete directly in the database. "
+            f"Please use 'Unpublish' instead."
+        )
 
 
 @hooks.register("after_delete_page")
-def on_delete(request, page, **kwargs):
-    if isinstance(page, MedicineProductPage) and page.external_id:
-        # Soft delete main row
-        update_fields = {"is_published": False}
-        if "is_deleted" in [f.name for f in sql_models.Medicine._meta.get_fields()]:
-            update_fields["is_deleted"] = True
-        sql_models.Medicine.objects.filter(id=page.external_id).update(**update_fields)
-
-        # Clear join relations (giữ file ảnh)
-        with connection.cursor() as cur:
-            cur.execute("DELETE FROM product_medicine_image WHERE medicine_id=%s", [page.external_id])
-
-        notify_dev(f"[Wagtail] Medicine deleted (soft): {page.title} (id={page.external_id})")
-
-    if isinstance(page, PigPage) and page.external_id:
-        update_fields = {"is_published": False}
-        if "is_deleted" in [f.name for f in sql_models.Pig._meta.get_fields()]:
-            update_fields["is_deleted"] = True
-        sql_models.Pig.objects.filter(id=page.external_id).update(**update_fields)
-
-        with connection.cursor() as cur:
-            cur.execute("DELETE FROM product_pig_image WHERE pig_id=%s", [page.external_id])
-
-        notify_dev(f"[Wagtail] Pig deleted (soft): {page.title} (id={page.external_id})")
\ No newline at end of file
+def on_delete(request, page):
+    """
+    Soft delete dòng SQL khi page bị xoá (NewsPage, hoặc fallback nếu việc chặn
+    xoá ở trên bị vượt qua). Quan hệ ảnh được xoá, file ảnh giữ nguyên.
+    """
+    page = page.specific
+    model, label = SQL_MODELS.get(type(page), (None, None))
+    if model is None or not page.external_id:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.filter(id=page.external_id).update(
+                is_published=False,
+                is_deleted=True,
+                deleted_at=timezone.now(),
+            )
+            gallery = GALLERY_TABLES.get(type(page))
+            if gallery:
+                table, fk = gallery
+                with connection.cursor() as cur:
+                    cur.execute(f"DELETE FROM {table} WHERE {fk}=%s", [page.external_id])
+            enqueue_if_indexed(model, page.external_id)
+            _patch_autocomplete(page, published=False)
+            _refresh_derived(page)
+        notify_dev(f"🗑️ [Wagtail] {label} deleted (soft): {page.title} (id={page.external_id})")
+    except DatabaseError as e:
+        logger.error(f"Soft delete failed for {page.title}: {e}")
+        notify_dev(f"❌ [Wagtail] Soft delete failed: {page.title} - {str(e)}")
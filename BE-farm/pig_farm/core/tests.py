@@ -1,3 +1,1573 @@
-from django.test import TestCase
+import gc
+import io
+import json
+import os
+import posixpath
+import shutil
+import tempfile
+import time
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Page
+from wagtail.search.backends import get_search_backend
+
+from core import news_models, sql_models
+from core.news_models import NewsPage
+from core.pages import MedicineProductPage, PigPage, PigImagePage, NewsCategoryPage
+from core.media import HashedMediaStorage, serve_media
+from core.galleries import _gallery_item, wants_images
+from core import autocomplete as autocomplete_module
+from core.autocomplete import PrefixIndex, fold
+from core.search_index import search_version
+from core import api_cache, catalog_import, feeds, sitemaps, snapshots, trending, view_counter
+from core.renditions import generate_renditions, image_ids_for_page, largest_url, srcset_for
+from core.sync import SYNC_HANDLERS, _diff_gallery, _split_duplicates, dispatch_publish
+
+
+class GalleryDiffTests(SimpleTestCase):
+    """Diff giữa gallery trong SQL và thứ tự ảnh trên UI."""
+
+    def test_unchanged_gallery_is_noop(self):
+        self.assertEqual(_diff_gallery({10: 0, 11: 1}, [10, 11]), ([], [], []))
+
+    def test_reorder_only_updates_sort(self):
+        inserts, deletes, updates = _diff_gallery({10: 0, 11: 1, 12: 2}, [12, 10, 11])
+        self.assertEqual(inserts, [])
+        self.assertEqual(deletes, [])
+        self.assertEqual(updates, [(12, 0), (10, 1), (11, 2)])
+
+    def test_insert_delete_and_shift(self):
+        inserts, deletes, updates = _diff_gallery({10: 0, 11: 1, 12: 2}, [10, 12, 13])
+        self.assertEqual(inserts, [(13, 2)])
+        self.assertEqual(deletes, [11])
+        self.assertEqual(updates, [(12, 1)])
+
+    def test_empty_and_duplicate_ids_are_ignored(self):
+        inserts, deletes, updates = _diff_gallery({}, [None, 5, 5, 6])
+        self.assertEqual(inserts, [(5, 0), (6, 1)])
+        self.assertEqual((deletes, updates), ([], []))
+
+    def test_duplicate_join_rows_are_reinserted_once(self):
+        current, duplicates = _split_duplicates([(10, 0), (11, 1), (11, 1), (12, 2), (12, 5)])
+        self.assertEqual((current, duplicates), ({10: 0}, {11, 12}))
+        inserts, deletes, updates = _diff_gallery(current, [10, 11])
+        self.assertEqual((inserts, deletes, updates), ([(11, 1)], [], []))
+
+
+class GalleryItemTests(SimpleTestCase):
+    """Định dạng một ảnh gallery từ kết quả json_agg."""
+
+    def test_wagtail_image_gets_media_url_and_srcset(self):
+        item = _gallery_item({
+            "image_id": 7, "title": "Ảnh", "file": "original_images/a.jpg", "url": None,
+            "width": 800, "height": 600, "image_type": None,
+            "renditions": [
+                {"format": "webp", "url": "/media/a.webp", "width": 320, "height": 240},
+                {"format": "jpeg", "url": "/media/a.jpg", "width": 320, "height": 240},
+            ],
+        })
+        self.assertEqual(item["url"], "/media/original_images/a.jpg")
+        self.assertEqual(item["srcset"]["webp"], [{"url": "/media/a.webp", "width": 320, "height": 240}])
+
+    def test_pig_image_row_keeps_stored_url(self):
+        item = _gallery_item({"image_id": None, "title": "Lợn", "file": None,
+                              "url": "/media/pig.jpg", "image_type": "main", "renditions": None})
+        self.assertEqual(item["url"], "/media/pig.jpg")
+        self.assertIsNone(item["srcset"])
+
+    def test_include_param(self):
+        factory = RequestFactory()
+        self.assertTrue(wants_images(factory.get("/", {"include": "images"})))
+        self.assertTrue(wants_images(factory.get("/", {"include": "tags, images"})))
+        self.assertFalse(wants_images(factory.get("/")))
+
+
+class HashedMediaTests(SimpleTestCase):
+    """Đường dẫn media theo hash nội dung và phục vụ với Range/ETag."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.storage = HashedMediaStorage(location=self.media_root)
+        self.factory = RequestFactory()
+
+    def test_path_changes_only_with_content(self):
+        from django.core.files.base import ContentFile
+        first = self.storage.save("original_images/a.jpg", ContentFile(b"abc"))
+        again = self.storage.save("original_images/a.jpg", ContentFile(b"abc"))
+        changed = self.storage.save("original_images/a.jpg", ContentFile(b"abcd"))
+        self.assertRegex(first, r"^original_images/[0-9a-f]{16}/a\.jpg$")
+        # Cùng nội dung: cùng thư mục hash nhưng file riêng (xoá một Image không làm hỏng Image kia)
+        self.assertEqual(posixpath.dirname(first), posixpath.dirname(again))
+        self.assertNotEqual(first, again)
+        self.assertRegex(again, r"^original_images/[0-9a-f]{16}/a_\w+\.jpg$")
+        self.assertNotEqual(posixpath.dirname(first), posixpath.dirname(changed))
+        self.storage.delete(again)
+        self.assertTrue(self.storage.exists(first))
+
+    def _serve(self, path, **headers):
+        response = serve_media(self.factory.get("/media/" + path, headers=headers), path)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_serves_hashed_path_as_immutable_with_ranges(self):
+        from django.core.files.base import ContentFile
+        name = self.storage.save("images/b.txt", ContentFile(b"0123456789"))
+
+        response, body = self._serve(name)
+        self.assertEqual(body, b"0123456789")
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+
+        response, body = self._serve(name, Range="bytes=2-4")
+        self.assertEqual((response.status_code, body), (206, b"234"))
+        self.assertEqual(response["Content-Range"], "bytes 2-4/10")
+
+        response, body = self._serve(name, Range="bytes=-3")
+        self.assertEqual(body, b"789")
+
+        response, _ = self._serve(name, Range="bytes=20-")
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, "bytes */10"))
+
+        etag = self._serve(name)[0]["ETag"]
+        response, _ = self._serve(name, **{"If-None-Match": etag})
+        self.assertEqual((response.status_code, response["ETag"]), (304, etag))
+
+    def test_unhashed_path_must_revalidate(self):
+        with open(f"{self.media_root}/old.txt", "wb") as f:
+            f.write(b"x")
+        response, _ = self._serve("old.txt")
+        self.assertIn("must-revalidate", response["Cache-Control"])
+
+
+class IndexAdvisorTests(SimpleTestCase):
+    """advise_indexes đọc plan JSON của EXPLAIN."""
+
+    def test_walk_plan_reports_seq_scan_and_sort(self):
+        from core.management.commands.advise_indexes import walk_plan
+        plan = {
+            "Node Type": "Limit",
+            "Plans": [{
+                "Node Type": "Sort", "Sort Key": ["updated_at DESC"],
+                "Plans": [{"Node Type": "Seq Scan", "Relation Name": "product_pig", "Plan Rows": 5000}],
+            }],
+        }
+        self.assertEqual(walk_plan(plan, "product_pig"),
+                         ["Sort by updated_at DESC", "Seq Scan on product_pig (rows≈5000)"])
+        index_scan = {"Node Type": "Index Scan", "Relation Name": "product_pig"}
+        self.assertEqual(walk_plan(index_scan, "product_pig"), [])
+
+    def test_partitioned_table_index_is_not_concurrent(self):
+        from core.management.commands.advise_indexes import IndexProposal, create_index_sql
+        proposal = IndexProposal("idx_x", "cms_content_entry", "(slug)")
+        self.assertIn("CONCURRENTLY", create_index_sql(proposal))
+        self.assertEqual(create_index_sql(proposal, concurrently=False),
+                         "CREATE INDEX IF NOT EXISTS idx_x ON cms_content_entry (slug);")
+
+
+class PartitionContentEntryTests(SimpleTestCase):
+    """partition_content_entry: tên partition và chặn DB không phải Postgres."""
+
+    def test_partition_name_is_safe_identifier(self):
+        from core.management.commands.partition_content_entry import partition_name
+        self.assertEqual(partition_name("news"), "cms_content_entry_news")
+        self.assertEqual(partition_name("Tin-Tuc 2"), "cms_content_entry_tin_tuc_2")
+
+    def test_requires_postgres(self):
+        from django.core.management import CommandError
+        if connection.vendor == "postgresql":
+            self.skipTest("chỉ kiểm tra nhánh từ chối")
+        with self.assertRaises(CommandError):
+            call_command("partition_content_entry", "--dry-run")
+
+
+class SqlTablesMixin:
+    """Tạo các bảng SQL unmanaged (bình thường do script SQL tạo) cho test DB."""
+
+    sql_models = [
+        sql_models.Medicine,
+        sql_models.Pig,
+        sql_models.PigImage,
+        sql_models.NewsCategory,
+        sql_models.CmsNewsEntry,
+        sql_models.ImageRendition,
+        sql_models.NewsViewCounter,
+        sql_models.NewsViewHourly,
+        sql_models.NewsTrendingScore,
+        sql_models.CatalogChange,
+    ]
+    raw_tables = {
+        "lu_content_kind": "CREATE TABLE lu_content_kind (id INTEGER PRIMARY KEY, code TEXT)",
+        "product_medicine_image": "CREATE TABLE product_medicine_image (medicine_id BIGINT, image_id BIGINT, sort INTEGER)",
+        "product_pig_image": "CREATE TABLE product_pig_image (pig_id BIGINT, image_id BIGINT, sort INTEGER)",
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        with connection.schema_editor() as editor:
+            for model in cls.sql_models:
+                editor.create_model(model)
+        with connection.cursor() as cur:
+            for ddl in cls.raw_tables.values():
+                cur.execute(ddl)
+            cur.execute("INSERT INTO lu_content_kind (id, code) VALUES (2, 'news')")
+        # Làm mới/warm cache, ghi sitemap, nhập bảng giá chạy đồng bộ: luồng khác không thấy transaction
+        # của test. Snapshot chỉ bật trong SnapshotTests.
+        cls._sitemap_root = tempfile.mkdtemp()
+        cls._api_cache_override = override_settings(API_CACHE_WARM_WORKERS=0, API_CACHE_REFRESH_WORKERS=0,
+                                                    SITEMAP_BACKGROUND=False, SITEMAP_ROOT=cls._sitemap_root,
+                                                    SNAPSHOT_ENABLED=False, CATALOG_IMPORT_BACKGROUND=False)
+        cls._api_cache_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._api_cache_override.disable()
+        shutil.rmtree(cls._sitemap_root, ignore_errors=True)
+        with connection.cursor() as cur:
+            for table in cls.raw_tables:
+                cur.execute(f"DROP TABLE {table}")
+        with connection.schema_editor() as editor:
+            for model in cls.sql_models:
+                editor.delete_model(model)
+
+
+class PublishDispatcherTests(SqlTablesMixin, TestCase):
+    """Mỗi loại page có đúng một handler; publish không đổi thì không ghi."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media_root = tempfile.mkdtemp()
+        cls._media_override = override_settings(MEDIA_ROOT=cls._media_root)
+        cls._media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._media_override.disable()
+        shutil.rmtree(cls._media_root, ignore_errors=True)
+
+    def setUp(self):
+        self.root = Page.objects.get(pk=1)
+        news_models._KIND_IDS.clear()
+        cache.clear()
+
+    def _add(self, page):
+        self.root.add_child(instance=page)
+        return page
+
+    def _make_image(self):
+        from wagtail.images.models import Image
+        return Image.objects.create(title="Ảnh", file=get_test_image_file())
+
+    def test_every_page_type_has_one_handler(self):
+        self.assertEqual(
+            set(SYNC_HANDLERS),
+            {MedicineProductPage, PigPage, PigImagePage, NewsCategoryPage, NewsPage},
+        )
+
+    def assertPublishQueries(self, page, first, republish):
+        """Số query chính xác cho publish lần đầu và publish lại không đổi."""
+        with self.assertNumQueries(first):
+            self.assertGreater(dispatch_publish(page), 0)
+        with self.assertNumQueries(republish):
+            self.assertEqual(dispatch_publish(page), 0)
+
+    def test_medicine_query_count(self):
+        page = self._add(MedicineProductPage(title="Thuốc A", name="Thuốc A", price_unit=10))
+        # gallery ids, savepoint, insert, external_id, gallery rows, release
+        # rồi: gallery ids, savepoint, select for update, release
+        self.assertPublishQueries(page, 6, 4)
+        row = sql_models.Medicine.objects.get(id=page.external_id)
+        self.assertEqual(row.name, "Thuốc A")
+        self.assertTrue(row.is_published)
+
+    def test_pig_query_count(self):
+        page = self._add(PigPage(title="Lợn A", name="Lợn A", price=100))
+        self.assertPublishQueries(page, 6, 4)
+
+    def test_pig_image_query_count(self):
+        image = self._make_image()
+        page = self._add(PigImagePage(title="Ảnh lợn", image=image))
+        # savepoint, insert, external_id, release / savepoint, select, release
+        self.assertPublishQueries(page, 4, 3)
+
+    def test_news_category_query_count(self):
+        page = self._add(NewsCategoryPage(title="Tin trại"))
+        self.assertPublishQueries(page, 4, 3)
+
+    def test_news_query_count(self):
+        page = self._add(NewsPage(title="Tin mới", summary="Tóm tắt"))
+        # savepoint, kind, insert, external_id, release / savepoint, select, release
+        self.assertPublishQueries(page, 5, 3)
+
+    def test_news_body_rendered_once_per_content(self):
+        body = json.dumps([{"type": "paragraph", "value": "<p>Xin chào</p>"}])
+        page = self._add(NewsPage(title="Tin A", body=body))
+        with mock.patch.object(NewsPage, "_serialize_body", autospec=True,
+                               side_effect=NewsPage._serialize_body) as serialize:
+            dispatch_publish(page)
+            page.title = "Tin A (sửa tiêu đề)"
+            self.assertEqual(dispatch_publish(page), 1)
+            self.assertEqual(dispatch_publish(page), 0)
+        self.assertEqual(serialize.call_count, 1)
+        row = sql_models.CmsNewsEntry.objects.get(id=page.external_id)
+        self.assertEqual(row.body_html, "<p>Xin chào</p>")
+        self.assertEqual(row.body_json, [{"type": "paragraph", "value": "<p>Xin chào</p>"}])
+
+    def test_unchanged_news_is_not_rendered_with_cold_cache(self):
+        image = self._make_image()
+        body = json.dumps([{"type": "image", "value": image.pk}])
+        page = self._add(NewsPage(title="Tin ảnh", body=body))
+        dispatch_publish(page)
+        cache.clear()
+        with mock.patch.object(NewsPage, "_serialize_body", autospec=True,
+                               side_effect=NewsPage._serialize_body) as serialize:
+            self.assertEqual(dispatch_publish(page), 0)
+            self.assertEqual(serialize.call_count, 0)
+
+            # Thay file ảnh: cùng id nhưng đường dẫn mới -> hash đổi, HTML có URL mới
+            image.file = get_test_image_file(filename="moi.png")
+            image.save()
+            page = NewsPage.objects.get(pk=page.pk)
+            self.assertEqual(dispatch_publish(page), 1)
+            self.assertEqual(serialize.call_count, 1)
+        row = sql_models.CmsNewsEntry.objects.get(id=page.external_id)
+        self.assertIn(image.file.url, row.body_html)
+
+    def test_changed_content_writes_again(self):
+        page = self._add(PigPage(title="Lợn B", name="Lợn B", price=100))
+        dispatch_publish(page)
+        page.price = 120
+        self.assertEqual(dispatch_publish(page), 1)
+        self.assertEqual(sql_models.Pig.objects.get(id=page.external_id).price, 120)
+
+    def test_publish_and_unpublish_signals(self):
+        page = self._add(PigPage(title="Lợn C", name="Lợn C", price=100, live=False))
+        page.save_revision().publish()
+        page.refresh_from_db()
+        self.assertTrue(sql_models.Pig.objects.get(id=page.external_id).is_published)
+        self.assertEqual(sql_models.Pig.objects.count(), 1)
+
+        page.unpublish()
+        self.assertFalse(sql_models.Pig.objects.get(id=page.external_id).is_published)
+
+
+class ReconcileCatalogTests(SqlTablesMixin, TestCase):
+    """reconcile_catalog chỉ sửa các dòng SQL lệch so với page đang live."""
+
+    def setUp(self):
+        root = Page.objects.get(pk=1)
+        self.synced = PigPage(title="Lợn đồng bộ", name="Lợn đồng bộ", price=100)
+        self.drifted = PigPage(title="Lợn lệch", name="Lợn lệch", price=100)
+        self.missing = PigPage(title="Lợn thiếu", name="Lợn thiếu", price=50)
+        for page in (self.synced, self.drifted, self.missing):
+            root.add_child(instance=page)
+        dispatch_publish(self.synced)
+        dispatch_publish(self.drifted)
+        sql_models.Pig.objects.filter(id=self.drifted.external_id).update(price=1)
+
+    def _run(self, *args):
+        out = io.StringIO()
+        call_command("reconcile_catalog", "--type", "pig", "--workers", "1", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_reports_without_writing(self):
+        output = self._run("--dry-run")
+        self.assertIn("1 thiếu dòng SQL, 1 lệch dữ liệu", output)
+        self.assertEqual(sql_models.Pig.objects.get(id=self.drifted.external_id).price, 1)
+        self.assertEqual(sql_models.Pig.objects.count(), 2)
+
+    def test_repairs_only_drifted_rows(self):
+        self._run()
+        self.assertEqual(sql_models.Pig.objects.get(id=self.drifted.external_id).price, 100)
+        self.missing.refresh_from_db()
+        self.assertEqual(sql_models.Pig.objects.get(id=self.missing.external_id).name, "Lợn thiếu")
+        self.assertIn("0 thiếu dòng SQL, 0 lệch dữ liệu", self._run("--dry-run"))
+
+    def test_repair_refreshes_derived_data(self):
+        version = api_cache.group_version("pig")
+        with mock.patch("core.sync.enqueue_if_indexed") as enqueue, \
+                mock.patch("core.sync.snapshots.schedule_update") as snapshot, \
+                self.captureOnCommitCallbacks(execute=True):
+            self._run()
+        self.missing.refresh_from_db()
+        repaired = sorted([self.drifted.external_id, self.missing.external_id])
+        self.assertGreater(api_cache.group_version("pig"), version)
+        snapshot.assert_called_once_with("pig", *repaired)
+        self.assertEqual(sorted(call.args[1] for call in enqueue.call_args_list), repaired)
+
+    def test_news_body_rendered_only_for_drifted_rows(self):
+        from core.management.commands.reconcile_catalog import reconcile_chunk
+        page = NewsPage(title="Tin đối soát", body=json.dumps([{"type": "paragraph", "value": "<p>Nội dung</p>"}]))
+        Page.objects.get(pk=1).add_child(instance=page)
+        dispatch_publish(page)
+        cache.clear()
+        with mock.patch.object(NewsPage, "_serialize_body", autospec=True,
+                               side_effect=NewsPage._serialize_body) as serialize, \
+                mock.patch("core.sync.enqueue_if_indexed"):
+            self.assertEqual(reconcile_chunk(NewsPage, [page.pk])["changed"], [])
+            self.assertEqual(serialize.call_count, 0)
+
+            sql_models.CmsNewsEntry.objects.filter(id=page.external_id).update(title="Sửa tay")
+            self.assertEqual(reconcile_chunk(NewsPage, [page.pk])["changed"], [page.pk])
+            self.assertEqual(serialize.call_count, 1)
+        self.assertEqual(sql_models.CmsNewsEntry.objects.get(id=page.external_id).title, "Tin đối soát")
+
+
+@override_settings(RENDITION_WIDTHS=[40, 80])
+class RenditionTests(SqlTablesMixin, TestCase):
+    """Rendition sinh sẵn khi publish; API đọc srcset không cần Pillow."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media_root = tempfile.mkdtemp()
+        cls._media_override = override_settings(MEDIA_ROOT=cls._media_root)
+        cls._media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._media_override.disable()
+        shutil.rmtree(cls._media_root, ignore_errors=True)
+
+    def setUp(self):
+        from wagtail.images.models import Image
+        self.image = Image.objects.create(title="Ảnh", file=get_test_image_file(size=(200, 100)))
+
+    def test_generate_stores_every_width_and_format(self):
+        self.assertEqual(generate_renditions(self.image.id), 4)
+        # Đã đủ rendition -> không sinh lại
+        self.assertEqual(generate_renditions(self.image.id), 0)
+
+        srcset = srcset_for([self.image.id])[self.image.id]
+        self.assertEqual([r["width"] for r in srcset["webp"]], [40, 80])
+        self.assertEqual([r["height"] for r in srcset["jpeg"]], [20, 40])
+        self.assertTrue(all(r["url"].endswith(".webp") for r in srcset["webp"]))
+        self.assertEqual(largest_url(srcset), srcset["jpeg"][-1]["url"])
+
+    def test_replaced_file_regenerates(self):
+        generate_renditions(self.image.id)
+        old_urls = set(sql_models.ImageRendition.objects.values_list("url", flat=True))
+        old_renditions = set(self.image.renditions.values_list("pk", flat=True))
+        # Như form sửa ảnh của Wagtail: file mới, file_hash tính lại, id giữ nguyên
+        self.image.file = get_test_image_file(filename="moi.png", colour="red", size=(200, 100))
+        self.image._set_image_file_metadata()
+        self.image.save()
+        self.assertEqual(generate_renditions(self.image.id), 4)
+        new_urls = set(sql_models.ImageRendition.objects.values_list("url", flat=True))
+        self.assertFalse(old_urls & new_urls)
+        self.assertEqual(set(sql_models.ImageRendition.objects.values_list("file_hash", flat=True)),
+                         {self.image.file_hash})
+        # Rendition Wagtail của file cũ không được dùng lại
+        self.assertFalse(old_renditions & set(self.image.renditions.values_list("pk", flat=True)))
+
+    @override_settings(RENDITION_WORKERS=0)
+    def test_replaced_cover_regenerates_on_republish(self):
+        page = NewsPage(title="Tin ảnh bìa", cover=self.image)
+        Page.objects.get(pk=1).add_child(instance=page)
+        with self.captureOnCommitCallbacks(execute=True), mock.patch("core.search_index.enqueue"):
+            page.save_revision().publish()
+        old = dict(sql_models.ImageRendition.objects.values_list("pk", "url"))
+        self.assertEqual(len(old), 4)
+
+        # Thay file ảnh bìa (id giữ nguyên) rồi publish lại tin không đổi gì khác
+        self.image.file = get_test_image_file(filename="moi.png", colour="red", size=(200, 100))
+        self.image._set_image_file_metadata()
+        self.image.save()
+        page = NewsPage.objects.get(pk=page.pk)
+        with self.captureOnCommitCallbacks(execute=True), mock.patch("core.search_index.enqueue"):
+            page.save_revision().publish()
+        new = dict(sql_models.ImageRendition.objects.values_list("pk", "url"))
+        self.assertEqual(len(new), 4)
+        # Dòng image_renditions cũ được thay, URL (đường dẫn hash) đều mới
+        self.assertFalse(set(old) & set(new))
+        self.assertFalse(set(old.values()) & set(new.values()))
+        self.assertEqual(set(sql_models.ImageRendition.objects.values_list("file_hash", flat=True)),
+                         {self.image.file_hash})
+
+    def test_featured_image_url_uses_stored_rendition(self):
+        generate_renditions(self.image.id)
+        entry = sql_models.CmsNewsEntry(cover_image_id=self.image.id)
+        with self.assertNumQueries(1):
+            self.assertTrue(entry.get_featured_image_url().endswith(".jpg"))
+        self.assertIsNone(sql_models.CmsNewsEntry(cover_image_id=None).get_featured_image_url())
+
+    def test_image_ids_for_page(self):
+        news = NewsPage(title="Tin", cover=self.image)
+        self.assertEqual(image_ids_for_page(news), [self.image.id])
+        self.assertEqual(image_ids_for_page(NewsPage(title="Tin")), [])
+
+
+class ImportPigImagesTests(SqlTablesMixin, TestCase):
+    """import_pig_images: dedupe theo nội dung, bỏ file hỏng, tạo dòng theo lô."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media_root = tempfile.mkdtemp()
+        cls._media_override = override_settings(MEDIA_ROOT=cls._media_root, RENDITION_WORKERS=0)
+        cls._media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._media_override.disable()
+        shutil.rmtree(cls._media_root, ignore_errors=True)
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source, ignore_errors=True)
+        self.pig = sql_models.Pig.objects.create(name="Lợn", price=100, is_published=True)
+        same = get_test_image_file().file.getvalue()
+        files = {
+            "a.png": same,
+            "b.png": same,
+            "c.png": get_test_image_file(size=(30, 20)).file.getvalue(),
+            "broken.png": b"not an image",
+        }
+        for name, data in files.items():
+            with open(f"{self.source}/{name}", "wb") as f:
+                f.write(data)
+        self.mapping = f"{self.source}/mapping.csv"
+        with open(self.mapping, "w", encoding="utf-8") as f:
+            f.write("filename,pig_id,image_type\n")
+            for name in files:
+                f.write(f"{name},{self.pig.id},gallery\n")
+
+    def _run(self, *args):
+        out = io.StringIO()
+        call_command("import_pig_images", self.source, "--mapping", self.mapping,
+                     "--workers", "1", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_reports_duplicates_and_broken_files(self):
+        from wagtail.images.models import Image
+        output = self._run("--dry-run")
+        self.assertIn("3 ảnh hợp lệ, 2 ảnh mới, 1 trùng nội dung, 1 lỗi", output)
+        self.assertEqual(Image.objects.count(), 0)
+
+    def test_import_creates_images_once(self):
+        from wagtail.images.models import Image
+        with mock.patch("core.management.commands.import_pig_images.refresh_group") as refresh:
+            self._run()
+        refresh.assert_called_once_with("pig", [self.pig.id, self.pig.id])
+        self.assertEqual(Image.objects.count(), 2)
+        rows = sql_models.PigImage.objects.filter(pig_id=self.pig.id)
+        self.assertEqual(rows.count(), 2)
+        self.assertEqual(sorted(rows.values_list("width", flat=True)), [30, 640])
+        # Chạy lại: mọi ảnh đã có -> không tạo thêm gì
+        self.assertIn("0 ảnh mới", self._run())
+        self.assertEqual(Image.objects.count(), 2)
+        self.assertEqual(rows.count(), 2)
+
+    def test_zip_is_opened_once_per_stage(self):
+        import zipfile
+        archive = f"{self.source}.zip"
+        self.addCleanup(os.remove, archive)
+        with zipfile.ZipFile(archive, "w") as zf:
+            for name in ("a.png", "b.png", "c.png", "broken.png"):
+                zf.write(f"{self.source}/{name}", name)
+        with mock.patch("zipfile.ZipFile", wraps=zipfile.ZipFile) as opened:
+            out = io.StringIO()
+            call_command("import_pig_images", archive, "--mapping", self.mapping, "--workers", "1", stdout=out)
+        # liệt kê, đọc metadata (một chunk), ghi file
+        self.assertEqual(opened.call_count, 3)
+        self.assertEqual(sql_models.PigImage.objects.filter(pig_id=self.pig.id).count(), 2)
+
+    def test_rollback_removes_stored_files_and_skips_index(self):
+        from django.db import DatabaseError
+        from wagtail.images.models import Image
+
+        def stored_files():
+            return sorted(os.path.join(root, f) for root, _, files in os.walk(self._media_root) for f in files)
+
+        before = stored_files()
+        with mock.patch.object(sql_models.PigImage.objects, "bulk_create", side_effect=DatabaseError("lỗi")), \
+                mock.patch("core.management.commands.import_pig_images.get_search_backend") as backend, \
+                self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(DatabaseError):
+                self._run()
+        backend.return_value.add_bulk.assert_not_called()
+        self.assertEqual(Image.objects.count(), 0)
+        self.assertEqual(stored_files(), before)
+
+
+# SQLite test DB không có bảng FTS của Wagtail -> dùng backend fallback
+@override_settings(WAGTAILSEARCH_BACKENDS={
+    "default": {"BACKEND": "wagtail.search.backends.database.fallback", "AUTO_UPDATE": False},
+})
+class SiteSearchTests(SqlTablesMixin, TestCase):
+    """Tìm kiếm toàn site gồm page live và dòng SQL Medicine/Pig, có cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.pig = sql_models.Pig.objects.create(name="Lợn Duroc", price=100, is_published=True)
+        sql_models.Pig.objects.create(name="Lợn Duroc ẩn", price=100, is_published=False)
+        get_search_backend().add_bulk(sql_models.Pig, list(sql_models.Pig.get_indexed_objects()))
+
+    def test_sql_rows_are_searchable_and_cached(self):
+        response = self.client.get("/search/", {"query": "Duroc"})
+        results = list(response.context["search_results"])
+        self.assertEqual(results, [{"title": "Lợn Duroc", "url": f"/products/pig/{self.pig.id}", "description": None}])
+
+        # Lần hai đọc danh sách từ cache: chỉ còn nạp dòng Pig (+ Site của Wagtail)
+        with self.assertNumQueries(2):
+            self.client.get("/search/", {"query": "  duroc "})
+
+    @override_settings(SEARCH_INDEX_FLUSH_SECONDS=0)
+    def test_saves_are_indexed_after_commit_and_bust_cache(self):
+        version = search_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            sql_models.Pig.objects.filter(pk=self.pig.pk).update(name="Lợn Landrace")
+            pig = sql_models.Pig.objects.get(pk=self.pig.pk)
+            pig.save()
+        self.assertGreater(search_version(), version)
+        response = self.client.get("/search/", {"query": "Landrace"})
+        self.assertEqual([r["title"] for r in response.context["search_results"]], ["Lợn Landrace"])
+
+
+class PrefixIndexTests(SimpleTestCase):
+    """Chỉ mục tiền tố: khoá bỏ dấu, khớp đầu mỗi từ, vá tại chỗ, giới hạn bộ nhớ."""
+
+    def setUp(self):
+        self.index = PrefixIndex(max_entries=100)
+        self.index.build([
+            ("pig", 1, "Lợn Duroc thuần"),
+            ("medicine", 2, "Thuốc đặc trị tiêu chảy"),
+            ("news", 3, "Đàn lợn khỏe mạnh"),
+        ])
+
+    def titles(self, query, limit=10):
+        return [hit["title"] for hit in self.index.search(query, limit)]
+
+    def test_folded_word_prefix(self):
+        self.assertEqual(fold("  Đàn LỢN  khỏe "), "dan lon khoe")
+        self.assertEqual(self.titles("lon"), ["Lợn Duroc thuần", "Đàn lợn khỏe mạnh"])
+        self.assertEqual(self.titles("DẶC tri"), ["Thuốc đặc trị tiêu chảy"])
+        self.assertEqual(self.titles("lon", limit=1), ["Lợn Duroc thuần"])
+        self.assertEqual(self.titles(""), [])
+
+    def test_patch_and_bound(self):
+        self.index.upsert("pig", 1, "Lợn Landrace")
+        self.assertEqual(self.titles("duroc"), [])
+        self.assertEqual(self.titles("landr"), ["Lợn Landrace"])
+        self.index.remove("news", 3)
+        self.assertEqual(self.titles("dan"), [])
+
+        small = PrefixIndex(max_entries=3)
+        small.build([("pig", 1, "một hai"), ("pig", 2, "ba bốn")])
+        self.assertEqual(len(small.entries), 2)
+
+
+class AutocompleteApiTests(SqlTablesMixin, TestCase):
+    """/api/autocomplete/ đọc index của process, hook publish vá index."""
+
+    def setUp(self):
+        cache.clear()
+        autocomplete_module._index = None
+        self.pig = sql_models.Pig.objects.create(name="Lợn Duroc", price=100, is_published=True)
+        sql_models.Medicine.objects.create(name="Thuốc ẩn", is_published=False)
+
+    def test_served_from_memory_after_first_request(self):
+        response = self.client.get("/api/autocomplete/", {"q": "duroc"})
+        self.assertEqual(response.json()["data"], [{"type": "pig", "id": self.pig.id, "title": "Lợn Duroc"}])
+        self.assertEqual(self.client.get("/api/autocomplete/", {"q": "thuoc"}).json()["data"], [])
+        with self.assertNumQueries(0):
+            self.client.get("/api/autocomplete/", {"q": "lon"})
+
+    def test_publish_hook_patches_index(self):
+        autocomplete_module.get_index()
+        page = PigPage(title="Lợn mới", name="Lợn Pietrain", price=10)
+        Page.objects.get(pk=1).add_child(instance=page)
+        with self.captureOnCommitCallbacks(execute=True):
+            page.save_revision().publish()
+        page.refresh_from_db()
+        # Index được vá tại chỗ, không dựng lại từ DB
+        with self.assertNumQueries(0):
+            hits = self.client.get("/api/autocomplete/", {"q": "pietr"}).json()["data"]
+        self.assertEqual(hits, [{"type": "pig", "id": page.external_id, "title": "Lợn Pietrain"}])
+
+
+class ViewCounterTests(SqlTablesMixin, TestCase):
+    """Lượt xem gom trong bộ nhớ, flush bằng một UPDATE theo lô."""
+
+    def setUp(self):
+        view_counter._pending.clear()
+        self.entry = sql_models.CmsNewsEntry.objects.create(
+            kind_id=2, slug="tin-a", title="Tin A", is_published=True)
+
+    def test_views_are_buffered_until_flush(self):
+        with override_settings(VIEW_COUNTER_FLUSH_SECONDS=60), mock.patch.object(view_counter, "_ensure_worker"):
+            with self.assertNumQueries(0):
+                for _ in range(3):
+                    view_counter.record_view(self.entry.id)
+                view_counter.record_view(999)
+            self.assertEqual(view_counter.view_counts([self.entry.id]), {})
+
+        # Lần đầu: UPDATE không khớp dòng nào -> INSERT; lần sau chỉ còn UPDATE (+ bucket, savepoint)
+        with self.assertNumQueries(5):
+            self.assertEqual(view_counter.flush(), 2)
+        hour = view_counter.current_hour()
+        view_counter._pending.update({(self.entry.id, hour): 2})
+        with self.assertNumQueries(4):
+            view_counter.flush()
+        self.assertEqual(view_counter.view_counts([self.entry.id, 999]), {self.entry.id: 5, 999: 1})
+        self.assertEqual(sql_models.NewsViewHourly.objects.get(entry_id=self.entry.id, bucket_hour=hour).views, 5)
+
+    def test_failed_flush_keeps_counts(self):
+        key = (self.entry.id, view_counter.current_hour())
+        view_counter._pending.update({key: 4})
+        with mock.patch.object(view_counter, "_write", side_effect=RuntimeError("db down")):
+            self.assertEqual(view_counter.flush(), 0)
+        self.assertEqual(view_counter._pending[key], 4)
+        view_counter.flush()
+        self.assertEqual(view_counter.view_counts([self.entry.id]), {self.entry.id: 4})
+
+    @override_settings(VIEW_COUNTER_FLUSH_SECONDS=0, API_CACHE_TIMEOUT=0)
+    def test_api_returns_flushed_count(self):
+        url = f"/api/news/{self.entry.id}/"
+        self.client.get(url)
+        # Lượt xem được ghi sau khi response đã dựng: lần thứ hai thấy lượt thứ nhất
+        self.assertEqual(self.client.get(url).json()["data"]["view_count"], 1)
+        listed = self.client.get("/api/news/").json()["data"]
+        self.assertEqual([(a["id"], a["view_count"]) for a in listed], [(self.entry.id, 2)])
+
+    @override_settings(VIEW_COUNTER_FLUSH_SECONDS=0)
+    def test_cached_detail_reports_current_count(self):
+        url = f"/api/news/{self.entry.id}/"
+        self.client.get(url)
+        self.client.get(url)
+        response = self.client.get(url)
+        # Bản cache dựng ở lần đầu (0 lượt); số lượt xem được ghép sau khi lấy từ cache
+        self.assertEqual(response[api_cache.STATE_HEADER], "fresh")
+        self.assertEqual(response.json()["data"]["view_count"], 2)
+
+
+class TrendingMathTests(SimpleTestCase):
+    """Phép giảm dần và gộp theo bài."""
+
+    def test_fold_decays_base_and_adds_buckets(self):
+        scores = trending.fold([1, 2], [8.0, 4.0], [24, 24], [2, 3, 2], [1, 2, 3], [0, 24, 48], 24)
+        self.assertEqual({pk: round(x, 6) for pk, x in scores.items()}, {1: 4.0, 2: 2.0 + 1 + 0.75, 3: 1.0})
+
+
+class TrendingTests(SqlTablesMixin, TestCase):
+    """Điểm trending tính tăng dần khớp với tính lại từ đầu; ?sort=trending đọc bảng điểm."""
+
+    def setUp(self):
+        cache.clear()
+        self.now = view_counter.current_hour()
+        self.old, self.new = (
+            sql_models.CmsNewsEntry.objects.create(kind_id=2, slug=slug, title=slug, is_published=True)
+            for slug in ("tin-cu", "tin-moi")
+        )
+
+    def _views(self, entry, hours_ago, views):
+        sql_models.NewsViewHourly.objects.create(
+            entry_id=entry.id, bucket_hour=self.now - timezone.timedelta(hours=hours_ago), views=views)
+
+    @override_settings(TRENDING_HALF_LIFE_HOURS=24, TRENDING_MIN_SCORE=0.01, TRENDING_BUCKET_RETENTION_HOURS=1000)
+    def test_incremental_matches_full_recompute(self):
+        self._views(self.old, 48, 100)
+        self._views(self.new, 3, 10)
+        trending.recompute(self.now - timezone.timedelta(hours=2))
+        self._views(self.new, 2, 10)
+        self._views(self.new, 0, 5)
+        self._views(self.old, 1, 1)
+        trending.recompute(self.now)
+
+        scores = dict(sql_models.NewsTrendingScore.objects.values_list("entry_id", "score"))
+        expected_old = 100 * 0.5 ** 2 + 1 * 0.5 ** (1 / 24)
+        expected_new = 10 * 0.5 ** (3 / 24) + 10 * 0.5 ** (2 / 24) + 5
+        self.assertAlmostEqual(scores[self.old.id], expected_old)
+        self.assertAlmostEqual(scores[self.new.id], expected_new)
+
+        response = self.client.get("/api/news/", {"sort": "trending"}).json()
+        self.assertEqual([a["id"] for a in response["data"]], [self.old.id, self.new.id])
+        self.assertEqual(response["pagination"]["total_items"], 2)
+
+    @override_settings(TRENDING_BUCKET_RETENTION_HOURS=1)
+    def test_folded_buckets_are_pruned(self):
+        self._views(self.old, 5, 1)
+        self._views(self.new, 0, 1)
+        call_command("compute_trending_scores", stdout=io.StringIO())
+        self.assertEqual(list(sql_models.NewsViewHourly.objects.values_list("entry_id", flat=True)), [self.new.id])
+        self.assertEqual(sql_models.NewsTrendingScore.objects.count(), 2)
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Miss đồng thời cùng khoá chỉ tính một lần, trong process và giữa các worker."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_callers_share_one_computation(self):
+        import threading
+        release, calls, results = threading.Event(), [], []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return {"status": 200}
+
+        threads = [threading.Thread(target=lambda: results.append(api_cache.single_flight("k", compute)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while not calls:
+            pass
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((len(calls), len(results)), (1, 5))
+        self.assertEqual(api_cache._inflight, {})
+
+    @override_settings(API_CACHE_LOCK_SECONDS=2, API_CACHE_POLL_SECONDS=0.01)
+    def test_waits_for_other_worker_holding_lock(self):
+        import threading
+        import time
+        cache.add("key:lock", 1, 2)
+        other = {"status": 200, "version": api_cache.group_version("pig"),
+                 "fresh_until": time.time() + 60, "stale_until": time.time() + 60}
+        threading.Timer(0.05, lambda: cache.set("key", other)).start()
+        build = mock.Mock()
+        self.assertEqual(api_cache.fill("pig", "key", build), other)
+        build.assert_not_called()
+
+    def test_key_ignores_parameter_order(self):
+        self.assertEqual(api_cache.cache_key("pig", "/api/pigs/", [("page", ["1"]), ("page_size", ["12"])]),
+                         api_cache.cache_key("pig", "/api/pigs/", [("page_size", ["12"]), ("page", ["1"])]))
+
+
+class ApiCacheTests(SqlTablesMixin, TestCase):
+    """Response /api/ lấy từ cache cho tới khi hook publish tăng version của nhóm."""
+
+    def setUp(self):
+        cache.clear()
+        sql_models.Pig.objects.create(name="Lợn Duroc", price=100, is_published=True)
+
+    def test_cached_until_group_invalidated(self):
+        response = self.client.get("/api/pigs/", {"page_size": 12})
+        self.assertEqual(response["X-Cache-Status"], "miss")
+        first = response.json()
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/pigs/", {"page_size": 12})
+        self.assertEqual((response["X-Cache-Status"], response.json()), ("fresh", first))
+
+        sql_models.Pig.objects.create(name="Lợn Landrace", price=90, is_published=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            api_cache.invalidate("medicine")
+        self.assertEqual(self.client.get("/api/pigs/", {"page_size": 12}).json(), first)
+        with self.captureOnCommitCallbacks(execute=True):
+            api_cache.invalidate("pig")
+        # Bản cũ được trả ngay (stale), lần làm mới chạy nền (ở đây chạy đồng bộ)
+        with override_settings(API_CACHE_REFRESH_WORKERS=0):
+            response = self.client.get("/api/pigs/", {"page_size": 12})
+        self.assertEqual((response["X-Cache-Status"], response.json()), ("stale", first))
+        response = self.client.get("/api/pigs/", {"page_size": 12})
+        self.assertEqual(response["X-Cache-Status"], "fresh")
+        self.assertEqual(response.json()["pagination"]["total_items"], 2)
+
+    def test_database_error_serves_last_good_response(self):
+        first = self.client.get("/api/pigs/").json()
+        key = api_cache.cache_key("pig", "/api/pigs/", [])
+        cache.set(key, {**cache.get(key), "fresh_until": 0, "stale_until": 0})  # quá cả grace
+        with mock.patch("core.views.Paginator", side_effect=RuntimeError("db down")):
+            response = self.client.get("/api/pigs/")
+        self.assertEqual((response.status_code, response["X-Cache-Status"]), (200, "stale"))
+        self.assertEqual(response.json(), first)
+
+        cache.clear()
+        with mock.patch("core.views.Paginator", side_effect=RuntimeError("db down")):
+            self.assertEqual(self.client.get("/api/pigs/").status_code, 500)
+
+    def test_errors_are_not_cached(self):
+        from core.views import api_pig_detail
+        request = RequestFactory().get("/api/pigs/999/")
+        self.assertEqual(api_pig_detail(request, pig_id=999).status_code, 404)
+        with self.assertNumQueries(1):
+            api_pig_detail(request, pig_id=999)
+
+
+class WarmupTests(SqlTablesMixin, TestCase):
+    """warm_api_cache tính sẵn các request đầu tiên của FE; publish warm lại đúng khoá bị ảnh hưởng."""
+
+    def setUp(self):
+        cache.clear()
+        self.pig = sql_models.Pig.objects.create(name="Lợn Duroc", price=100, is_published=True)
+        self.entry = sql_models.CmsNewsEntry.objects.create(kind_id=2, slug="tin-a", title="Tin A", is_published=True)
+
+    def test_command_warms_fe_requests(self):
+        call_command("warm_api_cache", "--workers", "0", "--top", "5", stdout=io.StringIO())
+        with self.assertNumQueries(0), mock.patch("core.views.record_view"), \
+                mock.patch("core.views.view_counts", return_value={}):
+            for path, params in (
+                ("/api/pigs/", {"published": "true"}),
+                ("/api/medicines/", {"published": "true", "page_size": 12, "page": 1}),
+                ("/api/news/", {"page": 1, "page_size": 10, "published": "true"}),
+                ("/api/news/categories/", {}),
+                (f"/api/news/{self.entry.id}/", {}),
+            ):
+                self.assertEqual(self.client.get(path, params)["X-Cache-Status"], "fresh", path)
+
+        out = io.StringIO()
+        call_command("warm_api_cache", "--workers", "0", stdout=out)
+        self.assertIn("0 response mới", out.getvalue())
+
+    def test_publish_rewarms_affected_keys(self):
+        self.client.get("/api/pigs/")
+        page = NewsPage(title="Tin mới", summary="Tóm tắt")
+        Page.objects.get(pk=1).add_child(instance=page)
+        # search index không liên quan ở đây (bảng FTS không có trên SQLite)
+        with self.captureOnCommitCallbacks(execute=True), mock.patch("core.search_index.enqueue"):
+            page.save_revision().publish()
+        page.refresh_from_db()
+
+        with self.assertNumQueries(0), mock.patch("core.views.record_view"), \
+                mock.patch("core.views.view_counts", return_value={}):
+            listed = self.client.get("/api/news/", {"page_size": 12})
+            detail = self.client.get(f"/api/news/{page.external_id}/")
+            pigs = self.client.get("/api/pigs/")
+        self.assertEqual((listed["X-Cache-Status"], detail["X-Cache-Status"]), ("fresh", "fresh"))
+        self.assertEqual(listed.json()["pagination"]["total_items"], 2)
+        # Nhóm khác không bị bỏ cache
+        self.assertEqual(pigs["X-Cache-Status"], "fresh")
+
+
+class ApiProfileTests(SqlTablesMixin, TestCase):
+    """Profile chỉ /api/ (settings/api.py, pig_farm/wsgi_api.py): cùng endpoint, không có admin/trang Wagtail."""
+
+    @override_settings(ROOT_URLCONF="pig_farm.urls_api", API_CACHE_TIMEOUT=0)
+    def test_api_urlconf_serves_only_api(self):
+        sql_models.Pig.objects.create(name="Lợn Duroc", price=100, is_published=True)
+        self.assertEqual(self.client.get("/api/pigs/").json()["pagination"]["total_items"], 1)
+        self.assertEqual(self.client.get("/api/healthz").status_code, 200)
+        for path in ("/admin/", "/api/cms/", "/django-admin/", "/"):
+            self.assertEqual(self.client.get(path).status_code, 404, path)
+
+    def test_api_profile_starts_without_admin_stack(self):
+        from core.management.commands.benchmark_startup import PROFILES, measure
+
+        full, api = measure(*PROFILES["full"]), measure(*PROFILES["api"])
+        self.assertLess(api["modules"], full["modules"])
+
+
+class ServingTests(SimpleTestCase):
+    """gunicorn.conf.py + pig_farm/serving.py: preload, gc.freeze, DEBUG luôn tắt."""
+
+    def load_config(self, **env):
+        import runpy
+        from django.conf import settings
+
+        with mock.patch.dict("os.environ", env):
+            os.environ.pop("DJANGO_SETTINGS_MODULE")  # như shell của container, không qua manage.py
+            try:
+                return runpy.run_path(str(settings.BASE_DIR) + "/gunicorn.conf.py"), dict(os.environ)
+            finally:
+                gc.enable()
+
+    def test_config_defaults_to_preloaded_gthread_with_jitter(self):
+        config, env = self.load_config()
+        self.assertTrue(config["preload_app"])
+        self.assertEqual(config["worker_class"], "gthread")
+        self.assertGreater(config["max_requests_jitter"], 0)
+        self.assertEqual(env["PIG_FARM_PRELOADED"], "1")
+        self.assertEqual(env["DJANGO_SETTINGS_MODULE"], "pig_farm.settings.production")
+
+        config, _ = self.load_config(GUNICORN_WORKER_CLASS="sync", GUNICORN_WORKERS="3")
+        self.assertEqual((config["workers"], config["threads"]), (3, 1))
+
+    def test_api_app_loads_api_settings(self):
+        import subprocess
+        import sys
+        from django.conf import settings
+
+        _, env = self.load_config(GUNICORN_APP="pig_farm.wsgi_api:application")
+        self.assertEqual(env["DJANGO_SETTINGS_MODULE"], "pig_farm.settings.api")
+
+        # Process mới như worker của gunicorn: nạp file config rồi mới import app
+        child = (
+            "import importlib, runpy; runpy.run_path('gunicorn.conf.py'); "
+            "importlib.import_module('pig_farm.wsgi_api'); "
+            "from django.conf import settings; print(settings.ROOT_URLCONF)"
+        )
+        env = {name: value for name, value in os.environ.items() if name != "DJANGO_SETTINGS_MODULE"}
+        env.update(GUNICORN_APP="pig_farm.wsgi_api:application", SECRET_KEY="test",
+                   API_CACHE_WARM_ON_STARTUP="False")
+        result = subprocess.run([sys.executable, "-c", child], cwd=settings.BASE_DIR, env=env,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "pig_farm.urls_api")
+
+    def test_refuses_to_serve_with_debug(self):
+        config, _ = self.load_config()
+        with override_settings(DEBUG=True), self.assertRaises(RuntimeError):
+            config["when_ready"](None)
+
+    def test_freeze_before_fork_and_warmup_in_worker(self):
+        from pig_farm import serving
+
+        with mock.patch("core.warmup.start_background_warmup") as warmup:
+            with mock.patch.dict("os.environ", {serving.PRELOAD_ENV: "1"}):
+                serving.start_warmup_on_import()
+            warmup.assert_not_called()
+            try:
+                serving.before_fork()
+                self.assertGreater(gc.get_freeze_count(), 0)
+            finally:
+                gc.unfreeze()
+            serving.worker_started()
+            warmup.assert_called_once()
+
+
+class SitemapTests(SqlTablesMixin, TestCase):
+    """Sitemap tĩnh chia shard theo khoảng id; publish chỉ ghi lại shard của dòng bị đổi."""
+
+    def setUp(self):
+        for name in os.listdir(self._sitemap_root):
+            os.remove(os.path.join(self._sitemap_root, name))
+
+    def read(self, name):
+        with open(os.path.join(self._sitemap_root, name), encoding="utf-8") as f:
+            return f.read()
+
+    @override_settings(SITEMAP_SHARD_SIZE=10, SITEMAP_BASE_URL="https://farm.example/")
+    def test_rebuild_writes_shards_and_index(self):
+        sql_models.Pig.objects.create(id=3, name="Lợn A", is_published=True)
+        sql_models.Pig.objects.create(id=25, name="Lợn B", is_published=True)
+        sql_models.Pig.objects.create(id=26, name="Lợn nháp", is_published=False)
+        sql_models.CmsNewsEntry.objects.create(id=4, kind_id=2, slug="tin-mới & hay", title="Tin", is_published=True)
+
+        out = io.StringIO()
+        call_command("build_sitemaps", stdout=out)
+        self.assertIn("pig: 2 URL", out.getvalue())
+        self.assertEqual([name for name, _, _ in sitemaps.shard_files()],
+                         ["sitemap-news-0.xml", "sitemap-pig-0.xml", "sitemap-pig-2.xml"])
+
+        shard = self.read("sitemap-pig-2.xml")
+        self.assertIn("<loc>https://farm.example/products/pig/25</loc>", shard)
+        self.assertNotIn("/26<", shard)
+        updated = sql_models.Pig.objects.get(id=25).updated_at
+        self.assertIn(f"<lastmod>{updated.replace(microsecond=0).isoformat()}</lastmod>", shard)
+        self.assertIn("/news/tin-m%E1%BB%9Bi%20%26%20hay</loc>", self.read("sitemap-news-0.xml"))
+        self.assertIn("<loc>https://farm.example/sitemap-pig-2.xml</loc>", self.read("sitemap.xml"))
+
+    @override_settings(SITEMAP_SHARD_SIZE=10)
+    def test_publish_hook_rewrites_only_affected_shard(self):
+        sql_models.Pig.objects.create(id=3, name="Lợn A", is_published=True)
+        sql_models.Pig.objects.create(id=25, name="Lợn B", is_published=True)
+        sitemaps.rebuild()
+        untouched = os.path.getmtime(os.path.join(self._sitemap_root, "sitemap-pig-0.xml"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sql_models.Pig.objects.filter(id=25).update(is_published=False)
+            sitemaps.schedule_update("pig", 25)
+        self.assertFalse(os.path.exists(os.path.join(self._sitemap_root, "sitemap-pig-2.xml")))
+        self.assertNotIn("sitemap-pig-2.xml", self.read("sitemap.xml"))
+        self.assertEqual(os.path.getmtime(os.path.join(self._sitemap_root, "sitemap-pig-0.xml")), untouched)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sql_models.Pig.objects.filter(id=25).update(is_published=True)
+            sitemaps.schedule_update("pig", 25)
+        self.assertIn("/products/pig/25<", self.read("sitemap-pig-2.xml"))
+
+    @override_settings(SITEMAP_SHARD_SIZE=10)
+    def test_shard_lastmod_never_goes_back(self):
+        old = timezone.now() - timezone.timedelta(days=10)
+        sql_models.Pig.objects.create(id=3, name="Lợn cũ", is_published=True)
+        sql_models.Pig.objects.filter(id=3).update(updated_at=old)
+        sql_models.Pig.objects.create(id=5, name="Lợn mới", is_published=True)
+        sitemaps.rebuild()
+        shard = os.path.join(self._sitemap_root, "sitemap-pig-0.xml")
+        before = os.path.getmtime(shard)
+
+        # Gỡ dòng mới nhất: updated_at lớn nhất còn lại lùi về 10 ngày trước, mtime thì không
+        with self.captureOnCommitCallbacks(execute=True):
+            sql_models.Pig.objects.filter(id=5).update(is_published=False)
+            sitemaps.schedule_update("pig", 5)
+        self.assertNotIn("/products/pig/5<", self.read("sitemap-pig-0.xml"))
+        self.assertGreaterEqual(os.path.getmtime(shard), before)
+        self.assertGreater(os.path.getmtime(shard), old.timestamp())
+
+    def test_news_publish_updates_sitemap(self):
+        page = NewsPage(title="Tin sitemap", summary="Tóm tắt")
+        Page.objects.get(pk=1).add_child(instance=page)
+        with self.captureOnCommitCallbacks(execute=True), mock.patch("core.search_index.enqueue"):
+            page.save_revision().publish()
+        page.refresh_from_db()
+        slug = sql_models.CmsNewsEntry.objects.get(id=page.external_id).slug
+        self.assertIn(f"/news/{slug}<", self.read(sitemaps.shard_name("news", sitemaps.shard_of(page.external_id))))
+        self.assertEqual(self.client.get("/sitemap.xml").status_code, 200)
+
+
+class NewsFeedTests(SqlTablesMixin, TestCase):
+    """/api/news/feed.xml: render sẵn trong cache, render lại khi publish tin, hỗ trợ conditional GET."""
+
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        sql_models.CmsNewsEntry.objects.create(kind_id=2, slug="tin-a", title="Tin A", summary="Tóm tắt A",
+                                               is_published=True, published_at=now - timezone.timedelta(days=1))
+        sql_models.CmsNewsEntry.objects.create(kind_id=2, slug="tin-b", title="Tin B", is_published=True,
+                                               published_at=now)
+        sql_models.CmsNewsEntry.objects.create(kind_id=2, slug="nhap", title="Bản nháp", is_published=False)
+
+    def test_rss_and_atom(self):
+        rss = self.client.get("/api/news/feed.xml")
+        self.assertEqual(rss.status_code, 200)
+        self.assertTrue(rss["Content-Type"].startswith("application/rss+xml"))
+        body = rss.content.decode()
+        self.assertLess(body.index("Tin B"), body.index("Tin A"))
+        self.assertIn("http://localhost:8080/news/tin-a", body)
+        self.assertNotIn("Bản nháp", body)
+
+        atom = self.client.get("/api/news/feed.xml", {"format": "atom"})
+        self.assertTrue(atom["Content-Type"].startswith("application/atom+xml"))
+        self.assertIn("<entry>", atom.content.decode())
+        self.assertEqual(self.client.get("/api/news/feed.xml", {"format": "json"}).status_code, 400)
+
+    def test_conditional_get_and_cached_render(self):
+        first = self.client.get("/api/news/feed.xml")
+        with self.assertNumQueries(0):
+            cached = self.client.get("/api/news/feed.xml")
+            not_modified = self.client.get("/api/news/feed.xml", HTTP_IF_NONE_MATCH=first["ETag"])
+            since = self.client.get("/api/news/feed.xml", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(cached.content, first.content)
+        self.assertEqual((not_modified.status_code, not_modified.content), (304, b""))
+        self.assertEqual(since.status_code, 304)
+        self.assertEqual(self.client.get("/api/news/feed.xml", HTTP_IF_NONE_MATCH='"khac"').status_code, 200)
+
+    def test_news_publish_rebuilds_feed(self):
+        etag = self.client.get("/api/news/feed.xml")["ETag"]
+        page = NewsPage(title="Tin vừa đăng", summary="Mới")
+        Page.objects.get(pk=1).add_child(instance=page)
+        with self.captureOnCommitCallbacks(execute=True), mock.patch("core.search_index.enqueue"):
+            page.save_revision().publish()
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/news/feed.xml", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Tin vừa đăng", response.content.decode())
+
+    def test_last_modified_never_goes_back(self):
+        first = feeds.rebuild()["rss"]
+        self.assertEqual(feeds.rebuild()["rss"]["last_modified"], first["last_modified"])
+
+        # Gỡ tin mới nhất: updated_at lớn nhất còn lại cũ hơn, Last-Modified vẫn phải tăng
+        sql_models.CmsNewsEntry.objects.filter(slug="tin-b").update(is_published=False)
+        second = feeds.rebuild()["rss"]
+        self.assertNotEqual(second["etag"], first["etag"])
+        self.assertGreater(second["last_modified"], first["last_modified"])
+        response = self.client.get("/api/news/feed.xml", HTTP_IF_MODIFIED_SINCE=http_date(first["last_modified"]))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(NEWS_FEED_CACHE_TIMEOUT=123)
+    def test_feed_cache_has_finite_timeout(self):
+        # LocMemCache: publish chỉ render lại ở worker của nó, worker khác phải tự hết hạn
+        with mock.patch("core.feeds.cache.set_many") as set_many:
+            feeds.rebuild()
+        self.assertEqual(set_many.call_args.args[1], 123)
+
+
+class SnapshotTests(SqlTablesMixin, TestCase):
+    """Snapshot JSON tĩnh: phiên bản đầy đủ + swap symlink current, cập nhật tăng dần tại chỗ."""
+
+    def setUp(self):
+        cache.clear()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        override = override_settings(SNAPSHOT_ROOT=self.root, SNAPSHOT_ENABLED=True, SNAPSHOT_BACKGROUND=False,
+                                     SNAPSHOT_KEEP_VERSIONS=2)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.news = sql_models.CmsNewsEntry.objects.create(kind_id=2, slug="tin-a", title="Tin A",
+                                                           is_published=True, published_at=timezone.now())
+
+    def path(self, relpath):
+        return os.path.join(self.root, snapshots.CURRENT, relpath)
+
+    def read(self, relpath):
+        with open(self.path(relpath), encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_export_all_matches_api(self):
+        out = io.StringIO()
+        call_command("export_snapshots", stdout=out)
+        self.assertIn("news:", out.getvalue())
+        self.assertTrue(os.path.islink(os.path.join(self.root, snapshots.CURRENT)))
+
+        api = self.client.get("/api/news/").json()
+        for item in api["data"]:
+            item.pop("view_count")
+        self.assertEqual(self.read("api/news/index.json"), api)
+        self.assertEqual(self.read("api/news/page-1-size-12.json")["data"], api["data"])
+        detail = self.read(f"api/news/{self.news.id}/index.json")["data"]
+        self.assertEqual(detail["title"], "Tin A")
+        # Lượt xem không đứng yên trong file tĩnh
+        self.assertNotIn("view_count", detail)
+        self.assertTrue(os.path.exists(self.path("api/news/categories/index.json")))
+        self.assertTrue(os.path.exists(self.path("api/pigs/index.json")))
+
+    def test_incremental_update_rewrites_only_changed_files(self):
+        snapshots.export_all()
+        version = snapshots.current_dir()
+        list_inode = os.stat(self.path("api/news/index.json")).st_ino
+        pigs_inode = os.stat(self.path("api/pigs/index.json")).st_ino
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sql_models.CmsNewsEntry.objects.filter(id=self.news.id).update(is_published=False)
+            snapshots.schedule_update("news", self.news.id)
+        self.assertEqual(snapshots.current_dir(), version)
+        self.assertFalse(os.path.exists(self.path(f"api/news/{self.news.id}/index.json")))
+        self.assertEqual(self.read("api/news/index.json")["data"], [])
+        # File mới thay bằng rename; nhóm khác không bị chạm
+        self.assertNotEqual(os.stat(self.path("api/news/index.json")).st_ino, list_inode)
+        self.assertEqual(os.stat(self.path("api/pigs/index.json")).st_ino, pigs_inode)
+
+        snapshots.export_all()
+        snapshots.export_all()
+        self.assertEqual(len(os.listdir(os.path.join(self.root, snapshots.VERSIONS))), 2)
+        self.assertFalse(os.path.exists(version))
+
+    def test_update_without_current_exports_all(self):
+        self.assertIsNone(snapshots.current_dir())
+        snapshots.update("news", self.news.id)
+        self.assertTrue(os.path.exists(self.path("api/pigs/index.json")))
+
+    def test_news_publish_updates_snapshot(self):
+        snapshots.export_all()
+        page = NewsPage(title="Tin snapshot", summary="Tóm tắt")
+        Page.objects.get(pk=1).add_child(instance=page)
+        with self.captureOnCommitCallbacks(execute=True), mock.patch("core.search_index.enqueue"):
+            page.save_revision().publish()
+        page.refresh_from_db()
+        self.assertEqual(self.read(f"api/news/{page.external_id}/index.json")["data"]["title"], "Tin snapshot")
+        self.assertIn("Tin snapshot", [item["title"] for item in self.read("api/news/index.json")["data"]])
+
+
+class ChangesApiTests(SqlTablesMixin, TestCase):
+    """/api/changes/: dòng đổi sau token theo seq, tombstone cho dòng unpublish / soft delete / đã xoá."""
+
+    def setUp(self):
+        self.seq = 0
+        self.pig = sql_models.Pig.objects.create(name="Lợn A", price=100, is_published=True)
+        self.hidden_pig = sql_models.Pig.objects.create(name="Lợn ẩn", is_published=False)
+        self.medicine = sql_models.Medicine.objects.create(name="Thuốc", is_published=True, is_deleted=True,
+                                                           deleted_at=timezone.now())
+        self.category = sql_models.NewsCategory.objects.create(name="Kỹ thuật", slug="ky-thuat", is_published=True)
+        self.news = sql_models.CmsNewsEntry.objects.create(kind_id=2, slug="tin", title="Tin", is_published=True)
+        for entity, entity_id in (("pig", self.pig.id), ("pig", self.hidden_pig.id), ("medicine", self.medicine.id),
+                                  ("category", self.category.id), ("news", self.news.id), ("pig", 999)):
+            self.touch(entity, entity_id)
+
+    def touch(self, entity, entity_id, xid=None, seq=None):
+        """Như trigger record_catalog_change: mỗi dòng một bản ghi, seq mới mỗi lần đổi (mặc định xid = 100 + seq)"""
+        self.seq += 1
+        seq = seq or self.seq
+        sql_models.CatalogChange.objects.update_or_create(
+            entity=entity, entity_id=entity_id,
+            defaults={"seq": seq, "xid": xid or 100 + seq, "changed_at": timezone.now()})
+
+    def test_full_sync_with_tombstones(self):
+        body = self.client.get("/api/changes/").json()
+        self.assertEqual(body["next_token"], "107-0")
+        self.assertFalse(body["has_more"])
+        data = body["data"]
+        self.assertEqual([pig["name"] for pig in data["pigs"]["changed"]], ["Lợn A"])
+        self.assertEqual(data["pigs"]["deleted"], [
+            {"id": self.hidden_pig.id, "reason": "unpublished", "deleted_at": None},
+            {"id": 999, "reason": "removed", "deleted_at": None},
+        ])
+        self.assertEqual(data["medicines"]["deleted"][0]["reason"], "deleted")
+        self.assertIsNotNone(data["medicines"]["deleted"][0]["deleted_at"])
+        self.assertEqual(data["categories"]["changed"][0]["slug"], "ky-thuat")
+        self.assertEqual(data["news"]["changed"][0]["title"], "Tin")
+
+    def test_delta_and_paging(self):
+        token = self.client.get("/api/changes/").json()["next_token"]
+        self.assertEqual(self.client.get("/api/changes/", {"since": token}).json()["data"]["pigs"],
+                         {"changed": [], "deleted": []})
+
+        sql_models.Pig.objects.filter(id=self.pig.id).update(is_published=False)
+        self.touch("pig", self.pig.id)
+        self.touch("news", self.news.id)
+        page = self.client.get("/api/changes/", {"since": token, "limit": 1}).json()
+        self.assertTrue(page["has_more"])
+        self.assertEqual(page["data"]["pigs"]["deleted"], [{"id": self.pig.id, "reason": "unpublished",
+                                                            "deleted_at": None}])
+        self.assertEqual(page["data"]["news"]["changed"], [])
+
+        page = self.client.get("/api/changes/", {"since": page["next_token"], "limit": 1}).json()
+        self.assertFalse(page["has_more"])
+        self.assertEqual([entry["id"] for entry in page["data"]["news"]["changed"]], [self.news.id])
+        self.assertEqual(page["next_token"], "109-0")
+
+    def test_token_waits_for_running_transactions(self):
+        token = self.client.get("/api/changes/").json()["next_token"]
+        # Transaction 108 lấy seq 8 nhưng chưa commit; transaction 109 (seq 9) commit trước
+        self.touch("news", self.news.id, xid=109, seq=9)
+        with mock.patch("core.changes.horizon", return_value=108):
+            page = self.client.get("/api/changes/", {"since": token}).json()
+        self.assertEqual(page["data"]["news"]["changed"], [])
+        self.assertEqual(page["next_token"], "108-0")
+
+        self.touch("pig", self.pig.id, xid=108, seq=8)
+        page = self.client.get("/api/changes/", {"since": page["next_token"]}).json()
+        self.assertEqual([pig["id"] for pig in page["data"]["pigs"]["changed"]], [self.pig.id])
+        self.assertEqual([entry["id"] for entry in page["data"]["news"]["changed"]], [self.news.id])
+
+    def test_invalid_and_expired_token(self):
+        self.assertEqual(self.client.get("/api/changes/", {"since": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/changes/", {"since": "-1"}).status_code, 400)
+        # Token kiểu cũ (chỉ seq) và token vượt quá dữ liệu hiện có
+        self.assertEqual(self.client.get("/api/changes/", {"since": "100"}).status_code, 410)
+        self.assertEqual(self.client.get("/api/changes/", {"since": "999-0"}).status_code, 410)
+        self.assertEqual(self.client.get("/api/changes/", {"since": "106-50"}).status_code, 410)
+
+
+class CatalogImportTests(SqlTablesMixin, TestCase):
+    """import_catalog / trang "Nhập bảng giá": diff khi dry-run, lỗi theo dòng, page publish không ghi lại SQL."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media_root = tempfile.mkdtemp()
+        cls._media_override = override_settings(MEDIA_ROOT=cls._media_root)
+        cls._media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._media_override.disable()
+        shutil.rmtree(cls._media_root, ignore_errors=True)
+
+    def setUp(self):
+        self.root = Page.objects.get(pk=1)
+        self.same = PigPage(title="Lợn Móng Cái", name="Lợn Móng Cái", price=1200000)
+        self.changed = PigPage(title="Lợn Ba Xuyên", name="Lợn Ba Xuyên", price=900000)
+        for page in (self.same, self.changed):
+            self.root.add_child(instance=page)
+            dispatch_publish(page)
+
+    def _csv(self, text):
+        return io.BytesIO(text.encode("utf-8-sig"))
+
+    def test_parse_price(self):
+        parse = catalog_import.parse_price
+        self.assertEqual(parse("1.200.000"), 1200000)
+        self.assertEqual(parse("1,200,000"), 1200000)
+        self.assertEqual(parse("150 000 đ"), 150000)
+        self.assertEqual(str(parse("1.234,5")), "1234.50")
+        self.assertEqual(parse(99.5), Decimal("99.50"))
+        self.assertIsNone(parse(" "))
+        for bad in ("abc", "-5", "1e13", "NaN"):
+            with self.assertRaises(ValueError):
+                parse(bad)
+
+    def test_dry_run_diff_and_errors(self):
+        csv_file = self._csv(
+            "Mã;Tên;Giá\n"
+            f"{self.same.external_id};Lợn Móng Cái;1.200.000\n"
+            ";Lợn  Ba Xuyên;950.000\n"
+            ";Lợn Mường Khương;700.000\n"
+            ";;\n"
+            ";Lợn mường khương;1\n"
+            "999;Lợn lạ;1\n"
+            ";Lợn giá sai;abc\n"
+        )
+        report = catalog_import.run("pig", csv_file, "bang-gia.csv", dry_run=True, batch_size=2)
+        self.assertEqual(report.counts, {"create": 1, "update": 1, "unchanged": 1})
+        self.assertEqual([line for line, _ in report.errors], [6, 7, 8])
+        self.assertIn("trùng với dòng 4", report.errors[0][1])
+        update, create = report.diff
+        self.assertEqual((update.action, update.target_id), ("update", self.changed.external_id))
+        self.assertEqual(update.changes, {"price": (Decimal("900000.00"), Decimal("950000.00"))})
+        self.assertEqual(create.changes["name"], (None, "Lợn Mường Khương"))
+        self.assertEqual(sql_models.Pig.objects.get(id=self.changed.external_id).price, 900000)
+
+    def test_id_and_name_matching_same_row_is_an_error(self):
+        # Lô khác nhau: dòng 3 (theo tên) trùng dòng SQL của dòng 2 (theo id) -> MERGE sẽ ghi một dòng hai lần
+        csv_file = self._csv(f"id,name,price\n{self.same.external_id},Lợn Móng Cái mới,1\n,Lợn Móng Cái,2\n")
+        report = catalog_import.run("pig", csv_file, "a.csv", dry_run=True, batch_size=1)
+        self.assertEqual(report.errors, [(3, f"cùng dòng id={self.same.external_id} với dòng 2")])
+        self.assertEqual(report.counts["update"], 1)
+
+    def test_xlsx_rows(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.title = "Thuốc"
+        sheet.append(["Tên", "Quy cách", "Đơn giá", "Thành tiền"])
+        sheet.append(["Amoxicillin", "Chai 100ml", 85000, 850000.0])
+        sheet.append([None, None, None, None])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        buffer.seek(0)
+        report = catalog_import.run("medicine", buffer, "thuoc.xlsx", dry_run=True, sheet="Thuốc")
+        self.assertEqual(report.counts["create"], 1)
+        self.assertEqual(report.diff[0].fields, {"name": "Amoxicillin", "packaging": "Chai 100ml",
+                                                 "price_unit": Decimal("85000.00"),
+                                                 "price_total": Decimal("850000.00")})
+        with self.assertRaises(catalog_import.CatalogImportError):
+            list(catalog_import.read_rows(io.BytesIO(b"x"), "bang-gia.xls"))
+
+    def test_write_needs_postgres(self):
+        with self.assertRaises(catalog_import.CatalogImportError):
+            catalog_import.run("pig", self._csv("Tên,Giá\nLợn,1\n"), "a.csv")
+        path = os.path.join(self._media_root, "loi.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Tên,Giá\nLợn,abc\n")
+        out = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command("import_catalog", path, "--kind", "pig", "--dry-run", stdout=out)
+        self.assertIn("dòng 2", out.getvalue())
+
+    def test_sync_pages_publish_without_sql_write(self):
+        csv_file = self._csv(f"id,name,price\n{self.changed.external_id},Lợn Ba Xuyên,950000\n,Lợn mới,10\n")
+        plans = catalog_import.run("pig", csv_file, "a.csv", dry_run=True).diff
+        # Như MERGE: dòng SQL đã có giá trị và content_hash mới trước khi publish page
+        sql_models.Pig.objects.filter(id=plans[0].target_id).update(price=950000, content_hash=plans[0].digest)
+        new = sql_models.Pig.objects.create(name="Lợn mới", price=10, is_published=True, content_hash=plans[1].digest)
+        before = dict(sql_models.Pig.objects.values_list("id", "updated_at"))
+
+        with mock.patch("core.search_index.enqueue"), self.captureOnCommitCallbacks(execute=True):
+            created, updated = catalog_import.sync_pages(catalog_import.KINDS["pig"], [
+                (plans[0].target_id, plans[0].page_id, plans[0].fields),
+                (new.id, None, plans[1].fields),
+            ], self.root)
+        self.assertEqual((created, updated), (1, 1))
+        self.assertEqual(dict(sql_models.Pig.objects.values_list("id", "updated_at")), before)
+        page = PigPage.objects.get(external_id=new.id)
+        self.assertTrue(page.live)
+        self.assertEqual(page.title, "Lợn mới")
+        self.changed.refresh_from_db()
+        self.assertEqual(self.changed.price, 950000)
+
+    def test_admin_preview(self):
+        from django.contrib.auth import get_user_model
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "a@example.com", "x"))
+        self.assertEqual(self.client.get("/admin/catalog-import/").status_code, 200)
+        upload = SimpleUploadedFile("bang-gia.csv", "Tên,Giá\nLợn Ba Xuyên,950000\n".encode())
+        response = self.client.post("/admin/catalog-import/", {"kind": "pig", "file": upload, "action": "preview"})
+        self.assertRedirects(response, response.url, fetch_redirect_response=False)
+        self.assertIn("?job=", response.url)
+        response = self.client.get(response.url)
+        self.assertEqual(response.context["report"].counts["update"], 1)
+        self.assertContains(response, 'value="import"')
+        self.assertEqual(sql_models.Pig.objects.get(id=self.changed.external_id).price, 900000)
+
+    @override_settings(CATALOG_IMPORT_BACKGROUND=True)
+    def test_admin_import_runs_in_background(self):
+        from django.contrib.auth import get_user_model
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "a@example.com", "x"))
+        upload = SimpleUploadedFile("bang-gia.csv", "Tên,Giá\nLợn Ba Xuyên,950000\n".encode())
+        with mock.patch("core.catalog_import._import_executor") as executor, \
+                mock.patch("core.catalog_import.run") as run:
+            response = self.client.post("/admin/catalog-import/", {"kind": "pig", "file": upload,
+                                                                   "action": "import"})
+            run.assert_not_called()
+            polling = self.client.get(response.url)
+            self.assertContains(polling, "Đang nhập")
+            self.assertContains(polling, "window.location.reload")
+
+            run.return_value = catalog_import.Report()
+            with mock.patch("core.catalog_import.connection"):
+                executor.return_value.submit.call_args.args[0]()
+            run.assert_called_once()
+            self.assertFalse(run.call_args.kwargs["dry_run"])
+        done = self.client.get(response.url)
+        self.assertRedirects(done, reverse("core_pig_modeladmin_index"), fetch_redirect_response=False)
+
+    @override_settings(CATALOG_IMPORT_BACKGROUND=True, CATALOG_IMPORT_STALE_SECONDS=60)
+    def test_job_without_heartbeat_is_reported_failed(self):
+        document = mock.Mock(pk=1)
+        with mock.patch("core.catalog_import._import_executor"), \
+                mock.patch("core.catalog_import._ensure_heartbeat"):
+            job_id = catalog_import.start("pig", document)
+        self.assertEqual(catalog_import.job_status(job_id)["state"], "running")
+
+        # Worker bị kill: không còn ai ghi nhịp, kết quả không bao giờ được lưu
+        with mock.patch("core.catalog_import.time.time", return_value=time.time() + 61):
+            job = catalog_import.job_status(job_id)
+        self.assertEqual(job["state"], "failed")
+        self.assertIn("chạy lại", job["error"])
+
+
+class ArchiveDeletedRowsTests(SqlTablesMixin, TestCase):
+    """archive_deleted_rows: chọn lô theo mốc xoá, view *_all gộp bảng nóng và archive."""
+
+    def setUp(self):
+        now = timezone.now()
+        self.cutoff = now - timezone.timedelta(days=90)
+        old = now - timezone.timedelta(days=120)
+        self.live = sql_models.Pig.objects.create(name="Lợn sống", is_published=True)
+        self.recent = sql_models.Pig.objects.create(name="Lợn mới xoá", is_deleted=True, deleted_at=now)
+        self.old = [sql_models.Pig.objects.create(name=f"Lợn cũ {i}", is_deleted=True, deleted_at=old)
+                    for i in range(3)]
+
+    def test_batch_selects_only_rows_deleted_before_cutoff(self):
+        from core.management.commands.archive_deleted_rows import batch_ids_sql
+        with connection.cursor() as cur:
+            cur.execute(batch_ids_sql("product_pig", lock=False), [self.cutoff, 2])
+            first = [row[0] for row in cur.fetchall()]
+            cur.execute(batch_ids_sql("product_pig", lock=False), [self.cutoff, 10])
+            every = [row[0] for row in cur.fetchall()]
+        old_ids = [pig.id for pig in self.old]
+        self.assertEqual(first, old_ids[:2])
+        self.assertEqual(every, old_ids)
+
+    def test_union_view_model(self):
+        from core.management.commands.archive_deleted_rows import ARCHIVE_CHILDREN, union_view_sql
+        names = ", ".join(f'"{field.column}"' for field in sql_models.Pig._meta.concrete_fields)
+        with connection.cursor() as cur:
+            cur.execute("CREATE TABLE product_pig_archive AS SELECT * FROM product_pig WHERE 0")
+            cur.execute("INSERT INTO product_pig_archive SELECT * FROM product_pig WHERE id = %s",
+                        [self.old[0].id])
+            cur.execute("DELETE FROM product_pig WHERE id = %s", [self.old[0].id])
+            cur.execute(union_view_sql("product_pig", names))
+        try:
+            rows = {pig.id: pig.is_archived for pig in sql_models.PigAll.objects.all()}
+            self.assertEqual(len(rows), 5)
+            self.assertTrue(rows[self.old[0].id])
+            self.assertFalse(rows[self.live.id])
+            self.assertEqual(sql_models.PigAll.objects.get(id=self.old[0].id).name, "Lợn cũ 0")
+        finally:
+            with connection.cursor() as cur:
+                cur.execute("DROP VIEW product_pig_all")
+                cur.execute("DROP TABLE product_pig_archive")
+        # pig_images.pig_id là ON DELETE SET NULL: ảnh phải đi cùng lợn
+        self.assertIn(("pig_images", "pig_id", "id"), ARCHIVE_CHILDREN["product_pig"])
+
+    def test_children_move_in_same_statement(self):
+        from core.management.commands.archive_deleted_rows import move_batch
+        cursor = mock.Mock(**{"fetchall.return_value": [(4,), (7,)]})
+        moved = move_batch(cursor, "product_pig", '"id"', self.cutoff, 2,
+                           [("pig_images", "pig_id", '"id", "pig_id"'), ("product_pig_image", "pig_id", '"pig_id"')])
+        self.assertEqual(moved, [4, 7])
+        sql, params = cursor.execute.call_args.args
+        self.assertEqual(cursor.execute.call_count, 1)
+        self.assertEqual(params, [self.cutoff, 2])
+        for child in ("pig_images", "product_pig_image"):
+            self.assertIn(f"DELETE FROM {child} WHERE pig_id IN (SELECT id FROM batch)", sql)
+            self.assertIn(f"INSERT INTO {child}_archive", sql)
@@ -0,0 +1,99 @@
+"""
+Điểm trending của tin tức: lượt xem theo giờ giảm dần theo hàm mũ.
+
+    score(T) = Σ views_b · exp(-λ (T - b)),  λ = ln 2 / TRENDING_HALF_LIFE_HOURS
+
+Lượt xem theo giờ nằm ở news_view_hourly (core/view_counter.py ghi). Lệnh
+compute_trending_scores chạy theo lịch (cron ~15 phút) và tính tăng dần:
+
+- Bucket "đã đóng" là bucket cũ hơn giờ trước đó (flush có thể trễ vài giây
+  sau khi sang giờ mới). base_score của mỗi bài là tổng các bucket đã đóng quy
+  về base_hour; lần chạy sau chỉ nhân base_score với exp(-λ Δ) rồi cộng các
+  bucket mới đóng, không đọc lại toàn bộ lịch sử.
+- score = base_score giảm tới giờ hiện tại + hai bucket còn mở.
+- Bảng news_trending_scores có index (score DESC, entry_id) nên
+  /api/news/?sort=trending là một index scan, không GROUP BY trên lượt xem.
+
+Phép tính gộp là một vòng cộng theo entry_id (vài nghìn dòng mỗi lần chạy).
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from .sql_models import NewsTrendingScore, NewsViewHourly
+from .view_counter import current_hour
+
+HOUR = 3600.0
+
+
+def decay(age_hours, half_life_hours) -> float:
+    """Hệ số giảm exp(-λ·tuổi), tuổi tính bằng giờ."""
+    return math.exp(-math.log(2) / half_life_hours * age_hours)
+
+
+def fold(base_ids, base_scores, base_ages, bucket_ids, bucket_views, bucket_ages, half_life_hours) -> dict:
+    """Giảm các base_score cũ theo tuổi rồi cộng bucket mới, tất cả quy về cùng một mốc.
+
+    Trả về {entry_id: điểm}.
+    """
+    totals = defaultdict(float)
+    for entry_id, value, age in zip(base_ids, base_scores, base_ages):
+        totals[entry_id] += value * decay(age, half_life_hours)
+    for entry_id, value, age in zip(bucket_ids, bucket_views, bucket_ages):
+        totals[entry_id] += value * decay(age, half_life_hours)
+    return dict(totals)
+
+
+def _ages(moments, reference):
+    return [(reference - moment).total_seconds() / HOUR for moment in moments]
+
+
+def recompute(now_hour=None) -> int:
+    """Cập nhật news_trending_scores; trả về số bài còn điểm."""
+    half_life = settings.TRENDING_HALF_LIFE_HOURS
+    now_hour = now_hour or current_hour()
+    open_from = now_hour - timedelta(hours=1)  # bucket >= open_from có thể còn được cộng thêm
+
+    base = list(NewsTrendingScore.objects.values_list("entry_id", "base_score", "base_hour"))
+    watermark = max((row[2] for row in base), default=None)
+
+    closed = NewsViewHourly.objects.filter(bucket_hour__lt=open_from)
+    if watermark is not None:
+        closed = closed.filter(bucket_hour__gte=watermark)
+    closed = list(closed.values_list("entry_id", "views", "bucket_hour"))
+    recent = list(NewsViewHourly.objects.filter(bucket_hour__gte=open_from)
+                  .values_list("entry_id", "views", "bucket_hour"))
+
+    # base mới quy về open_from
+    base_scores = fold(
+        [row[0] for row in base], [row[1] for row in base], _ages([row[2] for row in base], open_from),
+        [row[0] for row in closed], [row[1] for row in closed], _ages([row[2] for row in closed], open_from),
+        half_life,
+    )
+    # score quy về now_hour = base giảm thêm một giờ + các bucket còn mở
+    scores = fold(
+        list(base_scores), list(base_scores.values()), [1.0] * len(base_scores),
+        [row[0] for row in recent], [row[1] for row in recent], _ages([row[2] for row in recent], now_hour),
+        half_life,
+    )
+
+    rows = [
+        NewsTrendingScore(entry_id=entry_id, score=score, base_score=base_scores.get(entry_id, 0.0),
+                          base_hour=open_from)
+        for entry_id, score in sorted(scores.items())
+        if score >= settings.TRENDING_MIN_SCORE
+    ]
+    with transaction.atomic():
+        NewsTrendingScore.objects.bulk_create(
+            rows, batch_size=1000, update_conflicts=True,
+            unique_fields=["entry_id"], update_fields=["score", "base_score", "base_hour", "updated_at"],
+        )
+        # Dòng không được ghi lại ở lần này là bài đã giảm dưới ngưỡng
+        NewsTrendingScore.objects.filter(base_hour__lt=open_from).delete()
+        # Bucket đã gộp vào base thì chỉ giữ lại một thời gian để tra cứu
+        retention = now_hour - timedelta(hours=settings.TRENDING_BUCKET_RETENTION_HOURS)
+        NewsViewHourly.objects.filter(bucket_hour__lt=min(open_from, retention)).delete()
+    return len(rows)
@@ -0,0 +1,146 @@
+"""
+Đếm lượt xem tin tức theo lô, không ghi DB trong request.
+
+Mỗi lần xem chỉ tăng một Counter trong bộ nhớ process (record_view). Một
+thread nền gom mỗi VIEW_COUNTER_FLUSH_SECONDS giây (hoặc sớm hơn khi đã có
+VIEW_COUNTER_MAX_PENDING bài chờ) và ghi tất cả bằng một câu
+UPDATE ... FROM (VALUES ...) vào bảng news_view_counters; bài chưa có dòng
+đếm thì INSERT ... ON CONFLICT. Request đọc không bao giờ giữ khoá dòng.
+Cùng lô đó cộng vào news_view_hourly (một dòng mỗi bài mỗi giờ) làm đầu vào
+cho điểm trending (core/trending.py).
+
+Mất dữ liệu khi crash: lượt xem nằm trong bộ nhớ của worker nên nếu process
+bị kill (SIGKILL, OOM, gunicorn timeout) thì mất tối đa những lượt chưa flush,
+tức khoảng VIEW_COUNTER_FLUSH_SECONDS giây lượt xem của worker đó. Tắt bình
+thường (SIGTERM, max_requests) vẫn flush qua atexit. Flush lỗi (DB down) thì
+số đếm được trả lại hàng đợi và thử lại ở nhịp sau.
+
+API trả về số đã flush (view_counts), không cộng phần đang chờ của worker.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .sql_models import NewsViewCounter
+
+logger = logging.getLogger(__name__)
+
+TABLE = "news_view_counters"
+HOURLY_TABLE = "news_view_hourly"
+
+_pending = Counter()  # (entry_id, giờ) -> số lượt chưa ghi
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_worker = None
+
+
+def current_hour():
+    """Đầu giờ hiện tại (UTC) - khoá bucket của news_view_hourly."""
+    return timezone.now().astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def record_view(entry_id: int):
+    """Ghi nhận một lượt xem (chỉ trong bộ nhớ)."""
+    with _lock:
+        _pending[(entry_id, current_hour())] += 1
+        size = len(_pending)
+    if settings.VIEW_COUNTER_FLUSH_SECONDS <= 0:
+        flush()
+    elif size >= settings.VIEW_COUNTER_MAX_PENDING:
+        _ensure_worker()
+        _wakeup.set()
+    else:
+        _ensure_worker()
+
+
+def _write(batch: dict):
+    """Một UPDATE ... FROM (VALUES ...) cho các dòng đã có, INSERT cho dòng mới, rồi bucket theo giờ."""
+    counts = Counter()
+    for (entry_id, _), n in batch.items():
+        counts[entry_id] += n
+    items = sorted(counts.items())  # thứ tự cố định, tránh deadlock giữa các worker
+    values = ", ".join(["(%s, %s)"] * len(items))
+    params = [value for item in items for value in item]
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Cột của VALUES tên column1, column2 trên cả Postgres và SQLite
+        cursor.execute(f"""
+            UPDATE {TABLE} AS c
+            SET view_count = c.view_count + v.column2, updated_at = CURRENT_TIMESTAMP
+            FROM (VALUES {values}) AS v
+            WHERE c.entry_id = v.column1
+            RETURNING entry_id
+        """, params)
+        updated = {row[0] for row in cursor.fetchall()}
+        missing = [(pk, n) for pk, n in items if pk not in updated]
+        if missing:
+            cursor.execute(f"""
+                INSERT INTO {TABLE} (entry_id, view_count, updated_at)
+                VALUES {", ".join(["(%s, %s, CURRENT_TIMESTAMP)"] * len(missing))}
+                ON CONFLICT (entry_id) DO UPDATE
+                SET view_count = {TABLE}.view_count + excluded.view_count, updated_at = CURRENT_TIMESTAMP
+            """, [value for item in missing for value in item])
+
+        buckets = sorted(batch.items())
+        cursor.execute(f"""
+            INSERT INTO {HOURLY_TABLE} (entry_id, bucket_hour, views)
+            VALUES {", ".join(["(%s, %s, %s)"] * len(buckets))}
+            ON CONFLICT (entry_id, bucket_hour) DO UPDATE
+            SET views = {HOURLY_TABLE}.views + excluded.views
+        """, [value for (entry_id, hour), n in buckets
+               for value in (entry_id, connection.ops.adapt_datetimefield_value(hour), n)])
+
+
+def flush() -> int:
+    """Ghi toàn bộ lượt xem đang chờ; trả về số bucket (bài, giờ) đã ghi."""
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+    if not batch:
+        return 0
+    try:
+        _write(batch)
+    except Exception as e:
+        logger.error(f"View counter flush failed ({len(batch)} entries): {e}")
+        with _lock:
+            _pending.update(batch)
+        return 0
+    return len(batch)
+
+
+def view_counts(entry_ids) -> dict:
+    """{entry_id: view_count} đã flush; bài chưa có lượt xem không có trong dict."""
+    entry_ids = [pk for pk in entry_ids if pk]
+    if not entry_ids:
+        return {}
+    return dict(NewsViewCounter.objects.filter(entry_id__in=entry_ids).values_list("entry_id", "view_count"))
+
+
+def _run():
+    while True:
+        _wakeup.wait(settings.VIEW_COUNTER_FLUSH_SECONDS)
+        _wakeup.clear()
+        try:
+            flush()
+        except Exception as e:
+            logger.error(f"View counter worker error: {e}")
+        finally:
+            connection.close()
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="view-counter", daemon=True)
+            _worker.start()
+
+
+atexit.register(flush)
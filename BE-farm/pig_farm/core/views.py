@@ -1,10 +1,24 @@
+from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.core.paginator import Paginator
-from .sql_models import Medicine, Pig, CmsContentEntry, CmsNewsEntry, NewsCategory
+from .sql_models import Medicine, Pig, CmsContentEntry, CmsNewsEntry, NewsCategory, NewsTrendingScore, NewsViewCounter
+from .renditions import largest_url, srcset_for
+from .galleries import galleries_for, wants_images
+from .autocomplete import autocomplete
+from .view_counter import record_view, view_counts
+from .api_cache import cached_api
+from .feeds import FORMATS as FEED_FORMATS, feed_response
+from .changes import TokenExpired, changes_since, parse_token
 import json
 
+# ?sort= cho /api/news/: bảng xếp hạng tính sẵn, đọc theo index (cột điểm DESC, entry_id)
+NEWS_RANKINGS = {
+    'popular': (NewsViewCounter, 'view_count'),
+    'trending': (NewsTrendingScore, 'score'),
+}
+
 @require_http_methods(["GET"])
 def api_health(request):
     """Health check endpoint"""
@@ -15,6 +29,7 @@ def api_health(request):
     })
 
 @require_http_methods(["GET"])
+@cached_api("medicine")
 def api_medicines(request):
     """API endpoint for medicines"""
     try:
@@ -41,9 +56,11 @@ def api_medicines(request):
         page_obj = paginator.get_page(page)
         
         # Serialize data
+        entries = list(page_obj)
+        galleries = galleries_for('medicine', [m.id for m in entries]) if wants_images(request) else None
         medicines = []
-        for medicine in page_obj:
-            medicines.append({
+        for medicine in entries:
+            item = {
                 'id': medicine.id,
                 'name': medicine.name,
                 'packaging': medicine.packaging,
@@ -52,7 +69,10 @@ def api_medicines(request):
                 'is_published': medicine.is_published,
                 'published_at': medicine.published_at.isoformat() if medicine.published_at else None,
                 'updated_at': medicine.updated_at.isoformat() if medicine.updated_at else None,
-            })
+            }
+            if galleries is not None:
+                item['images'] = galleries.get(medicine.id, [])
+            medicines.append(item)
         
         return JsonResponse({
             'status': 'success',
@@ -74,6 +94,7 @@ def api_medicines(request):
         }, status=500)
 
 @require_http_methods(["GET"])
+@cached_api("pig")
 def api_pigs(request):
     """API endpoint for pigs"""
     try:
@@ -95,16 +116,21 @@ def api_pigs(request):
         paginator = Paginator(queryset, page_size)
         page_obj = paginator.get_page(page)
         
+        entries = list(page_obj)
+        galleries = galleries_for('pig', [p.id for p in entries]) if wants_images(request) else None
         pigs = []
-        for pig in page_obj:
-            pigs.append({
+        for pig in entries:
+            item = {
                 'id': pig.id,
                 'name': pig.name,
                 'price': float(pig.price) if pig.price else None,
                 'is_published': pig.is_published,
                 'published_at': pig.published_at.isoformat() if pig.published_at else None,
                 'updated_at': pig.updated_at.isoformat() if pig.updated_at else None,
-            })
+            }
+            if galleries is not None:
+                item['images'] = galleries.get(pig.id, [])
+            pigs.append(item)
         
         return JsonResponse({
             'status': 'success',
@@ -127,6 +153,7 @@ def api_pigs(request):
 
 
 @require_http_methods(["GET"])
+@cached_api("news")
 def api_news_articles(request):
     """API endpoint for news articles"""
     try:
@@ -137,6 +164,7 @@ def api_news_articles(request):
         category = request.GET.get('category', '')
         featured_only = request.GET.get('featured', 'false').lower() == 'true'
         published_only = request.GET.get('published', 'true').lower() == 'true'
+        sort = request.GET.get('sort', '')
         
         # Build queryset - get news entries only (kind_id=2)
         queryset = CmsNewsEntry.get_news_queryset()
@@ -153,27 +181,42 @@ def api_news_articles(request):
         # Note: category filtering not implemented yet
         # Could be added as a field or relationship later
         
-        # Order by published_at desc, then by created_at desc
-        queryset = queryset.order_by('-published_at', '-created_at')
-        
-        # Paginate
-        paginator = Paginator(queryset, page_size)
-        page_obj = paginator.get_page(page)
+        if sort in NEWS_RANKINGS:
+            # Phân trang trên bảng xếp hạng; chỉ bài có lượt xem/điểm mới xuất hiện
+            model, field = NEWS_RANKINGS[sort]
+            ranked = (model.objects.filter(entry_id__in=queryset.values('id'))
+                      .order_by(f'-{field}', 'entry_id').values_list('entry_id', flat=True))
+            paginator = Paginator(ranked, page_size)
+            page_obj = paginator.get_page(page)
+            by_id = queryset.in_bulk(list(page_obj))
+            entries = [by_id[pk] for pk in page_obj if pk in by_id]
+        else:
+            # Order by published_at desc, then by created_at desc
+            queryset = queryset.order_by('-published_at', '-created_at')
+            
+            # Paginate
+            paginator = Paginator(queryset, page_size)
+            page_obj = paginator.get_page(page)
+            entries = list(page_obj)
         
         # Serialize data
+        srcsets = srcset_for([entry.cover_image_id for entry in entries])
+        counts = view_counts([entry.id for entry in entries])
         articles = []
-        for entry in page_obj:
+        for entry in entries:
+            srcset = srcsets.get(entry.cover_image_id)
             articles.append({
                 'id': entry.id,
                 'title': entry.title,
                 'slug': entry.slug,
                 'summary': entry.summary,
                 'content': entry.get_content_text(),
-                'featured_image': entry.get_featured_image_url(),
+                'featured_image': largest_url(srcset),
+                'featured_image_srcset': srcset,
                 'category_id': None,  # Not implemented in cms_content_entry yet
                 'author': entry.author_name,
                 'read_time': entry.get_read_time(),
-                'view_count': 0,  # Not tracked in cms_content_entry yet
+                'view_count': counts.get(entry.id, 0),
                 'tags': entry.get_tags_list(),
                 'meta_title': entry.seo_title,
                 'meta_description': entry.seo_desc,
@@ -204,9 +247,31 @@ def api_news_articles(request):
         }, status=500)
 
 
+@require_http_methods(["GET", "HEAD"])
+def api_news_feed(request):
+    """RSS 2.0 (mặc định) hoặc Atom (?format=atom) của các tin mới nhất, render sẵn (core/feeds.py)"""
+    fmt = request.GET.get('format', 'rss')
+    if fmt not in FEED_FORMATS:
+        return JsonResponse({'status': 'error', 'message': f"format phải là {' / '.join(FEED_FORMATS)}"}, status=400)
+    return feed_response(request, fmt)
+
+
 @require_http_methods(["GET"])
 def api_news_article_detail(request, article_id):
     """API endpoint for single news article detail from cms_content_entry"""
+    response = _news_article_detail(request, article_id)
+    if response.status_code == 200:
+        # view_count không nằm trong bản cache: ghép số đã flush vào sau khi lấy response
+        body = json.loads(response.content)
+        body['data']['view_count'] = view_counts([article_id]).get(article_id, 0)
+        response.content = json.dumps(body)
+        # Lượt xem gom trong bộ nhớ, flush theo lô; đếm cả khi response lấy từ cache
+        record_view(article_id)
+    return response
+
+
+@cached_api("news")
+def _news_article_detail(request, article_id):
     try:
         entry = CmsNewsEntry.objects.get(
             id=article_id, 
@@ -214,10 +279,9 @@ def api_news_article_detail(request, article_id):
             is_published=True, 
             is_deleted=False
         )
-        
-        # Note: View count not tracked in cms_content_entry yet
-        # Could be added as a field later
-        
+
+        srcset = srcset_for([entry.cover_image_id]).get(entry.cover_image_id)
+
         return JsonResponse({
             'status': 'success',
             'data': {
@@ -226,11 +290,12 @@ def api_news_article_detail(request, article_id):
                 'slug': entry.slug,
                 'summary': entry.summary,
                 'content': entry.get_content_text(),
-                'featured_image': entry.get_featured_image_url(),
+                'featured_image': largest_url(srcset),
+                'featured_image_srcset': srcset,
                 'category_id': None,  # Not implemented yet
                 'author': entry.author_name,
                 'read_time': entry.get_read_time(),
-                'view_count': 0,  # Not tracked yet
+                'view_count': None,  # api_news_article_detail ghép số hiện tại, bản cache không giữ
                 'tags': entry.get_tags_list(),
                 'meta_title': entry.seo_title,
                 'meta_description': entry.seo_desc,
@@ -255,6 +320,7 @@ def api_news_article_detail(request, article_id):
 
 
 @require_http_methods(["GET"])
+@cached_api("news")
 def api_news_categories(request):
     """API endpoint for news categories"""
     try:
@@ -301,6 +367,7 @@ def api_news_categories(request):
 
 
 @require_http_methods(["GET"])
+@cached_api("pig")
 def api_pig_detail(request, pig_id):
     """API endpoint for single pig detail"""
     try:
@@ -319,6 +386,7 @@ def api_pig_detail(request, pig_id):
                 'is_published': pig.is_published,
                 'published_at': pig.published_at.isoformat() if pig.published_at else None,
                 'updated_at': pig.updated_at.isoformat() if pig.updated_at else None,
+                'images': galleries_for('pig', [pig.id]).get(pig.id, []),
             }
         })
         
@@ -335,6 +403,7 @@ def api_pig_detail(request, pig_id):
 
 
 @require_http_methods(["GET"])
+@cached_api("medicine")
 def api_medicine_detail(request, medicine_id):
     """API endpoint for single medicine detail"""
     try:
@@ -355,6 +424,7 @@ def api_medicine_detail(request, medicine_id):
                 'is_published': medicine.is_published,
                 'published_at': medicine.published_at.isoformat() if medicine.published_at else None,
                 'updated_at': medicine.updated_at.isoformat() if medicine.updated_at else None,
+                'images': galleries_for('medicine', [medicine.id]).get(medicine.id, []),
             }
         })
         
@@ -367,4 +437,58 @@ def api_medicine_detail(request, medicine_id):
         return JsonResponse({
             'status': 'error',
             'message': str(e)
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+def api_autocomplete(request):
+    """API endpoint for typeahead: pig, medicine and news titles matching a prefix"""
+    try:
+        query = request.GET.get('q', '')
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+
+        return JsonResponse({
+            'status': 'success',
+            'data': autocomplete(query, limit) if query.strip() else [],
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+def api_changes(request):
+    """API endpoint for delta sync: pigs, medicines, categories and news changed since ?since=<token>, with tombstones"""
+    try:
+        since = parse_token(request.GET.get('since'))
+        limit = min(max(int(request.GET.get('limit', settings.CHANGES_PAGE_SIZE)), 1), settings.CHANGES_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Invalid since/limit'
+        }, status=400)
+    except TokenExpired:
+        # Token kiểu cũ (chỉ seq), trước khi có cột xid
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Token expired, resync without since'
+        }, status=410)
+
+    try:
+        result = changes_since(since, limit)
+        return JsonResponse({'status': 'success', **result})
+
+    except TokenExpired:
+        # catalog_changes đã được dựng lại: client xoá bản sao và đồng bộ lại từ đầu (không có since)
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Token expired, resync without since'
+        }, status=410)
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
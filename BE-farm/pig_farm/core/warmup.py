@@ -0,0 +1,141 @@
+"""
+Làm nóng cache /api/ (core/api_cache.py) cho các request FE-farm luôn gọi đầu tiên.
+
+- Danh sách lợn, thuốc, tin tức trang 1 với các page_size FE dùng (10, 12, 20, 100)
+- Danh mục tin tức
+- Trang chi tiết của N dòng mới nhất mỗi loại
+
+Chạy bằng lệnh warm_api_cache khi deploy, hoặc tự chạy ở background khi worker
+khởi động nếu API_CACHE_WARM_ON_STARTUP bật. Sau publish/unpublish/delete,
+core/sync.py gọi rewarm() cho đúng các khoá bị ảnh hưởng: danh sách của nhóm
+đó và trang chi tiết của dòng vừa đổi.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import HttpRequest, QueryDict
+from django.urls import reverse
+
+from . import api_cache, views
+from .sql_models import CmsNewsEntry, Medicine, Pig
+
+logger = logging.getLogger(__name__)
+
+FE_PAGE_SIZES = (10, 12, 20, 100)
+
+# nhóm -> (tên URL danh sách, view)
+LIST_VIEWS = {
+    "pig": ("api_pigs", views.api_pigs),
+    "medicine": ("api_medicines", views.api_medicines),
+    "news": ("api_news_articles", views.api_news_articles),
+}
+
+# nhóm -> (tên URL chi tiết, tham số URL, view có @cached_api, dòng mới nhất trước)
+DETAIL_VIEWS = {
+    "pig": ("api_pig_detail", "pig_id", views.api_pig_detail,
+            lambda: Pig.objects.filter(is_published=True, is_deleted=False).order_by("-updated_at")),
+    "medicine": ("api_medicine_detail", "medicine_id", views.api_medicine_detail,
+                 lambda: Medicine.objects.filter(is_published=True, is_deleted=False).order_by("-updated_at")),
+    # Route chi tiết tin tức còn đếm lượt xem; warm-up gọi thẳng phần được cache
+    "news": ("api_news_article_detail", "article_id", views._news_article_detail,
+             lambda: CmsNewsEntry.get_news_queryset().filter(is_published=True).order_by("-published_at")),
+}
+
+
+class Target(NamedTuple):
+    view: object
+    path: str
+    params: dict
+    kwargs: dict
+
+
+def make_request(path, params):
+    """HttpRequest GET tối thiểu để gọi view trực tiếp (không qua middleware)."""
+    request = HttpRequest()
+    request.method = "GET"
+    request.path = request.path_info = path
+    request.GET = QueryDict(urlencode(params))
+    return request
+
+
+def list_targets(group):
+    name, view = LIST_VIEWS[group]
+    targets = [Target(view, reverse(name), {"page": "1", "page_size": str(size), "published": "true"}, {})
+               for size in FE_PAGE_SIZES]
+    if group == "news":
+        targets.append(Target(views.api_news_categories, reverse("api_news_categories"), {}, {}))
+    return targets
+
+
+def detail_target(group, pk):
+    name, arg, view, _ = DETAIL_VIEWS[group]
+    return Target(view, reverse(name, kwargs={arg: pk}), {}, {arg: pk})
+
+
+def all_targets(top_n):
+    targets = []
+    for group in LIST_VIEWS:
+        targets.extend(list_targets(group))
+        latest = DETAIL_VIEWS[group][3]
+        targets.extend(detail_target(group, pk) for pk in latest().values_list("id", flat=True)[:top_n])
+    return targets
+
+
+def _warm_one(target, force):
+    try:
+        return target, api_cache.prime(target.view, make_request(target.path, target.params), force=force, **target.kwargs)
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def warm(targets, workers=None, force=False):
+    """Tính các target song song (tối đa `workers` luồng); trả về [(target, kết quả)]."""
+    workers = settings.API_CACHE_WARM_WORKERS if workers is None else workers
+    if workers <= 0:
+        return [_warm_one(target, force) for target in targets]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-cache-warm") as executor:
+        return list(executor.map(lambda target: _warm_one(target, force), targets))
+
+
+def rewarm(group, pk=None):
+    """Sau khi commit: tính lại danh sách của nhóm và trang chi tiết của dòng pk ở background."""
+    if not settings.API_CACHE_WARM_ON_PUBLISH or settings.API_CACHE_TIMEOUT <= 0:
+        return
+
+    def run():
+        targets = list_targets(group) + ([detail_target(group, pk)] if pk else [])
+        try:
+            warm(targets, force=True)
+        except Exception as e:
+            logger.warning(f"Re-warm failed for {group}: {e}")
+
+    def schedule():
+        if settings.API_CACHE_WARM_WORKERS <= 0:
+            run()
+        else:
+            threading.Thread(target=run, name="api-cache-rewarm", daemon=True).start()
+
+    transaction.on_commit(schedule)
+
+
+def start_background_warmup():
+    """Hook khởi động (wsgi.py): warm-up toàn bộ ở background nếu được bật."""
+    if not settings.API_CACHE_WARM_ON_STARTUP or settings.API_CACHE_TIMEOUT <= 0:
+        return
+
+    def run():
+        try:
+            results = warm(all_targets(settings.API_CACHE_WARM_TOP_N))
+            logger.info(f"API cache warm-up: {len(results)} responses")
+        except Exception as e:
+            logger.warning(f"API cache warm-up failed: {e}")
+        finally:
+            connection.close()
+
+    threading.Thread(target=run, name="api-cache-warmup", daemon=True).start()
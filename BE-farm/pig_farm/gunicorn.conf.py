@@ -0,0 +1,89 @@
+"""
+Cấu hình gunicorn cho production:
+    gunicorn -c gunicorn.conf.py
+
+- App mặc định là pig_farm.wsgi (admin + API, settings production, DEBUG luôn
+  tắt). Pool chỉ phục vụ /api/: GUNICORN_APP=pig_farm.wsgi_api:application.
+  Settings chọn theo app (WSGI_SETTINGS) nếu DJANGO_SETTINGS_MODULE chưa đặt:
+  file này chạy trước khi import app nên setdefault trong wsgi*.py không có tác dụng.
+- preload_app: master import app một lần, gc.freeze() rồi mới fork, các worker
+  chia sẻ bộ nhớ copy-on-write (pig_farm/serving.py).
+- GUNICORN_WORKER_CLASS:
+    gthread (mặc định): ít process, mỗi process GUNICORN_THREADS luồng. Các view
+      /api/ chủ yếu chờ DB; các luồng dùng chung cache trong bộ nhớ
+      (LocMemCache, single-flight, chỉ mục autocomplete, bộ đếm lượt xem) nên
+      tốn ít RAM nhất trên mỗi request đồng thời.
+    sync: một request mỗi process; cô lập tốt hơn khi có request nặng CPU
+      (rendition, import), đổi lại nhiều process hơn và mỗi process giữ bản
+      riêng của các cache trên.
+- max_requests + jitter: worker tự khởi động lại sau khoảng N request (các
+  worker không cùng lúc), giới hạn RSS tăng dần do phân mảnh bộ nhớ. Lượt xem
+  đang gom trong worker được flush qua atexit (core/view_counter.py).
+
+Đo bộ nhớ mỗi worker: python manage.py benchmark_workers
+"""
+import gc
+import multiprocessing
+import os
+
+from decouple import config
+
+# module WSGI -> settings của profile đó (xem core/management/commands/benchmark_startup.py)
+WSGI_SETTINGS = {
+    "pig_farm.wsgi": "pig_farm.settings.production",
+    "pig_farm.wsgi_api": "pig_farm.settings.api",
+}
+
+wsgi_app = config("GUNICORN_APP", default="pig_farm.wsgi:application")
+os.environ.setdefault(
+    "DJANGO_SETTINGS_MODULE",
+    WSGI_SETTINGS.get(wsgi_app.partition(":")[0], "pig_farm.settings.production"),
+)
+bind = f"0.0.0.0:{config('PORT', default=8000, cast=int)}"
+
+worker_class = config("GUNICORN_WORKER_CLASS", default="gthread")
+threads = config("GUNICORN_THREADS", default=4, cast=int) if worker_class == "gthread" else 1
+# gthread: mỗi CPU một process là đủ; sync: công thức quen thuộc 2 * CPU + 1
+workers = config(
+    "GUNICORN_WORKERS",
+    default=multiprocessing.cpu_count() if worker_class == "gthread" else multiprocessing.cpu_count() * 2 + 1,
+    cast=int,
+)
+
+max_requests = config("GUNICORN_MAX_REQUESTS", default=2000, cast=int)
+max_requests_jitter = config("GUNICORN_MAX_REQUESTS_JITTER", default=200, cast=int)
+timeout = config("GUNICORN_TIMEOUT", default=30, cast=int)
+graceful_timeout = 30
+keepalive = 5
+
+preload_app = config("GUNICORN_PRELOAD", default=True, cast=bool)
+
+accesslog = "-"
+errorlog = "-"
+
+if preload_app:
+    # = pig_farm.serving.PRELOAD_ENV (file config được nạp trước khi thư mục app vào sys.path)
+    os.environ["PIG_FARM_PRELOADED"] = "1"
+    # Không để GC chạy trong lúc import app ở master; worker bật lại sau fork
+    gc.disable()
+
+
+def when_ready(server):
+    from django.conf import settings
+
+    if settings.DEBUG:
+        raise RuntimeError(f"DEBUG=True trong {os.environ['DJANGO_SETTINGS_MODULE']}: không chạy production với DEBUG")
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        from pig_farm.serving import before_fork
+
+        before_fork()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from pig_farm.serving import worker_started
+
+        worker_started()
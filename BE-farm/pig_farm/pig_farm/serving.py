@@ -0,0 +1,47 @@
+"""
+Hook dùng chung cho gunicorn.conf.py và lệnh benchmark_workers.
+
+Với preload_app, master import Django + app một lần rồi fork các worker; trang
+bộ nhớ được chia sẻ copy-on-write. Hai thứ làm mất chia sẻ đó:
+  - GC của CPython ghi vào header của mọi object nó duyệt -> trang bị copy
+    trong từng worker. gc.freeze() trước khi fork chuyển các object đã import
+    sang generation "permanent", GC của worker không đụng tới nữa.
+  - Kết nối DB/cache mở trong master bị các worker dùng chung socket -> đóng
+    trước khi fork, mỗi worker tự mở lại.
+Warm-up cache (core/warmup.py) chạy trong từng worker sau khi fork, không chạy
+trong master: fork khi thread khác đang giữ lock có thể làm worker treo.
+"""
+import gc
+import os
+
+# wsgi.py / wsgi_api.py không tự warm-up khi biến này được đặt (xem worker_started)
+PRELOAD_ENV = "PIG_FARM_PRELOADED"
+
+
+def start_warmup_on_import():
+    """Gọi từ module WSGI: warm-up ngay, trừ khi master preload sẽ để worker tự làm."""
+    if os.environ.get(PRELOAD_ENV):
+        return
+    from core.warmup import start_background_warmup
+
+    start_background_warmup()
+
+
+def before_fork(freeze=True):
+    """Trong master, ngay trước khi fork worker."""
+    from django.core.cache import caches
+    from django.db import connections
+
+    connections.close_all()
+    for cache in caches.all(initialized_only=True):
+        cache.close()
+    if freeze:
+        gc.freeze()
+
+
+def worker_started():
+    """Trong worker, ngay sau khi fork."""
+    gc.enable()
+    from core.warmup import start_background_warmup
+
+    start_background_warmup()
@@ -0,0 +1,40 @@
+"""
+Profile chỉ phục vụ /api/ (pig_farm/wsgi_api.py).
+
+Worker API không cần Wagtail admin, documents, forms, embeds, redirects, search
+view, modeladmin, Django admin, session hay messages: các app/middleware đó chỉ
+làm chậm khởi động và tốn RSS mỗi worker. Chỉ giữ những app mà model của core
+cần (wagtail, wagtail.images, wagtail.search, taggit, modelcluster, auth,
+contenttypes) cùng corsheaders.
+
+Không chạy migrate/collectstatic bằng profile này: các app bị bỏ vẫn có bảng
+do profile đầy đủ (production) tạo. So sánh thời gian khởi động và RSS với
+lệnh benchmark_startup.
+"""
+from .production import *
+
+# Model của core kế thừa wagtail Page / Image và dùng taggit, modelcluster.
+# Không có wagtail.admin: panels chỉ được import, không cần app cài đặt
+INSTALLED_APPS = [
+    "corsheaders",
+    "core",
+    "wagtail.images",
+    "wagtail.search",
+    "wagtail",
+    "modelcluster",
+    "taggit",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+]
+
+MIDDLEWARE = [
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+
+ROOT_URLCONF = "pig_farm.urls_api"
+WSGI_APPLICATION = "pig_farm.wsgi_api.application"
+
+# JSON views không render template
+TEMPLATES = []
@@ -78,6 +78,8 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+# Cho FE đọc trạng thái cache của /api/ (core/api_cache.py)
+CORS_EXPOSE_HEADERS = ["X-Cache-Status"]
 
 TEMPLATES = [
     {
@@ -115,10 +117,12 @@ DATABASES = {
 }
 
 # Cache (Memory cache for development)
+# Nhiều worker: dùng backend chung (vd. django.core.cache.backends.redis.RedisCache)
+# để version cache và khoá single-flight (core/api_cache.py) có hiệu lực giữa các worker
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "unique-snowflake",
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": config("CACHE_LOCATION", default="unique-snowflake"),
     }
 }
 
@@ -175,7 +179,8 @@ MEDIA_URL = "/media/"
 # See https://docs.djangoproject.com/en/5.2/ref/settings/#std-setting-STORAGES
 STORAGES = {
     "default": {
-        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        # Lưu media dưới thư mục hash nội dung -> URL bất biến (core/media.py)
+        "BACKEND": "core.media.HashedMediaStorage",
     },
     "staticfiles": {
         "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
@@ -193,11 +198,97 @@ WAGTAIL_SITE_NAME = "pig_farm"
 
 # Search
 # https://docs.wagtail.org/en/stable/topics/search/backends.html
+# Trên Postgres backend "database" dùng PostgresSearchBackend (tsvector có GIN index).
+# SEARCH_CONFIG 'vietnamese' (unaccent + simple) do lệnh add_search_config tạo.
+# AUTO_UPDATE tắt: index được cập nhật theo lô ở background (core/search_index.py).
 WAGTAILSEARCH_BACKENDS = {
     "default": {
         "BACKEND": "wagtail.search.backends.database",
+        "AUTO_UPDATE": False,
     }
 }
+if DATABASES["default"]["ENGINE"].endswith("postgresql"):
+    WAGTAILSEARCH_BACKENDS["default"]["SEARCH_CONFIG"] = config("SEARCH_CONFIG", default="vietnamese")
+    WAGTAILSEARCH_BACKENDS["default"]["AUTOCOMPLETE_SEARCH_CONFIG"] = WAGTAILSEARCH_BACKENDS["default"]["SEARCH_CONFIG"]
+
+# Gom cập nhật search index: flush sau N giây (0 = ngay khi commit)
+SEARCH_INDEX_FLUSH_SECONDS = config("SEARCH_INDEX_FLUSH_SECONDS", default=2.0, cast=float)
+SEARCH_INDEX_BATCH_SIZE = 500
+# Cache kết quả tìm kiếm lặp lại (giây) và số kết quả tối đa mỗi loại
+SEARCH_CACHE_TIMEOUT = 300
+SEARCH_MAX_RESULTS = 200
+
+# /api/autocomplete/: chỉ mục tiền tố trong bộ nhớ mỗi process (core/autocomplete.py)
+AUTOCOMPLETE_MAX_ENTRIES = 200_000
+AUTOCOMPLETE_REBUILD_SECONDS = 600
+
+# Cache response của /api/ (core/api_cache.py); 0 = tắt. Miss đồng thời chỉ tính một lần,
+# worker khác chờ tối đa API_CACHE_LOCK_SECONDS
+API_CACHE_TIMEOUT = config("API_CACHE_TIMEOUT", default=60, cast=int)
+API_CACHE_LOCK_SECONDS = 10
+API_CACHE_POLL_SECONDS = 0.05
+# Stale-while-revalidate: trả bản cũ thêm N giây sau khi hết hạn/invalidate, làm mới ở
+# background (REFRESH_WORKERS = 0: làm mới ngay trong request); bản cũ được giữ tới
+# STALE_IF_ERROR_SECONDS để dùng khi DB lỗi
+API_CACHE_STALE_SECONDS = config("API_CACHE_STALE_SECONDS", default=300, cast=int)
+API_CACHE_STALE_IF_ERROR_SECONDS = 24 * 3600
+API_CACHE_REFRESH_WORKERS = 2
+# Warm-up (core/warmup.py, lệnh warm_api_cache): số luồng song song, số trang chi tiết mới
+# nhất mỗi loại; bật warm-up nền khi worker khởi động và warm lại khoá bị ảnh hưởng sau publish
+API_CACHE_WARM_WORKERS = 4
+API_CACHE_WARM_TOP_N = config("API_CACHE_WARM_TOP_N", default=20, cast=int)
+API_CACHE_WARM_ON_STARTUP = config("API_CACHE_WARM_ON_STARTUP", default=False, cast=bool)
+API_CACHE_WARM_ON_PUBLISH = True
+
+# Lượt xem tin tức gom trong bộ nhớ worker, flush theo lô (core/view_counter.py).
+# Crash mất tối đa VIEW_COUNTER_FLUSH_SECONDS giây lượt xem của worker; 0 = ghi ngay.
+VIEW_COUNTER_FLUSH_SECONDS = config("VIEW_COUNTER_FLUSH_SECONDS", default=10.0, cast=float)
+VIEW_COUNTER_MAX_PENDING = 1000
+# /api/news/?sort=trending: điểm giảm một nửa sau mỗi TRENDING_HALF_LIFE_HOURS giờ
+# (lệnh compute_trending_scores, core/trending.py)
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_MIN_SCORE = 0.01
+TRENDING_BUCKET_RETENTION_HOURS = 24 * 14
+
+# Domain của FE-farm, dùng cho URL tuyệt đối trong sitemap và feed tin tức
+FRONTEND_BASE_URL = config("FRONTEND_BASE_URL", default="http://localhost:8080")
+
+# Sitemap tĩnh (core/sitemaps.py, lệnh build_sitemaps): URL tuyệt đối theo domain của FE-farm,
+# tối đa SITEMAP_SHARD_SIZE URL mỗi file; hook publish ghi lại shard ở background
+SITEMAP_ROOT = config("SITEMAP_ROOT", default=os.path.join(BASE_DIR, "sitemaps"))
+SITEMAP_BASE_URL = config("SITEMAP_BASE_URL", default=FRONTEND_BASE_URL)
+SITEMAP_SHARD_SIZE = 50_000
+SITEMAP_BACKGROUND = True
+
+# Snapshot JSON tĩnh cho nginx (core/snapshots.py, lệnh export_snapshots): cập nhật tăng dần
+# sau publish; giữ SNAPSHOT_KEEP_VERSIONS phiên bản gần nhất
+SNAPSHOT_ROOT = config("SNAPSHOT_ROOT", default=os.path.join(BASE_DIR, "snapshots"))
+SNAPSHOT_ENABLED = config("SNAPSHOT_ENABLED", default=True, cast=bool)
+SNAPSHOT_BACKGROUND = True
+SNAPSHOT_KEEP_VERSIONS = 3
+
+# /api/news/feed.xml (core/feeds.py): N tin mới nhất, render lại khi publish/unpublish/xoá tin
+NEWS_FEED_SIZE = 50
+NEWS_FEED_TITLE = config("NEWS_FEED_TITLE", default="Tin tức trang trại")
+NEWS_FEED_MAX_AGE = 60
+# Giới hạn tuổi bản feed trong cache: với LocMemCache, publish chỉ render lại ở worker xử lý nó
+NEWS_FEED_CACHE_TIMEOUT = config("NEWS_FEED_CACHE_TIMEOUT", default=300, cast=int)
+
+# /api/changes/?since=<token> (core/changes.py): số dòng tối đa mỗi lần poll (cũng là ?limit= tối đa)
+CHANGES_PAGE_SIZE = 500
+
+# Trang admin "Nhập bảng giá" (core/catalog_import.py): chạy nền, trang poll trạng thái trong cache
+CATALOG_IMPORT_BACKGROUND = True
+CATALOG_IMPORT_JOB_TIMEOUT = 24 * 3600
+# Process chạy job ghi nhịp mỗi HEARTBEAT giây; "running" mà mất nhịp quá STALE giây
+# (worker bị recycle / SIGKILL) thì trang admin báo failed
+CATALOG_IMPORT_HEARTBEAT_SECONDS = 15
+CATALOG_IMPORT_STALE_SECONDS = 60
+
+# Responsive image renditions generated at publish time (core/renditions.py).
+# RENDITION_WORKERS = 0 generates them synchronously.
+RENDITION_WIDTHS = [320, 640, 1024]
+RENDITION_WORKERS = config('RENDITION_WORKERS', default=2, cast=int)
 
 # Base URL to use when referring to full URLs within the Wagtail admin backend -
 # e.g. in notification emails. Don't include '/admin' or a trailing slash
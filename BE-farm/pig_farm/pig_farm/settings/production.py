@@ -1,7 +1,12 @@
+from decouple import Csv
+
 from .base import *
 
 DEBUG = False
 
+SECRET_KEY = config("SECRET_KEY", default="")
+ALLOWED_HOSTS = config("ALLOWED_HOSTS", default="localhost,127.0.0.1", cast=Csv())
+
 # ManifestStaticFilesStorage is recommended in production, to prevent
 # outdated JavaScript / CSS assets being served from cache
 # (e.g. after a Wagtail upgrade).
@@ -12,3 +17,6 @@ try:
     from .local import *
 except ImportError:
     pass
+
+# local.py không được bật lại DEBUG trên production (gunicorn.conf.py cũng kiểm tra)
+DEBUG = False
@@ -1,11 +1,13 @@
 from django.conf import settings
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.contrib import admin
 
 from wagtail.admin import urls as wagtailadmin_urls
 from wagtail import urls as wagtail_urls
 from wagtail.documents import urls as wagtaildocs_urls
 
+from core.media import serve_media
+from core.sitemaps import serve_sitemap
 from search import views as search_views
 
 # urlpatterns = [
@@ -22,17 +24,19 @@ urlpatterns = [
     path("search/", search_views.search, name="search"),
     # Add API endpoints (optional)
     path("api/", include("core.urls")),        
+    # Sitemap tĩnh do core/sitemaps.py ghi; production do nginx phục vụ
+    re_path(r"^(?P<path>sitemap(-[a-z]+-\d+)?\.xml)$", serve_sitemap, name="sitemap"),
     path("", include(wagtail_urls)),
 ]
 
 
 if settings.DEBUG:
-    from django.conf.urls.static import static
     from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 
-    # Serve static and media files from development server
+    # Serve static files from development server
     urlpatterns += staticfiles_urlpatterns()
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Media: ETag/Range, immutable cache cho đường dẫn có hash nội dung; production do nginx phục vụ
+    urlpatterns += [path(settings.MEDIA_URL.lstrip("/") + "<path:path>", serve_media, name="media")]
 
 urlpatterns = urlpatterns + [
     # For anything not caught by a more specific rule above, hand over to
@@ -0,0 +1,13 @@
+"""URLconf của profile API (settings/api.py): chỉ /api/ (và media khi DEBUG), không có admin hay trang Wagtail."""
+from django.conf import settings
+from django.urls import include, path
+
+from core.media import serve_media
+
+urlpatterns = [
+    path("api/", include("core.api_urls")),
+]
+
+if settings.DEBUG:
+    # Production: nginx phục vụ /media/
+    urlpatterns += [path(settings.MEDIA_URL.lstrip("/") + "<path:path>", serve_media, name="media")]
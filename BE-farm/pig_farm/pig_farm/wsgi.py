@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pig_farm.settings.dev")
 
 application = get_wsgi_application()
+
+# Warm-up cache /api/ ở background nếu API_CACHE_WARM_ON_STARTUP bật
+# (gunicorn preload_app: chạy trong từng worker sau fork, xem pig_farm/serving.py)
+from pig_farm.serving import start_warmup_on_import  # noqa: E402
+
+start_warmup_on_import()
@@ -0,0 +1,21 @@
+"""
+WSGI entry chỉ phục vụ /api/ (settings/api.py): ít app, ít middleware, khởi động nhanh hơn.
+
+    gunicorn pig_farm.wsgi_api:application
+
+Admin/CMS vẫn chạy bằng pig_farm.wsgi với profile đầy đủ.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pig_farm.settings.api")
+
+application = get_wsgi_application()
+
+# Warm-up cache /api/ ở background nếu API_CACHE_WARM_ON_STARTUP bật
+# (gunicorn preload_app: chạy trong từng worker sau fork, xem pig_farm/serving.py)
+from pig_farm.serving import start_warmup_on_import  # noqa: E402
+
+start_warmup_on_import()
@@ -1,7 +1,16 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.template.response import TemplateResponse
 
 from wagtail.models import Page
+from wagtail.search.backends import get_search_backend
+
+from core.pages import MedicineProductPage, PigPage
+from core.search_index import search_version
+from core.sql_models import Medicine, Pig
 
 # To enable logging of search queries for use with the "Promoted search results" module
 # <https://docs.wagtail.org/en/stable/reference/contrib/searchpromotions.html>
@@ -10,6 +19,62 @@ from wagtail.models import Page
 
 # from wagtail.contrib.search_promotions.models import Query
 
+# Dòng SQL là bản hiển thị của thuốc/lợn -> bỏ page tương ứng để không trùng kết quả
+SQL_MODELS = {"medicine": Medicine, "pig": Pig}
+
+
+def _search_hits(search_query):
+    """[(kind, id)] xếp theo điểm, gồm Page live và dòng SQL Medicine/Pig.
+
+    Kết quả được cache theo phiên bản index nên truy vấn lặp lại không chạm DB.
+    """
+    normalized = " ".join(search_query.lower().split())
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    key = f"site-search:{search_version()}:{digest}"
+    hits = cache.get(key)
+    if hits is not None:
+        return hits
+
+    backend = get_search_backend()
+    limit = settings.SEARCH_MAX_RESULTS
+    scored = []
+    pages = (
+        Page.objects.live().not_type(MedicineProductPage, PigPage)
+        .search(normalized).annotate_score("_score")[:limit]
+    )
+    scored.extend((page._score or 0, "page", page.pk) for page in pages)
+    for kind, model in SQL_MODELS.items():
+        rows = backend.search(
+            normalized, model.objects.filter(is_published=True, is_deleted=False)
+        ).annotate_score("_score")[:limit]
+        scored.extend((row._score or 0, kind, row.pk) for row in rows)
+
+    # sorted ổn định: cùng điểm thì giữ thứ tự backend trả về
+    hits = [(kind, pk) for _, kind, pk in sorted(scored, key=lambda hit: -hit[0])]
+    cache.set(key, hits, settings.SEARCH_CACHE_TIMEOUT)
+    return hits
+
+
+def _load_results(hits):
+    """Nạp object cho một trang kết quả (mỗi loại một query) -> dict cho template."""
+    ids = {"page": [], **{kind: [] for kind in SQL_MODELS}}
+    for kind, pk in hits:
+        ids[kind].append(pk)
+    objects = {("page", page.pk): page for page in Page.objects.filter(pk__in=ids["page"]).specific()}
+    for kind, model in SQL_MODELS.items():
+        objects.update({(kind, obj.pk): obj for obj in model.objects.filter(pk__in=ids[kind])})
+
+    results = []
+    for kind, pk in hits:
+        obj = objects.get((kind, pk))
+        if obj is None:
+            continue
+        if kind == "page":
+            results.append({"title": obj.title, "url": obj.url, "description": obj.search_description})
+        else:
+            results.append({"title": str(obj), "url": obj.get_url(), "description": getattr(obj, "packaging", None)})
+    return results
+
 
 def search(request):
     search_query = request.GET.get("query", None)
@@ -17,7 +82,7 @@ def search(request):
 
     # Search
     if search_query:
-        search_results = Page.objects.live().search(search_query)
+        search_results = _search_hits(search_query)
 
         # To log this query for use with the "Promoted search results" module:
 
@@ -25,9 +90,9 @@ def search(request):
         # query.add_hit()
 
     else:
-        search_results = Page.objects.none()
+        search_results = []
 
-    # Pagination
+    # Pagination (trên danh sách đã cache, không đếm lại trong DB)
     paginator = Paginator(search_results, 10)
     try:
         search_results = paginator.page(page)
@@ -35,6 +100,7 @@ def search(request):
         search_results = paginator.page(1)
     except EmptyPage:
         search_results = paginator.page(paginator.num_pages)
+    search_results.object_list = _load_results(search_results.object_list)
 
     return TemplateResponse(
         request,
@@ -57,7 +57,9 @@ export const useNewsDetailBySlug = (slug: string) => {
         if (response.status === 'success') {
           const foundArticle = response.data.find(article => article.slug === slug);
           if (foundArticle) {
-            setArticle(foundArticle);
+            // Gọi API chi tiết: đây là nơi server đếm lượt xem và trả view_count
+            const detail = await apiService.getNewsArticle(foundArticle.id).catch(() => null);
+            setArticle(detail?.status === 'success' ? detail.data : foundArticle);
           } else {
             setError('Article not found');
           }
@@ -167,10 +167,12 @@ const News = () => {
                   {article.read_time} phút đọc
                 </span>
               )}
-              <span className="flex items-center gap-1">
-                <Eye className="h-3 w-3" />
-                {article.view_count}
-              </span>
+              {article.view_count !== undefined && (
+                <span className="flex items-center gap-1">
+                  <Eye className="h-3 w-3" />
+                  {article.view_count}
+                </span>
+              )}
             </div>
           </div>
           
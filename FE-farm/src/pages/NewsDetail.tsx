@@ -178,10 +178,12 @@ const NewsDetail = () => {
                 </div>
               )}
               
-              <div className="flex items-center gap-1">
-                <Eye className="h-4 w-4" />
-                <span>{article.view_count} lượt xem</span>
-              </div>
+              {article.view_count !== undefined && (
+                <div className="flex items-center gap-1">
+                  <Eye className="h-4 w-4" />
+                  <span>{article.view_count} lượt xem</span>
+                </div>
+              )}
             </div>
 
             {/* Tags */}
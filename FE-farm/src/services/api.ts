@@ -1,4 +1,5 @@
-const API_BASE_URL = 'http://127.0.0.1:8000/api';
+// Build production gọi /api/ cùng origin qua nginx (snapshot JSON tĩnh, proxy tới backend)
+const API_BASE_URL = import.meta.env.DEV ? 'http://127.0.0.1:8000/api' : '/api';
 
 export interface Medicine {
   id: number;
@@ -45,7 +46,7 @@ export interface NewsArticle {
   category_id?: number;  // Note: Not implemented in cms_content_entry yet
   author?: string;
   read_time?: number;
-  view_count: number;  // Note: Always 0 for now, not tracked in cms_content_entry
+  view_count?: number;  // Note: Absent in static snapshots (nginx), where it would be stale
   tags: string[];
   meta_title?: string;
   meta_description?: string;
@@ -82,9 +83,34 @@ export interface NewsApiParams extends ApiParams {
   featured?: boolean;
 }
 
+export interface Tombstone {
+  id: number;
+  reason: 'unpublished' | 'deleted' | 'removed';
+  deleted_at: string | null;
+}
+
+export interface ChangeSet<T> {
+  changed: T[];
+  deleted: Tombstone[];
+}
+
+export interface ChangesResponse {
+  status: 'success' | 'error';
+  data: {
+    pigs: ChangeSet<Pig>;
+    medicines: ChangeSet<Medicine>;
+    categories: ChangeSet<NewsCategory>;
+    news: ChangeSet<NewsArticle>;
+  };
+  next_token: string;
+  has_more: boolean;
+  message?: string;
+}
+
 class ApiService {
   private async request<T>(endpoint: string, params?: ApiParams): Promise<ApiResponse<T>> {
-    const url = new URL(`${API_BASE_URL}${endpoint}`);
+    // API_BASE_URL có thể là đường dẫn tương đối ('/api') khi build production
+    const url = new URL(`${API_BASE_URL}${endpoint}`, window.location.origin);
     
     if (params) {
       Object.entries(params).forEach(([key, value]) => {
@@ -152,6 +178,19 @@ class ApiService {
     return response.json();
   }
 
+  // Đồng bộ delta: gọi lại với next_token tới khi has_more = false; 410 = tải lại toàn bộ (không since)
+  async getChanges(since?: string): Promise<ChangesResponse> {
+    const url = new URL(`${API_BASE_URL}/changes/`, window.location.origin);
+    if (since) {
+      url.searchParams.append('since', since);
+    }
+    const response = await fetch(url.toString());
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return response.json();
+  }
+
   async healthCheck(): Promise<{ status: string; service: string; version: string }> {
     const response = await fetch(`${API_BASE_URL}/health/`);
     return response.json();